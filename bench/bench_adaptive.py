@@ -0,0 +1,94 @@
+import time
+import argparse
+import threading
+from concurrency_control import concurrency
+from step_retry import retry_step, retry_policy, circuit_breaker
+from upload_plan import UploadTask
+from wait_engine import rate_limiter
+from woo_api import WooApiError
+from worker_pool import run_worker_pool
+
+
+# 模拟共享主机：同时处理的请求不超过capacity时每个请求用时latency秒，超过后按比例变慢，
+# 超过overload时直接返回503
+class SimulatedHost:
+    def __init__(self, capacity=3, latency=0.2, overload=6):
+        self.capacity = capacity
+        self.latency = latency
+        self.overload = overload
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.errors = 0
+
+    def publish(self):
+        with self.lock:
+            self.in_flight += 1
+            in_flight = self.in_flight
+        try:
+            if in_flight > self.overload:
+                time.sleep(self.latency / 4)
+                with self.lock:
+                    self.errors += 1
+                raise WooApiError("POST wp-admin/post.php 返回 503: Service Unavailable", 503)
+            time.sleep(self.latency * max(1.0, in_flight / self.capacity))
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+class FakeDriver:
+    def quit(self):
+        pass
+
+
+# 用模拟主机运行一次上传，返回 (上传数量, 用时, 503次数)
+def run(tasks, workers, host, adaptive, interval):
+    concurrency.max_limit = workers if adaptive else 0
+    concurrency.interval = interval
+    concurrency.log_file = None
+    concurrency.rate_limiter = rate_limiter
+    rate_limiter.min_interval = 0.0
+    concurrency.reset()
+    circuit_breaker.reset()
+
+    def process_task(driver, task, status):
+        rate_limiter.wait()
+        retry_step("点击发布按钮", host.publish)
+        return True
+
+    start = time.time()
+    counts = run_worker_pool(tasks, workers, FakeDriver, process_task,
+                             concurrency=concurrency if concurrency.enabled else None)
+    elapsed = time.time() - start
+    concurrency.report()
+    return sum(counts), elapsed, host.errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="固定并发与自适应并发在过载主机上的吞吐量对比（模拟，不需要浏览器）")
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=8, help="浏览器数量（自适应模式下为上限）")
+    parser.add_argument("--capacity", type=int, default=3, help="模拟主机能同时处理的请求数")
+    parser.add_argument("--overload", type=int, default=5, help="同时处理的请求超过此数时返回503")
+    parser.add_argument("--latency", type=float, default=0.2, help="模拟主机空闲时每次发布的用时（秒）")
+    parser.add_argument("--interval", type=float, default=1.0, help="自适应并发的调整周期（秒）")
+    args = parser.parse_args()
+
+    # 缩短重试等待和熔断暂停时间
+    retry_policy.base_delay = 0.05
+    circuit_breaker.cooldown = 1.0
+    tasks = [UploadTask(i, f"品牌|{i}|品名", "品牌", str(i), "10", "品名", "Name", "") for i in range(args.products)]
+    results = []
+    for mode in ("fixed", "adaptive"):
+        print(f"\n== {mode} ==")
+        host = SimulatedHost(args.capacity, args.latency, args.overload)
+        results.append((mode, *run(tasks, args.workers, host, mode == "adaptive", args.interval)))
+
+    print(f"\n产品: {args.products}, 浏览器: {args.workers}, 主机容量: {args.capacity}, 超过 {args.overload} 个请求时返回503")
+    print("模式         上传数  用时(秒)  每分钟   503次数")
+    for mode, count, elapsed, errors in results:
+        print(f"{mode:<12} {count:<7} {elapsed:<9.2f} {count / elapsed * 60:<8.1f} {errors}")
+
+
+if __name__ == "__main__":
+    main()
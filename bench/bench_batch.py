@@ -0,0 +1,63 @@
+import argparse
+import tempfile
+import time
+from bench.mock_woo import MockWooServer
+from bench.bench_rest_upload import make_synthetic_catalog
+from media_upload import collect_image_paths, preupload_media
+from upload_plan import build_upload_plan
+from step_retry import retry_policy, circuit_breaker
+from woo_api import WooClient, upload_via_rest, upload_via_rest_batch
+
+
+# 在新的模拟服务器上运行一次：先预上传图片（不计时），再计时创建产品
+# batch_size为0时逐个创建，返回 (上传数量, 用时, 请求数, 批量请求中失败的产品数)
+def run(tasks, latency, item_error_rate, batch_size, batch_workers, media_workers):
+    with MockWooServer(latency=latency, item_error_rate=item_error_rate) as server:
+        client = WooClient(server.url, "bench", "bench-app-password")
+        media_ids = preupload_media(collect_image_paths(task.image_path for task in tasks), client.upload_media,
+                                    media_workers)
+        requests_before = server.request_count
+        start = time.time()
+        if batch_size:
+            count = upload_via_rest_batch(tasks, client, media_ids=media_ids, batch_size=batch_size,
+                                          batch_workers=batch_workers)
+        else:
+            count = upload_via_rest(tasks, client, media_ids=media_ids)
+        elapsed = time.time() - start
+        return count, elapsed, server.request_count - requests_before, server.item_error_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="逐个创建与products/batch批量创建的速度对比（本地模拟服务器）")
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.15, help="模拟服务器每个请求的延迟（秒），模拟跨境线路")
+    parser.add_argument("--item-error-rate", type=float, default=0.01, help="批量请求中单个产品随机失败的比例")
+    parser.add_argument("--batch-sizes", default="25,100", help="要对比的每批产品数，逗号分隔")
+    parser.add_argument("--batch-workers", default="1,2,4", help="要对比的同时发送的批次数，逗号分隔")
+    parser.add_argument("--media-workers", type=int, default=8)
+    args = parser.parse_args()
+
+    # 测速时缩短重试等待
+    retry_policy.base_delay = 0.05
+    circuit_breaker.cooldown = 1.0
+    configs = [(0, 1)] + [(int(size), int(workers)) for size in args.batch_sizes.split(",")
+                          for workers in args.batch_workers.split(",")]
+    results = []
+    with tempfile.TemporaryDirectory() as image_folder:
+        df, name_map = make_synthetic_catalog(args.rows, image_folder)
+        tasks, _ = build_upload_plan(df, name_map)
+        for batch_size, batch_workers in configs:
+            print(f"\n== {'逐个创建' if not batch_size else f'每批 {batch_size} 个，{batch_workers} 个批次并行'} ==")
+            results.append((batch_size, batch_workers, *run(tasks, args.latency, args.item_error_rate, batch_size,
+                                                             batch_workers, args.media_workers)))
+
+    print(f"\n行数: {args.rows}, 延迟: {args.latency * 1000:.0f} ms, 批量请求中单个产品失败率: {args.item_error_rate:.0%}")
+    print("每批  并行  上传数  用时(秒)  产品/秒  请求数  批量中失败(逐个重试)")
+    for batch_size, batch_workers, count, elapsed, request_count, item_errors in results:
+        label = str(batch_size) if batch_size else "-"
+        print(f"{label:<5} {batch_workers:<5} {count:<7} {elapsed:<9.2f} {count / elapsed:<8.1f} {request_count:<7} "
+              f"{item_errors}")
+
+
+if __name__ == "__main__":
+    main()
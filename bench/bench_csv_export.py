@@ -0,0 +1,54 @@
+import os
+import time
+import argparse
+import tempfile
+import tracemalloc
+from openpyxl import Workbook
+from wp_utils import image_path_for
+from pipeline import iter_sheet_tasks
+from csv_export import export_woocommerce_csv, static_image_url
+
+
+# 生成N行数据的工作簿（只写模式，不嵌入图片），并在image_folder中为每一行放一张同名的占位图片
+def make_catalog(path, image_folder, rows, name_count=50):
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(['品牌', '型号', '单价', '品名'])
+    for i in range(rows):
+        brand, model, chinese_name = f"Brand{i % 20}", f"M-{i}", f"品名{i % name_count}"
+        ws.append([brand, model, 10 + i % 90, chinese_name])
+        with open(image_path_for(image_folder, brand, model, chinese_name), 'wb') as f:
+            f.write(b"\xff\xd8\xff\xe0")
+    wb.save(path)
+    return {f"品名{i}": f"Product Name {i}, Set" for i in range(name_count)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="流式导出WooCommerce导入CSV的速度和内存（静态图片地址）")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    args = parser.parse_args()
+
+    results = []
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as work_dir:
+            file_path = os.path.join(work_dir, "a.xlsx")
+            image_folder = os.path.join(work_dir, "product_images")
+            os.makedirs(image_folder)
+            name_map = make_catalog(file_path, image_folder, rows)
+            output_file = os.path.join(work_dir, "products.csv")
+            tracemalloc.start()
+            start = time.time()
+            written, _ = export_woocommerce_csv(iter_sheet_tasks(file_path, name_map, image_folder), output_file,
+                                                static_image_url("https://cdn.example.com/products/"))
+            elapsed = time.time() - start
+            peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+            tracemalloc.stop()
+            results.append((rows, written, os.path.getsize(output_file) / 1024 / 1024, elapsed, peak))
+
+    print("\n行数     导出数   CSV(MB)  用时(秒)  峰值内存(MB)")
+    for rows, written, size, elapsed, peak in results:
+        print(f"{rows:<8} {written:<8} {size:<8.1f} {elapsed:<9.2f} {peak:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import time
+import argparse
+import tempfile
+import pandas as pd
+from types import SimpleNamespace
+from image import extract_row_images, ANCHOR_COL
+
+
+# 模拟openpyxl的图片对象：只需要anchor._from.row/col和_data()
+class FakeImage:
+    def __init__(self, row, col, data):
+        self.anchor = SimpleNamespace(_from=SimpleNamespace(row=row, col=col))
+        self._payload = data
+
+    def _data(self):
+        return self._payload
+
+
+# 生成N行数据，每行在图片列有一张图片，另外每10行在其他列有一张干扰图片
+def make_sheet(rows):
+    df = pd.DataFrame({
+        '品牌': [f"Brand{i % 20}" for i in range(rows)],
+        '型号': [f"M-{i}" for i in range(rows)],
+        '单价': [10.0] * rows,
+        '品名': [f"品名{i % 50}" for i in range(rows)],
+    })
+    images = [FakeImage(i + 1, ANCHOR_COL, b"\xff\xd8\xff\xe0") for i in range(rows)]
+    images += [FakeImage(i + 1, 0, b"\x89PNG") for i in range(0, rows, 10)]
+    return df, images
+
+
+# 原来的做法：每一行都遍历全部图片
+def scan_extract(df, images, anchor_col=ANCHOR_COL):
+    found = 0
+    for row_idx in range(2, len(df) + 2):
+        for img in images:
+            if img.anchor._from.row == row_idx - 1 and img.anchor._from.col == anchor_col:
+                found += 1
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="图片提取索引基准测试")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--scan-limit", type=int, default=10000, help="超过此行数不再运行原来的逐行遍历做对比")
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        df, images = make_sheet(rows)
+        with tempfile.TemporaryDirectory() as output_dir:
+            start = time.time()
+            saved = extract_row_images(df, images, output_dir, verbose=False)
+            index_time = time.time() - start
+        line = f"{rows:>6} 行 / {len(images):>6} 张图片: 索引提取 {saved} 张，用时 {index_time:.3f} 秒"
+        if rows <= args.scan_limit:
+            start = time.time()
+            scan_extract(df, images)
+            line += f"；原逐行遍历（仅匹配，不写文件）用时 {time.time() - start:.3f} 秒"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
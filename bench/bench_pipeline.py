@@ -0,0 +1,90 @@
+import os
+import time
+import argparse
+import tempfile
+import pandas as pd
+from bench.mock_woo import MockWooServer
+from bench.bench_xlsx_stream import make_workbook
+from image import extract_images_stream
+from image_preprocess import preprocess_images
+from media_upload import collect_image_paths, preupload_media, media_key
+from pipeline import UploadPipeline
+from upload_plan import build_upload_plan
+from woo_api import WooClient, upload_via_rest
+from wp_utils import build_image_paths
+
+
+# 记录第一个产品创建请求的时间
+def track_first_product(client):
+    first = []
+    create_product = client.create_product
+
+    def create_tracked(payload):
+        if not first:
+            first.append(time.time())
+        return create_product(payload)
+    client.create_product = create_tracked
+    return first
+
+
+# 原来的顺序流程：提取全部图片 -> 读取表格 -> 预处理全部图片 -> 预上传全部图片 -> 创建产品
+def run_sequential(file_path, work_dir, name_map, client, media_workers):
+    image_folder = os.path.join(work_dir, "sequential")
+    extract_images_stream(file_path, image_folder)
+    df = pd.read_excel(file_path)
+    df['图片路径'] = build_image_paths(df, image_folder)
+    tasks, _ = build_upload_plan(df, name_map)
+    processed = preprocess_images(collect_image_paths(task.image_path for task in tasks),
+                                  cache_dir=os.path.join(work_dir, "cache-sequential"))
+    for task in tasks:
+        task.image_path = processed.get(media_key(task.image_path), task.image_path)
+    media_ids = preupload_media(collect_image_paths(task.image_path for task in tasks), client.upload_media,
+                                media_workers)
+    return upload_via_rest(tasks, client, media_ids=media_ids)
+
+
+# 流水线：各阶段同时进行
+def run_pipeline(file_path, work_dir, name_map, client, media_workers, queue_size):
+    pipeline = UploadPipeline(file_path, name_map, image_folder=os.path.join(work_dir, "pipeline"),
+                              queue_size=queue_size,
+                              preprocess={'cache_dir': os.path.join(work_dir, "cache-pipeline")},
+                              upload_media=client.upload_media, media_workers=media_workers)
+    count = upload_via_rest(pipeline.start(), client, media_ids=pipeline.media_ids)
+    pipeline.report()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="顺序流程与流水线模式的首个产品用时/总用时对比（本地模拟服务器）")
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--image-size", type=int, default=800, help="图片边长（像素）")
+    parser.add_argument("--latency", type=float, default=0.02, help="模拟服务器每个请求的延迟（秒）")
+    parser.add_argument("--media-workers", type=int, default=4)
+    parser.add_argument("--queue-size", type=int, default=8)
+    args = parser.parse_args()
+
+    name_map = {f"品名{i}": f"Product Name {i}" for i in range(50)}
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        file_path = os.path.join(work_dir, "a.xlsx")
+        make_workbook(file_path, args.rows, args.image_size)
+        for mode in ("sequential", "pipeline"):
+            with MockWooServer(latency=args.latency) as server:
+                client = WooClient(server.url, "bench", "bench-app-password")
+                first = track_first_product(client)
+                start = time.time()
+                if mode == "sequential":
+                    count = run_sequential(file_path, work_dir, name_map, client, args.media_workers)
+                else:
+                    count = run_pipeline(file_path, work_dir, name_map, client, args.media_workers, args.queue_size)
+                elapsed = time.time() - start
+                results.append((mode, count, first[0] - start if first else 0.0, elapsed))
+
+    print(f"\n行数: {args.rows}, 图片: {args.image_size}px, 延迟: {args.latency * 1000:.0f} ms")
+    print("模式         产品数  第一个产品(秒)  总用时(秒)")
+    for mode, count, first_seconds, elapsed in results:
+        print(f"{mode:<12} {count:<7} {first_seconds:<15.2f} {elapsed:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import os
+import argparse
+import tempfile
+import time
+import pandas as pd
+from bench.mock_woo import MockWooServer
+from woo_api import WooClient, upload_via_rest
+from upload_plan import build_upload_plan
+from step_retry import retry_policy, circuit_breaker
+
+
+# 生成N行模拟产品数据和对应的图片文件
+def make_synthetic_catalog(rows, image_folder, brand_count=20, name_count=50):
+    records = []
+    for i in range(rows):
+        image_path = os.path.join(image_folder, f"img-{i}.jpg")
+        with open(image_path, 'wb') as f:
+            f.write(b"\xff\xd8\xff\xe0" + os.urandom(2048))
+        records.append({
+            '品牌': f"Brand{i % brand_count}",
+            '型号': f"M-{i}",
+            '单价': None,
+            '品名': f"品名{i % name_count}",
+            '图片路径': image_path,
+        })
+    df = pd.DataFrame(records, columns=['品牌', '型号', '单价', '品名', '图片路径'])
+    # C列为价格
+    df['单价'] = [f"{10 + i % 90}.00" for i in range(rows)]
+    name_map = {f"品名{i}": f"Product Name {i}" for i in range(name_count)}
+    return df, name_map
+
+
+def main():
+    parser = argparse.ArgumentParser(description="REST上传后端基准测试（本地模拟服务器）")
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.02, help="模拟服务器每个请求的延迟（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="写请求随机返回503的比例，用于测试步骤重试")
+    args = parser.parse_args()
+
+    # 测速时缩短重试等待和熔断暂停时间
+    retry_policy.base_delay = 0.05
+    circuit_breaker.cooldown = 1.0
+    with tempfile.TemporaryDirectory() as image_folder, \
+            MockWooServer(latency=args.latency, error_rate=args.error_rate) as server:
+        df, name_map = make_synthetic_catalog(args.rows, image_folder)
+        tasks, _ = build_upload_plan(df, name_map)
+        client = WooClient(server.url, "bench", "bench-app-password")
+        start = time.time()
+        count = upload_via_rest(tasks, client)
+        elapsed = time.time() - start
+        print(f"\n行数: {args.rows}, 延迟: {args.latency * 1000:.0f} ms, 请求数: {server.request_count}，"
+              f"其中返回503的 {server.error_count} 个")
+        print(f"上传 {count} 个产品，用时 {elapsed:.2f} 秒，{count / elapsed:.1f} 个产品/秒")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import argparse
+import tempfile
+import time
+from bench.mock_wpadmin import MockWpAdmin
+from bench.bench_rest_upload import make_synthetic_catalog
+from main_with_images import upload_to_wordpress
+from upload_plan import build_upload_plan
+from wp_ajax import AdminAjaxSession
+from step_metrics import step_stats
+from wait_engine import wait_stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Selenium上传流程基准测试（本地模拟wp-admin页面）")
+    parser.add_argument("--rows", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05, help="模拟服务器每个请求的延迟（秒）")
+    parser.add_argument("--workers", type=int, default=1, help="同时打开的浏览器数量")
+    parser.add_argument("--show-browser", action="store_true", help="显示浏览器窗口（默认无界面运行）")
+    parser.add_argument("--hybrid", action="store_true", help="混合模式：分类、品牌和图片通过HTTP请求创建")
+    parser.add_argument("--recycle-after", type=int, default=0, help="每个浏览器上传多少个产品后重启，0为不重启")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as image_folder, MockWpAdmin(latency=args.latency) as server:
+        df, name_map = make_synthetic_catalog(args.rows, image_folder)
+        tasks, _ = build_upload_plan(df, name_map)
+        hybrid = AdminAjaxSession(server.url) if args.hybrid else None
+        start = time.time()
+        upload_to_wordpress(tasks, server.url, "bench", "bench", workers=args.workers, session_cache=None,
+                            headless=not args.show_browser, recycle_after=args.recycle_after, browser_log=None,
+                            hybrid=hybrid, hybrid_upload=hybrid.upload_media_with_retry if hybrid else None)
+        elapsed = time.time() - start
+        published = len(server.products)
+
+        summary = step_stats.summary()
+        step_stats.print_summary(summary)
+        # 等待时间按所有浏览器合计，与 用时 × 浏览器数 比较
+        busy = elapsed * args.workers
+        print(f"\n行数: {args.rows}, 延迟: {args.latency * 1000:.0f} ms, 浏览器: {args.workers}, "
+              f"请求数: {server.request_count}")
+        print(f"发布 {published} 个产品，用时 {elapsed:.1f} 秒，{published / elapsed * 60:.1f} 个产品/分钟")
+        print(f"条件等待 {wait_stats.waited:.1f} 秒 ({wait_stats.waited / busy:.0%})，"
+              f"其余 {busy - wait_stats.waited:.1f} 秒为页面加载和操作；"
+              f"原固定sleep合计 {wait_stats.budget:.1f} 秒")
+
+
+if __name__ == "__main__":
+    main()
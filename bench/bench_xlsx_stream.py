@@ -0,0 +1,60 @@
+import os
+import time
+import argparse
+import tempfile
+import tracemalloc
+from openpyxl import Workbook
+from openpyxl.drawing.image import Image as SheetImage
+from PIL import Image
+from image import extract_images, extract_images_stream
+
+
+# 生成包含N行数据、每行一张图片的工作簿
+def make_workbook(path, rows, image_size):
+    wb = Workbook()
+    ws = wb.active
+    ws.append(['品牌', '型号', '单价', '品名', '图片'])
+    with tempfile.TemporaryDirectory() as image_dir:
+        for i in range(rows):
+            ws.append([f"Brand{i % 20}", f"M-{i}", 10 + i % 90, f"品名{i % 50}", None])
+            image_path = os.path.join(image_dir, f"{i}.png")
+            Image.frombytes('RGB', (image_size, image_size), os.urandom(image_size * image_size * 3)).save(image_path)
+            ws.add_image(SheetImage(image_path), f"E{i + 2}")
+        wb.save(path)
+
+
+# 运行一次提取，返回 (用时, 峰值内存MB)
+def measure(extract, file_path, output_dir):
+    tracemalloc.start()
+    start = time.time()
+    extract(file_path, output_dir)
+    elapsed = time.time() - start
+    peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="openpyxl提取与流式提取的内存/速度对比")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 400, 1600])
+    parser.add_argument("--image-size", type=int, default=200, help="图片边长（像素），随机内容，约为边长²×3字节")
+    args = parser.parse_args()
+
+    results = []
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as work_dir:
+            file_path = os.path.join(work_dir, "a.xlsx")
+            make_workbook(file_path, rows, args.image_size)
+            size = os.path.getsize(file_path) / 1024 / 1024
+            for mode, extract in (("openpyxl", extract_images), ("stream", extract_images_stream)):
+                output_dir = os.path.join(work_dir, mode)
+                elapsed, peak = measure(extract, file_path, output_dir)
+                results.append((rows, size, mode, elapsed, peak))
+
+    print("\n行数   文件MB   模式       用时(秒)  峰值内存(MB)")
+    for rows, size, mode, elapsed, peak in results:
+        print(f"{rows:<6} {size:<8.1f} {mode:<10} {elapsed:<9.2f} {peak:.1f}")
+
+
+if __name__ == "__main__":
+    main()
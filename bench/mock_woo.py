@@ -0,0 +1,217 @@
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+# 本地模拟的WooCommerce / WordPress REST接口，用于在没有真实网站的情况下测试和测速
+# latency 为每个请求额外增加的服务器延迟（秒）
+# error_rate 为写请求（POST/PUT）在处理前随机返回503的比例，用于测试重试；outage_until之前的所有请求都返回503
+# item_error_rate 为products/batch请求中单个产品随机失败的比例
+class MockWooServer:
+    def __init__(self, latency=0.0, host="127.0.0.1", port=0, error_rate=0.0, seed=0, item_error_rate=0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.item_error_rate = item_error_rate
+        self.item_error_count = 0
+        self.random = random.Random(seed)
+        self.outage_until = 0.0
+        self.error_count = 0
+        self.lock = threading.Lock()
+        self.next_id = 1
+        self.terms = {'categories': [], 'brands': []}
+        self.media = {}
+        self.products = []
+        self.request_count = 0
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _new_id(self):
+        with self.lock:
+            new_id = self.next_id
+            self.next_id += 1
+            return new_id
+
+    # 处理一个请求，返回 (状态码, JSON数据)
+    def handle(self, method, path, query, body):
+        with self.lock:
+            self.request_count += 1
+        if self.latency:
+            time.sleep(self.latency)
+        with self.lock:
+            fail = time.time() < self.outage_until or (
+                method in ('POST', 'PUT') and self.random.random() < self.error_rate)
+            if fail:
+                self.error_count += 1
+        if fail:
+            return 503, {'code': 'service_unavailable', 'message': "Service Unavailable"}
+
+        match = re.fullmatch(r"/wp-json/wc/v3/products/(categories|brands)/batch", path)
+        if match and method == 'POST':
+            terms = self.terms[match.group(1)]
+            created = []
+            for item in json.loads(body).get('create') or []:
+                with self.lock:
+                    existing = [term for term in terms if term['name'] == item['name']]
+                if existing:
+                    created.append({'id': 0, 'error': {'code': 'term_exists', 'message': "A term with the name "
+                                    "provided already exists.", 'data': {'status': 400,
+                                                                          'resource_id': existing[0]['id']}}})
+                    continue
+                term = {'id': self._new_id(), 'name': item['name']}
+                with self.lock:
+                    terms.append(term)
+                created.append(term)
+            return 200, {'create': created}
+
+        match = re.fullmatch(r"/wp-json/wc/v3/products/(categories|brands)", path)
+        if match:
+            terms = self.terms[match.group(1)]
+            if method == 'GET':
+                page = int(query.get('page', ['1'])[0])
+                per_page = int(query.get('per_page', ['10'])[0])
+                return 200, terms[(page - 1) * per_page:page * per_page]
+            data = json.loads(body)
+            with self.lock:
+                existing = [term for term in terms if term['name'] == data['name']]
+            if existing:
+                return 400, {'code': 'term_exists', 'message': "A term with the name provided already exists.",
+                             'data': {'status': 400, 'resource_id': existing[0]['id']}}
+            term = {'id': self._new_id(), 'name': data['name']}
+            with self.lock:
+                terms.append(term)
+            return 201, term
+
+        if path == "/wp-json/wp/v2/media" and method == 'POST':
+            media_id = self._new_id()
+            item = {'id': media_id, 'source_url': f"{self.url}/wp-content/uploads/{media_id}.jpg"}
+            with self.lock:
+                self.media[media_id] = len(body)
+            return 201, item
+
+        match = re.fullmatch(r"/wp-json/wp/v2/media/(\d+)", path)
+        if match and method == 'GET':
+            if int(match.group(1)) in self.media:
+                return 200, {'id': int(match.group(1))}
+            return 404, {'code': 'rest_post_invalid_id'}
+
+        if path == "/wp-json/wc/v3/products" and method == 'GET':
+            page = int(query.get('page', ['1'])[0])
+            per_page = int(query.get('per_page', ['10'])[0])
+            with self.lock:
+                products = [{'id': p['id'], 'name': p['name'], 'sku': p.get('sku', '')} for p in self.products]
+            return 200, products[(page - 1) * per_page:page * per_page]
+
+        match = re.fullmatch(r"/wp-json/wc/v3/products/(\d+)", path)
+        if match and method == 'PUT':
+            with self.lock:
+                for product in self.products:
+                    if product['id'] == int(match.group(1)):
+                        product.update(json.loads(body))
+                        return 200, product
+            return 404, {'code': 'woocommerce_rest_product_invalid_id'}
+
+        if path == "/wp-json/wc/v3/products" and method == 'POST':
+            product = dict(json.loads(body), id=self._new_id())
+            with self.lock:
+                self.products.append(product)
+            return 201, product
+
+        if path == "/wp-json/wc/v3/products/batch" and method == 'POST':
+            data = json.loads(body)
+            if sum(len(data.get(key) or []) for key in ('create', 'update', 'delete')) > 100:
+                return 413, {'code': 'woocommerce_rest_request_entity_too_large',
+                             'message': "Unable to accept more than 100 items for this request."}
+            return 200, {'create': [self._batch_create(item) for item in data.get('create') or []],
+                         'update': [self._batch_update(item) for item in data.get('update') or []]}
+
+        return 404, {'code': 'rest_no_route', 'message': f"{method} {path}"}
+
+    # 批量请求中的单个产品，按item_error_rate随机失败（与WooCommerce相同，失败的项目id为0并带有error）
+    def _batch_item_failed(self):
+        with self.lock:
+            failed = self.random.random() < self.item_error_rate
+            if failed:
+                self.item_error_count += 1
+        return failed
+
+    def _batch_create(self, item):
+        if self._batch_item_failed():
+            return {'id': 0, 'error': {'code': 'woocommerce_rest_cannot_create', 'message': "Mock item failure",
+                                       'data': {'status': 500}}}
+        product = dict(item, id=self._new_id())
+        with self.lock:
+            self.products.append(product)
+        return product
+
+    def _batch_update(self, item):
+        if self._batch_item_failed():
+            return {'id': 0, 'error': {'code': 'woocommerce_rest_cannot_edit', 'message': "Mock item failure",
+                                       'data': {'status': 500}}}
+        with self.lock:
+            for product in self.products:
+                if product['id'] == item.get('id'):
+                    product.update(item)
+                    return product
+        return {'id': item.get('id', 0), 'error': {'code': 'woocommerce_rest_product_invalid_id',
+                                                   'message': "Invalid ID.", 'data': {'status': 400}}}
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def _dispatch(self, method):
+                parsed = urlparse(self.path)
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b""
+                status, data = server.handle(method, parsed.path, parse_qs(parsed.query), body)
+                payload = json.dumps(data).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self._dispatch('GET')
+
+            def do_POST(self):
+                self._dispatch('POST')
+
+            def do_PUT(self):
+                self._dispatch('PUT')
+
+            def do_HEAD(self):
+                self._dispatch('GET')
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,301 @@
+import html
+import json
+import re
+from email.parser import BytesParser
+from email.policy import HTTP
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# 登录后设置的Cookie
+SESSION_COOKIE = "wordpress_logged_in_mock"
+# 页面中输出的nonce，后台请求必须带上
+AJAX_NONCE = "nonce"
+MEDIA_NONCE = "media-nonce"
+# 1x1像素PNG，作为上传后的缩略图
+PIXEL_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000154a24f5d0000000049454e44ae426082"
+)
+
+_LOGIN_PAGE = """<!DOCTYPE html><html><head><title>Log In</title></head><body>
+<form id="loginform" method="post" action="/wp-login.php">
+<input type="text" id="user_login" name="log"><input type="password" id="user_pass" name="pwd">
+<input type="submit" id="wp-submit" value="Log In">
+</form></body></html>"""
+
+_ADMIN_PAGE = """<!DOCTYPE html><html><head><title>{title}</title></head><body>
+<div id="wpadminbar"></div>
+<div class="wrap"><h1>Products</h1>
+<a href="/wp-admin/post-new.php?post_type=product" class="page-title-action">Add New</a>{body}</div>
+</body></html>"""
+
+# 添加/编辑产品页面：元素ID与WordPress经典编辑器 + WooCommerce相同
+# 媒体对话框用一小段脚本模拟：选择文件后通过async-upload.php上传，"设置特色图片"后写入_thumbnail_id并显示缩略图
+_EDIT_PAGE = """<!DOCTYPE html><html><head><title>Add New Product</title>
+<script>var ajaxurl = '/wp-admin/admin-ajax.php';
+var _wpPluploadSettings = {{"defaults": {{"multipart_params": {{"action": "upload-attachment", "_wpnonce": "{media_nonce}"}}}}}};
+</script></head><body>
+<div id="wpadminbar"></div>
+{notice}
+<form id="post" method="post" action="/wp-admin/post.php">
+<input type="hidden" id="post_ID" name="post_ID" value="{post_id}">
+<div id="titlediv"><input type="text" name="post_title" id="title" value="{title}"></div>
+<div id="product_data" class="postbox"><p class="form-field">
+<label for="_regular_price">Regular price</label>
+<input type="text" id="_regular_price" name="_regular_price" value="{price}"></p></div>
+<div id="product_catdiv" class="postbox"><h2>Product categories</h2>
+<ul id="product_catchecklist">{categories}</ul>
+<input type="hidden" id="_ajax_nonce-add-product_cat" value="{ajax_nonce}"></div>
+<div id="product_branddiv" class="postbox"><h2>Brands</h2>
+<ul id="product_brandchecklist">{brands}</ul>
+<input type="hidden" id="_ajax_nonce-add-product_brand" value="{ajax_nonce}"></div>
+<div id="postimagediv" class="postbox"><div class="inside">
+<a href="#" id="set-post-thumbnail">Set product image</a>
+<input type="hidden" id="_thumbnail_id" name="_thumbnail_id" value="-1"></div></div>
+<div id="submitdiv"><input type="submit" name="publish" id="publish" class="button button-primary" value="Publish"></div>
+</form>
+<script>
+document.getElementById('set-post-thumbnail').addEventListener('click', function (e) {{
+    e.preventDefault();
+    var modal = document.createElement('div');
+    modal.className = 'media-modal';
+    modal.innerHTML = '<div class="media-frame"><button type="button" class="media-modal-close">x</button>'
+        + '<button type="button" class="browser">Upload Files</button>'
+        + '<input type="file" style="display:none">'
+        + '<button type="button" class="media-button-select" disabled>Set product image</button></div>';
+    document.body.appendChild(modal);
+    var attachment = null;
+    var select = modal.querySelector('.media-button-select');
+    modal.querySelector('input[type=file]').addEventListener('change', function () {{
+        var body = new FormData();
+        body.append('async-upload', this.files[0]);
+        fetch('/wp-admin/async-upload.php', {{method: 'POST', body: body, credentials: 'same-origin'}})
+            .then(function (r) {{ return r.json(); }})
+            .then(function (data) {{ attachment = data; select.disabled = false; }});
+    }});
+    select.addEventListener('click', function () {{
+        document.getElementById('_thumbnail_id').value = attachment.id;
+        var img = new Image();
+        img.src = attachment.url;
+        document.querySelector('#postimagediv .inside').appendChild(img);
+        modal.remove();
+    }});
+    modal.querySelector('.media-modal-close').addEventListener('click', function () {{ modal.remove(); }});
+}});
+</script></body></html>"""
+
+
+# 解析multipart/form-data请求体，返回 {字段名: 内容}，不是multipart时返回空字典
+def multipart_fields(body, content_type):
+    if not content_type.startswith('multipart/form-data'):
+        return {}
+    message = BytesParser(policy=HTTP).parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+    return {part.get_param('name', header='content-disposition'): part.get_payload(decode=True)
+            for part in message.iter_parts()}
+
+
+# 本地模拟的wp-admin页面（wp-login.php、edit.php、post-new.php等），用于在没有真实网站的情况下测速Selenium上传流程
+# latency 为每个请求额外增加的服务器延迟（秒）
+class MockWpAdmin:
+    def __init__(self, latency=0.0, host="127.0.0.1", port=0):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.next_id = 1
+        self.terms = {'product_cat': [], 'product_brand': []}
+        self.media = {}
+        self.posts = {}
+        self.request_count = 0
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    # 已发布的产品
+    @property
+    def products(self):
+        with self.lock:
+            return [post for post in self.posts.values() if post['status'] == 'publish']
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _new_id(self):
+        with self.lock:
+            new_id = self.next_id
+            self.next_id += 1
+            return new_id
+
+    def _checklist(self, taxonomy, checked=()):
+        with self.lock:
+            terms = list(self.terms[taxonomy])
+        return "".join(
+            f'<li id="{taxonomy}-{term_id}"><label class="selectit">'
+            f'<input value="{term_id}" type="checkbox" name="tax_input[{taxonomy}][]" id="in-{taxonomy}-{term_id}"'
+            f'{" checked" if term_id in checked else ""}> {html.escape(name)}</label></li>'
+            for term_id, name in terms
+        )
+
+    def _edit_page(self, post, notice=""):
+        return _EDIT_PAGE.format(
+            notice=notice, media_nonce=MEDIA_NONCE, ajax_nonce=AJAX_NONCE, post_id=post['id'], title=html.escape(post['title']), price=html.escape(post['price']),
+            categories=self._checklist('product_cat', post['product_cat']),
+            brands=self._checklist('product_brand', post['product_brand']),
+        )
+
+    # 处理一个请求，返回 (状态码, 响应头字典, 响应内容)
+    def handle(self, method, path, query, body, headers):
+        with self.lock:
+            self.request_count += 1
+        if self.latency:
+            time.sleep(self.latency)
+        logged_in = SESSION_COOKIE in (headers.get('Cookie') or "")
+        form = parse_qs(body.decode('utf-8', 'replace')) if headers.get('Content-Type', '').startswith(
+            'application/x-www-form-urlencoded') else {}
+
+        if path == "/wp-login.php":
+            if method == 'POST':
+                return 302, {'Location': '/wp-admin/', 'Set-Cookie': f"{SESSION_COOKIE}=1; Path=/; HttpOnly"}, b""
+            return 200, {}, _LOGIN_PAGE
+        if path.startswith("/wp-admin") and not logged_in:
+            return 302, {'Location': '/wp-login.php'}, b""
+
+        if path in ("/wp-admin/", "/wp-admin/index.php", "/wp-admin/profile.php"):
+            return 200, {}, _ADMIN_PAGE.format(title="Dashboard", body="")
+        if path == "/wp-admin/edit.php":
+            rows = "".join(f"<tr><td>{html.escape(p['title'])}</td></tr>" for p in self.products)
+            return 200, {}, _ADMIN_PAGE.format(title="Products", body=f"<table>{rows}</table>")
+
+        if path == "/wp-admin/post-new.php":
+            # 与WordPress相同，每次打开添加产品页面都生成一个自动草稿
+            post = {'id': self._new_id(), 'status': 'auto-draft', 'title': "", 'price': "",
+                    'product_cat': [], 'product_brand': [], 'thumbnail': None}
+            with self.lock:
+                self.posts[post['id']] = post
+            return 200, {}, self._edit_page(post)
+
+        if path == "/wp-admin/post.php":
+            if method == 'POST':
+                post_id = int(form.get('post_ID', ['0'])[0])
+                with self.lock:
+                    post = self.posts.get(post_id)
+                if post is None:
+                    return 404, {}, "Invalid post ID."
+                thumbnail = int(form.get('_thumbnail_id', ['-1'])[0])
+                post.update(
+                    status='publish',
+                    title=form.get('post_title', [""])[0],
+                    price=form.get('_regular_price', [""])[0],
+                    product_cat=[int(v) for v in form.get('tax_input[product_cat][]', [])],
+                    product_brand=[int(v) for v in form.get('tax_input[product_brand][]', [])],
+                    thumbnail=thumbnail if thumbnail > 0 else None,
+                )
+                return 302, {'Location': f"/wp-admin/post.php?post={post_id}&action=edit&message=6"}, b""
+            with self.lock:
+                post = self.posts.get(int(query.get('post', ['0'])[0]))
+            if post is None:
+                return 404, {}, "Invalid post ID."
+            notice = '<div id="message" class="updated notice notice-success"><p>Product published.</p></div>'
+            return 200, {}, self._edit_page(post, notice if 'message' in query else "")
+
+        if path == "/wp-admin/async-upload.php" and method == 'POST':
+            fields = multipart_fields(body, headers.get('Content-Type', ''))
+            # 与WordPress相同：action=upload-attachment（媒体对话框、混合模式）需要media-form nonce，返回 {success, data}
+            if fields.get('action') == b"upload-attachment":
+                if fields.get('_wpnonce') != MEDIA_NONCE.encode():
+                    return 200, {'Content-Type': 'application/json'}, \
+                        '{"success": false, "data": {"message": "The link you followed has expired."}}'
+                body = fields.get('async-upload', b"")
+            media_id = self._new_id()
+            with self.lock:
+                self.media[media_id] = len(body)
+            attachment = {'id': media_id, 'url': f"/wp-content/uploads/{media_id}.png"}
+            if fields.get('action') == b"upload-attachment":
+                attachment = {'success': True, 'data': attachment}
+            return 200, {'Content-Type': 'application/json'}, json.dumps(attachment)
+        if re.fullmatch(r"/wp-content/uploads/\d+\.png", path):
+            return 200, {'Content-Type': 'image/png'}, PIXEL_PNG
+
+        if path == "/wp-admin/admin-ajax.php":
+            action = (form.get('action') or query.get('action') or [""])[0]
+            if action == "rest-nonce":
+                return 200, {'Content-Type': 'text/plain'}, "nonce"
+            match = re.fullmatch(r"add-(product_cat|product_brand)", action)
+            if match:
+                taxonomy = match.group(1)
+                if form.get(f"_ajax_nonce-add-{taxonomy}", [""])[0] != AJAX_NONCE:
+                    return 403, {}, "-1"
+                name = form.get(f"new{taxonomy}", [""])[0].strip()
+                # 与WordPress相同，名称已存在时返回已有的词条
+                with self.lock:
+                    existing = [term_id for term_id, term_name in self.terms[taxonomy] if term_name == name]
+                term_id = existing[0] if existing else self._new_id()
+                if not existing:
+                    with self.lock:
+                        self.terms[taxonomy].append((term_id, name))
+                return 200, {'Content-Type': 'text/xml'}, (
+                    f'<wp_ajax><response action="{action}_{term_id}"><{taxonomy} id="{term_id}"><response_data>'
+                    f'<![CDATA[<li id="{taxonomy}-{term_id}"><label class="selectit"><input value="{term_id}" '
+                    f'type="checkbox" id="in-{taxonomy}-{term_id}" checked> {html.escape(name)}</label></li>]]>'
+                    f'</response_data></{taxonomy}></response></wp_ajax>')
+            return 400, {}, "0"
+
+        if path == "/" and query.get('rest_route') == ["/wc/v3/products"]:
+            page = int(query.get('page', ['1'])[0])
+            per_page = int(query.get('per_page', ['10'])[0])
+            products = [{'id': p['id'], 'name': p['title'], 'sku': ""} for p in self.products]
+            return 200, {'Content-Type': 'application/json'}, json.dumps(
+                products[(page - 1) * per_page:page * per_page])
+
+        return 404, {}, "Not Found"
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def _dispatch(self, method):
+                parsed = urlparse(self.path)
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b""
+                status, headers, content = server.handle(method, parsed.path, parse_qs(parsed.query), body,
+                                                         self.headers)
+                if isinstance(content, str):
+                    content = content.encode('utf-8')
+                self.send_response(status)
+                headers.setdefault('Content-Type', 'text/html; charset=UTF-8')
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def do_GET(self):
+                self._dispatch('GET')
+
+            def do_POST(self):
+                self._dispatch('POST')
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
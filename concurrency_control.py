@@ -0,0 +1,204 @@
+import csv
+import time
+import threading
+import requests
+from selenium.common.exceptions import TimeoutException
+from step_metrics import percentile
+
+# 根据这些步骤的延迟判断服务器负载，都是每个产品都有的一次到服务器的往返：
+# 打开添加产品页面（post-new.php）、通过媒体对话框或混合模式上传图片（async-upload.php）、发布产品（post.php）
+# "处理产品分类"/"处理品牌"只是在已加载的列表中勾选，与服务器负载无关，不统计；
+# 新建分类和品牌只在上传开始前执行一次，不能反映上传过程中的负载，也不统计
+LATENCY_STEPS = ("等待添加新产品页面加载", "上传产品图片", "点击发布按钮")
+# 每个调整周期的记录
+CONCURRENCY_LOG_FILE = "concurrency_log.csv"
+# 服务器过载时发布间隔最多放慢到多少秒
+MAX_PACE = 10.0
+# 放慢发布间隔时的起点（秒），间隔小于此值时恢复为--rate-limit
+MIN_PACE = 0.5
+
+_LOG_FIELDS = ['elapsed_seconds', 'completed', 'per_minute', 'overloads', 'latency', 'reason',
+               'limit_before', 'limit_after', 'publish_interval']
+
+
+# 判断错误是否说明服务器过载：超时、429或5xx
+def overload_error(e):
+    if isinstance(e, (TimeoutException, requests.Timeout, TimeoutError)):
+        return True
+    status_code = getattr(e, 'status_code', None)
+    return status_code is not None and (status_code == 429 or status_code >= 500)
+
+
+# 自适应并发控制（AIMD：加性增、乘性减），多个浏览器共享
+# 每interval秒根据LATENCY_STEPS中各步骤的延迟和错误调整同时上传的产品数：
+# - 周期内出现超时/429/5xx，或某个步骤延迟的中位数超过基线（各周期中最低的中位数）的latency_factor倍：
+#   并发数乘以decrease，发布间隔加倍
+# - 否则如果周期内并发数已用满：并发数加1，发布间隔减半（不低于--rate-limit）
+# 减少并发后，正在上传的产品数降到新的上限之前不会再次减少
+# Selenium页面操作看不到HTTP状态码，只能根据延迟和页面等待超时判断；429/5xx只来自混合模式和REST的直接请求
+# max_limit为0时不启用，acquire/release/observe直接返回
+class ConcurrencyController:
+    def __init__(self, max_limit=0, interval=30.0, latency_factor=2.0, decrease=0.5, min_samples=3,
+                 steps=LATENCY_STEPS, rate_limiter=None, log_file=None):
+        self.max_limit = max_limit
+        self.interval = interval
+        self.latency_factor = latency_factor
+        self.decrease = decrease
+        self.min_samples = min_samples
+        self.steps = steps
+        self.rate_limiter = rate_limiter
+        self.log_file = log_file
+        self.cond = threading.Condition()
+        self.reset()
+
+    @property
+    def enabled(self):
+        return self.max_limit > 0
+
+    # 开始新的一次运行：并发数从上限的一半开始，发布间隔从--rate-limit开始
+    def reset(self):
+        with self.cond:
+            self.limit = max(1, (self.max_limit + 1) // 2)
+            self.in_flight = 0
+            self.peak = 0
+            self.draining = False
+            self.samples = {}
+            self.overloads = 0
+            self.completed = 0
+            self.baseline = {}
+            self.history = []
+            self.pace_floor = self.rate_limiter.min_interval if self.rate_limiter else 0.0
+            self.started = self.interval_start = time.time()
+        if self.enabled and self.log_file:
+            try:
+                with open(self.log_file, "w", newline="", encoding="utf-8-sig") as f:
+                    csv.DictWriter(f, fieldnames=_LOG_FIELDS).writeheader()
+            except OSError as e:
+                print(f"无法创建并发控制记录 {self.log_file}: {e}")
+                self.log_file = None
+
+    # 开始上传一个产品，同时上传的产品数达到当前上限时等待
+    def acquire(self):
+        if not self.enabled:
+            return
+        with self.cond:
+            while self.in_flight >= self.limit:
+                self.cond.wait(1.0)
+                self._maybe_adjust()
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+
+    # 一个产品上传结束
+    def release(self, uploaded):
+        if not self.enabled:
+            return
+        with self.cond:
+            self.in_flight -= 1
+            if uploaded:
+                self.completed += 1
+            self._maybe_adjust()
+            self.cond.notify_all()
+
+    # 记录一次步骤尝试的用时和错误（见step_retry.retry_step），只统计LATENCY_STEPS中的步骤
+    def observe(self, step, seconds, error=None):
+        if not self.enabled or step not in self.steps:
+            return
+        with self.cond:
+            if error is None:
+                self.samples.setdefault(step, []).append(seconds)
+            elif overload_error(error):
+                self.overloads += 1
+            self._maybe_adjust()
+
+    def _maybe_adjust(self):
+        now = time.time()
+        if now - self.interval_start >= self.interval:
+            self._adjust(now)
+            self.cond.notify_all()
+
+    # 一个周期结束：按本周期的延迟和错误调整并发数与发布间隔，并记录结果
+    def _adjust(self, now):
+        elapsed = now - self.interval_start
+        latency = {}
+        slow = []
+        for step, values in self.samples.items():
+            if len(values) < self.min_samples:
+                continue
+            median = percentile(sorted(values), 0.5)
+            self.baseline[step] = min(self.baseline.get(step, median), median)
+            latency[step] = median
+            if median > self.baseline[step] * self.latency_factor:
+                slow.append(step)
+
+        limit_before = self.limit
+        if self.overloads and self.draining:
+            # 上次减少并发时正在上传的产品还没有全部结束，这些错误仍是之前的并发造成的
+            reason = f"超时/429/5xx {self.overloads} 次，上次减少的并发尚未生效，保持不变"
+        elif self.overloads:
+            reason = f"超时/429/5xx {self.overloads} 次，减少并发"
+            self._back_off()
+        elif slow:
+            reason = f"{'、'.join(slow)}延迟升高，减少并发"
+            self._back_off()
+        elif self.peak >= self.limit and self.limit < self.max_limit:
+            reason = "延迟正常，增加并发"
+            self.limit += 1
+            self._speed_up()
+        elif self.limit >= self.max_limit:
+            reason = "延迟正常，已达到浏览器数量上限"
+            self._speed_up()
+        else:
+            reason = "并发未用满，保持不变"
+
+        per_minute = self.completed / elapsed * 60 if elapsed > 0 else 0.0
+        pace = self.rate_limiter.min_interval if self.rate_limiter else 0.0
+        latency_text = "，".join(f"{step} {median:.1f}秒（基线 {self.baseline[step]:.1f}秒）"
+                                for step, median in latency.items()) or "延迟样本不足"
+        print(f"并发控制 [{now - self.started:.0f}秒]: 完成 {self.completed} 个产品（{per_minute:.1f} 个/分钟），"
+              f"{latency_text}；{reason}: {limit_before} -> {self.limit}，发布间隔 {pace:.2f} 秒")
+        entry = {
+            'elapsed_seconds': round(now - self.started, 1),
+            'completed': self.completed,
+            'per_minute': round(per_minute, 2),
+            'overloads': self.overloads,
+            'latency': "; ".join(f"{step}={median:.3f}/{self.baseline[step]:.3f}" for step, median in latency.items()),
+            'reason': reason,
+            'limit_before': limit_before,
+            'limit_after': self.limit,
+            'publish_interval': round(pace, 3),
+        }
+        self.history.append(entry)
+        if self.log_file:
+            try:
+                with open(self.log_file, "a", newline="", encoding="utf-8-sig") as f:
+                    csv.DictWriter(f, fieldnames=_LOG_FIELDS).writerow(entry)
+            except OSError as e:
+                print(f"写入并发控制记录失败: {e}")
+
+        self.samples = {}
+        self.overloads = 0
+        self.completed = 0
+        self.peak = self.in_flight
+        self.draining = self.in_flight > self.limit
+        self.interval_start = now
+
+    def _back_off(self):
+        self.limit = max(1, int(self.limit * self.decrease))
+        if self.rate_limiter:
+            self.rate_limiter.min_interval = min(MAX_PACE, max(self.rate_limiter.min_interval * 2, MIN_PACE))
+
+    def _speed_up(self):
+        if self.rate_limiter and self.rate_limiter.min_interval > self.pace_floor:
+            pace = self.rate_limiter.min_interval / 2
+            self.rate_limiter.min_interval = pace if pace >= max(MIN_PACE, self.pace_floor) else self.pace_floor
+
+    # 运行结束时输出并发数的变化范围
+    def report(self):
+        if not self.enabled or not self.history:
+            return
+        limits = [entry['limit_after'] for entry in self.history]
+        print(f"并发控制: 共 {len(self.history)} 个周期，并发数 {min(limits)}-{max(limits)}，最终 {self.limit}"
+              + (f"，每个周期的记录已保存到 {self.log_file}" if self.log_file else ""))
+
+
+concurrency = ConcurrencyController()
@@ -0,0 +1,167 @@
+import os
+import csv
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+from media_manifest import MediaManifest, MANIFEST_FILE, file_sha256
+from woo_api import WooClient
+from pipeline import iter_sheet_tasks
+
+# 导出的CSV文件，在 WooCommerce -> 产品 -> 导入 中上传，由服务器一次性创建全部产品
+EXPORT_FILE = "woocommerce_products.csv"
+# WooCommerce产品导入器能自动识别的列名（与后台导出的CSV相同）
+CSV_COLUMNS = ["Type", "Name", "Published", "Regular price", "Categories", "Brands", "Images"]
+
+
+# 分类、品牌列中用逗号分隔多个值，名称本身的逗号需要转义为 "\,"
+# 导入器把 ">" 当作父子分类的分隔符（"父分类 > 子分类"）且不支持转义，名称中的 ">" 写成 "&gt;"：
+# WordPress保存词条名称时本来就把 ">" 转义为 "&gt;"，导入后的名称与后台或REST创建的同名词条相同
+def csv_list_value(name):
+    return name.replace(",", "\\,").replace(">", "&gt;")
+
+
+# 图片已放到静态服务器（或CDN）上：图片URL = base_url + 文件名
+def static_image_url(base_url):
+    base_url = base_url.rstrip("/") + "/"
+
+    def image_url(image_path):
+        return base_url + quote(os.path.basename(image_path))
+    return image_url
+
+
+# 图片已预上传到媒体库：按内容哈希从媒体清单中查找附件URL，导入时WooCommerce直接使用已有的附件，不再下载
+# 传入upload_media（媒体清单包装后的上传函数）时，清单中没有的图片先上传；否则返回None
+def manifest_image_url(manifest, upload_media=None):
+    def image_url(image_path):
+        if upload_media is not None:
+            return upload_media(image_path).get('source_url')
+        cached = manifest.get(file_sha256(image_path))
+        return cached['source_url'] if cached else None
+    return image_url
+
+
+# 按原顺序为每个任务查找图片URL，产出 (任务, 图片URL或None, 错误)
+# workers大于1时（上传图片）并发处理，最多领先workers×2个任务，不会一次读入全部任务
+def resolve_image_urls(tasks, image_url, workers=1):
+    def resolve(task):
+        try:
+            return task, image_url(task.image_path), None
+        except Exception as e:
+            return task, None, e
+
+    if workers <= 1:
+        for task in tasks:
+            yield resolve(task)
+        return
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for task in tasks:
+            pending.append(executor.submit(resolve, task))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+# 把上传任务逐行写成WooCommerce导入CSV：名称、价格、分类（英文品名）、品牌和图片URL
+# tasks可以是上传计划的任务列表，也可以是流式读取表格的生成器；每处理一行立即写入文件，内存占用与行数无关
+# 有skip_reason的任务和找不到图片URL的任务不写入，返回 (写入行数, {跳过原因: 数量})
+def export_woocommerce_csv(tasks, output_file, image_url, workers=1):
+    written = 0
+    skipped = {}
+    start_time = time.time()
+
+    def skip(task, reason):
+        skipped[reason] = skipped.get(reason, 0) + 1
+        if skipped[reason] <= 10:
+            print(f"跳过行 {task.excel_row} ({task.key}): {reason}")
+
+    def rows():
+        for task in tasks:
+            if task.skip_reason:
+                skip(task, task.skip_reason)
+                continue
+            yield task
+
+    with open(output_file, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_COLUMNS)
+        for task, url, error in resolve_image_urls(rows(), image_url, workers):
+            if error is not None:
+                skip(task, f"获取图片URL失败: {error}")
+                continue
+            if not url:
+                skip(task, "图片未预上传到媒体库")
+                continue
+            writer.writerow([
+                "simple",
+                task.title,
+                1,
+                task.price,
+                csv_list_value(task.english_name),
+                csv_list_value(task.brand),
+                url,
+            ])
+            written += 1
+            if written % 10000 == 0:
+                print(f"已写入 {written} 行...")
+
+    print(f"已导出 {written} 个产品到 {output_file}，用时 {time.time() - start_time:.1f} 秒")
+    for reason, count in sorted(skipped.items(), key=lambda item: -item[1]):
+        print(f"  跳过（{reason}）: {count} 个")
+    return written, skipped
+
+
+# 根据命令行参数选择图片URL的来源：指定了image_base_url时使用静态服务器，否则询问网站地址并使用媒体清单
+# preupload为True时询问应用程序密码，清单中没有的图片先通过REST API上传，返回 (image_url, 媒体清单或None)
+def choose_image_url(image_base_url=None, preupload=False, manifest_file=MANIFEST_FILE, media_workers=4):
+    if image_base_url:
+        return static_image_url(image_base_url), None
+    wp_url = input("请输入WordPress网站地址 (例如: https://example.com): ")
+    manifest = MediaManifest(wp_url, manifest_file)
+    upload_media = None
+    if preupload:
+        username = input("请输入WordPress用户名: ")
+        app_password = input("请输入WordPress应用程序密码 (用于预上传图片): ")
+        client = WooClient(wp_url, username, app_password, pool_size=media_workers)
+        upload_media = manifest.wrap(client.upload_media)
+    return manifest_image_url(manifest, upload_media), manifest
+
+
+# 导出命令：流式读取xlsx（同时写出行中嵌入的图片），不经过pandas，适合十万行以上的表格
+def main():
+    parser = argparse.ArgumentParser(description="导出WooCommerce产品导入CSV，在后台一次性导入全部产品")
+    parser.add_argument("command", choices=["export-csv"], help="export-csv: 把产品表格和映射表导出为导入CSV")
+    parser.add_argument("--excel", default="a.xlsx", help="产品表格")
+    parser.add_argument("--mapping", default="name_mapping_new.xlsx", help="中英文品名映射表")
+    parser.add_argument("--image-folder", default="product_images", help="图片文件夹，表格中嵌入的图片也写到这里")
+    parser.add_argument("--output", default=EXPORT_FILE, help="导出的CSV文件")
+    parser.add_argument("--image-base-url",
+                        help="图片所在静态服务器的地址（例如 https://cdn.example.com/products/），"
+                             "图片URL为该地址加文件名；不指定时从媒体清单中查找预上传的图片")
+    parser.add_argument("--preupload-media", action="store_true",
+                        help="不指定--image-base-url时，媒体清单中没有的图片先用REST API上传（需要应用程序密码）")
+    parser.add_argument("--manifest", default=MANIFEST_FILE, help="媒体清单文件路径")
+    parser.add_argument("--media-workers", type=int, default=4, help="上传图片的并发线程数")
+    args = parser.parse_args()
+
+    # 映射表的读取方式与上传脚本相同
+    from main_with_images import read_mapping
+    name_map = read_mapping(args.mapping)
+    if not name_map:
+        print("映射表为空或读取失败，无法继续")
+        return
+    image_url, manifest = choose_image_url(args.image_base_url, args.preupload_media, args.manifest,
+                                           args.media_workers)
+    try:
+        export_woocommerce_csv(iter_sheet_tasks(args.excel, name_map, args.image_folder), args.output, image_url,
+                               args.media_workers if args.preupload_media else 1)
+    finally:
+        if manifest is not None:
+            manifest.close()
+
+
+if __name__ == "__main__":
+    main()
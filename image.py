@@ -1,53 +1,109 @@
 import os
+import time
+import argparse
 import pandas as pd
 from openpyxl import load_workbook
 from PIL import Image
 import io
-import re
-
-# 创建保存图片的目录
-output_dir = "product_images"
-if not os.path.exists(output_dir):
-    os.makedirs(output_dir)
-
-# 加载Excel文件
-file_path = "a.xlsx"
-wb = load_workbook(file_path)
-ws = wb.active
-
-# 读取Excel数据获取所需列
-df = pd.read_excel(file_path)
-# 假设第一列是品牌，第二列是型号，第四列是品名
-# 如果列的位置不同，请调整下面的索引
-brands = df.iloc[:, 0]  # 获取第一列作为品牌
-model_numbers = df.iloc[:, 1]  # 获取第二列作为型号
-product_names = df.iloc[:, 3]  # 获取第四列作为品名
-
-# 修复文件路径错误问题
-
-
-# 提取图片
-for row_idx, (brand, model, product_name) in enumerate(zip(brands, model_numbers, product_names), start=2):
-    # 检查单元格是否含有图片
-    if ws._images:
-        for img in ws._images:
-            # Excel中图片的位置是基于单元格的，检查图片是否在当前行的第五列
-            if img.anchor._from.row == row_idx - 1 and img.anchor._from.col == 4:  # 列从0开始索引
-                # 提取图片数据
-                img_data = img._data()
-                # 保存图片
-                brand_str = str(brand).strip()
-                model_str = str(model).strip()
-                product_name_str = str(product_name).strip()
-                
-                if model_str:  # 确保型号不为空
-                    # 创建"品牌-型号-品名"格式的文件名
-                    file_name = f"{brand_str}-{model_str}-{product_name_str}"
-                    # 替换Windows文件系统不允许的字符，包括斜杠
-                    safe_file_name = re.sub(r'[\\/*?:"<>|]', '_', file_name)
-                    img_path = os.path.join(output_dir, f"{safe_file_name}.jpg")
-                    with open(img_path, "wb") as f:
-                        f.write(img_data)
-                    print(f"已保存图片: {img_path}")
-
-print("所有图片已提取完成！")
+from xlsx_stream import extract_images_streaming
+from wp_utils import image_file_name
+
+# 图片所在的列（从0开始索引，4即第五列E列）
+ANCHOR_COL = 4
+
+
+# 建立 (行, 列) -> 图片 的索引，只遍历一次图片列表
+# 同一单元格有多张图片时保留最后一张（与原来逐张覆盖保存的结果相同）
+def build_anchor_index(images):
+    anchor_index = {}
+    for img in images:
+        anchor_index[(img.anchor._from.row, img.anchor._from.col)] = img
+    return anchor_index
+
+
+# 按数据行依次取出对应单元格中的图片：产出 (Excel行号, 品牌, 型号, 品名, 图片)
+def iter_row_images(brands, model_numbers, product_names, anchor_index, anchor_col=ANCHOR_COL):
+    for row_idx, (brand, model, product_name) in enumerate(zip(brands, model_numbers, product_names), start=2):
+        # Excel中图片的位置是基于单元格的，锚点行从0开始索引，第row_idx行对应row_idx - 1
+        img = anchor_index.get((row_idx - 1, anchor_col))
+        if img is not None:
+            yield row_idx, brand, model, product_name, img
+
+
+# 把工作表中的图片按行保存到output_dir，返回保存的图片数量
+def extract_row_images(df, images, output_dir, anchor_col=ANCHOR_COL, verbose=True):
+    # 假设第一列是品牌，第二列是型号，第四列是品名
+    # 如果列的位置不同，请调整下面的索引
+    brands = df.iloc[:, 0]  # 获取第一列作为品牌
+    model_numbers = df.iloc[:, 1]  # 获取第二列作为型号
+    product_names = df.iloc[:, 3]  # 获取第四列作为品名
+
+    anchor_index = build_anchor_index(images)
+    saved = 0
+    for row_idx, brand, model, product_name, img in iter_row_images(
+            brands, model_numbers, product_names, anchor_index, anchor_col):
+        safe_file_name = image_file_name(brand, model, product_name)
+        if not safe_file_name:
+            continue
+        img_path = os.path.join(output_dir, f"{safe_file_name}.jpg")
+        with open(img_path, "wb") as f:
+            f.write(img._data())
+        saved += 1
+        if verbose:
+            print(f"已保存图片: {img_path}")
+    return saved
+
+
+# 从Excel文件中提取图片
+def extract_images(file_path="a.xlsx", output_dir="product_images", anchor_col=ANCHOR_COL):
+    # 创建保存图片的目录
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    start_time = time.time()
+    # 加载Excel文件
+    wb = load_workbook(file_path)
+    ws = wb.active
+    # 读取Excel数据获取所需列
+    df = pd.read_excel(file_path)
+    load_time = time.time() - start_time
+
+    saved = extract_row_images(df, ws._images, output_dir, anchor_col)
+    total_time = time.time() - start_time
+    print(f"共 {len(df)} 行、{len(ws._images)} 张图片，保存 {saved} 张；"
+          f"读取用时 {load_time:.2f} 秒，提取用时 {total_time - load_time:.2f} 秒")
+    return saved
+
+
+# 流式提取：直接读取xlsx压缩包，不使用openpyxl和pandas，内存占用不随图片数量增长
+def extract_images_stream(file_path="a.xlsx", output_dir="product_images", anchor_col=ANCHOR_COL):
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    start_time = time.time()
+    # 第一列是品牌，第二列是型号，第四列是品名
+    saved, row_count, image_count = extract_images_streaming(
+        file_path, output_dir, anchor_col, (0, 1, 3), image_file_name)
+    print(f"共 {row_count} 行、{image_count} 张图片，保存 {saved} 张；用时 {time.time() - start_time:.2f} 秒")
+    return saved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="从Excel中提取产品图片")
+    parser.add_argument("--file", default="a.xlsx", help="Excel文件路径")
+    parser.add_argument("--output", default="product_images", help="图片保存目录")
+    parser.add_argument("--anchor-col", type=int, default=ANCHOR_COL,
+                        help="图片所在的列，从0开始索引（默认4，即E列）")
+    parser.add_argument("--mode", choices=["openpyxl", "stream"], default="openpyxl",
+                        help="openpyxl: 加载整个工作簿; stream: 直接流式读取xlsx压缩包，适合图片很多的大文件")
+    args = parser.parse_args()
+
+    if args.mode == "stream":
+        extract_images_stream(args.file, args.output, args.anchor_col)
+    else:
+        extract_images(args.file, args.output, args.anchor_col)
+    print("所有图片已提取完成！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import os
+import time
+import shutil
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageOps
+from media_manifest import file_sha256
+from media_upload import media_key
+
+# 预处理后的图片缓存目录
+CACHE_DIR = "product_images_cache"
+# 默认最长边（像素），WooCommerce默认的产品大图为600~1200像素，更大的原图只会拖慢上传和缩略图生成
+MAX_EDGE = 1600
+# 输出格式 -> (Pillow格式名, 扩展名)
+OUTPUT_FORMATS = {
+    'jpeg': ('JPEG', '.jpg'),
+    'webp': ('WEBP', '.webp'),
+}
+
+
+# 缓存路径：<缓存目录>/<原图SHA-256>-<参数>/<原文件名>.<扩展名>
+# 保留原文件名，上传到媒体库后的文件名和标题与原来一致；参数变化时自动生成新的缓存
+def cached_path(cache_dir, sha256, file_name, max_edge, output_format, quality):
+    stem = os.path.splitext(file_name)[0]
+    key = f"{sha256}-{max_edge}-{output_format}-q{quality}"
+    return os.path.join(cache_dir, key, stem + OUTPUT_FORMATS[output_format][1])
+
+
+# 有透明通道或调色板的图片铺在白色背景上，转换为RGB
+def to_rgb(img):
+    if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+        img = img.convert('RGBA')
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel('A'))
+        return background
+    if img.mode != 'RGB':
+        return img.convert('RGB')
+    return img
+
+
+# 处理单张图片（在子进程中运行）：识别真实格式、缩小到最长边、重新编码
+# 返回 (原路径, 输出路径, 真实格式, 原大小, 输出大小, 用时, 是否命中缓存)
+def preprocess_image(image_path, cache_dir=CACHE_DIR, max_edge=MAX_EDGE, output_format='jpeg', quality=85):
+    start_time = time.time()
+    source_size = os.path.getsize(image_path)
+    out_path = cached_path(cache_dir, file_sha256(image_path), os.path.basename(image_path),
+                           max_edge, output_format, quality)
+    if os.path.exists(out_path):
+        return image_path, out_path, None, source_size, os.path.getsize(out_path), time.time() - start_time, True
+
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    with Image.open(image_path) as img:
+        # image.py保存的文件扩展名都是.jpg，实际格式以文件内容为准
+        detected_format = img.format
+        resized = img.width > max_edge or img.height > max_edge
+        # 按EXIF方向旋转，动图只取第一帧
+        img.seek(0)
+        processed = to_rgb(ImageOps.exif_transpose(img))
+        if resized:
+            processed.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+        pil_format = OUTPUT_FORMATS[output_format][0]
+        tmp_path = out_path + f".{os.getpid()}.tmp"
+        if pil_format == 'JPEG':
+            processed.save(tmp_path, 'JPEG', quality=quality, optimize=True, progressive=True)
+        else:
+            processed.save(tmp_path, 'WEBP', quality=quality, method=6)
+
+    # 原图已经是目标格式、无需缩小且比重新编码后更小时，直接使用原图
+    if not resized and detected_format == pil_format and os.path.getsize(tmp_path) >= source_size:
+        shutil.copyfile(image_path, tmp_path)
+    # 先写临时文件再改名，多个进程处理相同内容的图片时不会读到半个文件
+    os.replace(tmp_path, out_path)
+    return image_path, out_path, detected_format, source_size, os.path.getsize(out_path), time.time() - start_time, False
+
+
+# 用进程池并发预处理图片，返回 {原图绝对路径: 处理后的图片路径}
+def preprocess_images(image_paths, cache_dir=CACHE_DIR, max_edge=MAX_EDGE, output_format='jpeg', quality=85,
+                      workers=None):
+    print(f"开始预处理 {len(image_paths)} 张图片（最长边 {max_edge}px，{output_format}，质量 {quality}）...")
+    start_time = time.time()
+    processed = {}
+    formats = {}
+    cache_hits = 0
+    failed = 0
+    source_total = 0
+    output_total = 0
+    image_time = 0.0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [(image_path, executor.submit(preprocess_image, image_path, cache_dir, max_edge,
+                                                output_format, quality)) for image_path in image_paths]
+        for image_path, future in futures:
+            try:
+                source, out_path, detected_format, source_size, output_size, elapsed, cached = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"预处理图片失败，使用原图: {image_path}: {e}")
+                continue
+            processed[media_key(source)] = out_path
+            source_total += source_size
+            output_total += output_size
+            image_time += elapsed
+            if cached:
+                cache_hits += 1
+            else:
+                formats[detected_format] = formats.get(detected_format, 0) + 1
+
+    elapsed = time.time() - start_time
+    saved = source_total - output_total
+    print(f"预处理完成: 成功 {len(processed)} 张（缓存命中 {cache_hits} 张），失败 {failed} 张，用时 {elapsed:.1f} 秒")
+    if formats:
+        print("原图实际格式: " + "，".join(f"{name} {count} 张" for name, count in sorted(formats.items())))
+    if processed:
+        print(f"图片大小 {source_total / 1024 / 1024:.1f}MB -> {output_total / 1024 / 1024:.1f}MB，"
+              f"节省 {saved / 1024 / 1024:.1f}MB ({saved / source_total:.0%})，"
+              f"平均每张 {image_time / len(processed) * 1000:.0f} 毫秒")
+    return processed
+
+
+# 把产品数据中的图片路径替换为预处理后的图片，处理失败的保留原图
+def apply_preprocessed_paths(df, processed):
+    df['图片路径'] = [processed.get(media_key(path), path) if path else path for path in df['图片路径']]
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="预处理产品图片：识别真实格式、缩小尺寸并重新压缩")
+    parser.add_argument("--input", default="product_images", help="原图目录")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="处理结果的缓存目录")
+    parser.add_argument("--max-edge", type=int, default=MAX_EDGE, help="最长边（像素）")
+    parser.add_argument("--format", choices=list(OUTPUT_FORMATS), default="jpeg", help="输出格式")
+    parser.add_argument("--quality", type=int, default=85, help="压缩质量 (1-100)")
+    parser.add_argument("--workers", type=int, default=None, help="进程数，默认等于CPU核数")
+    args = parser.parse_args()
+
+    image_paths = [os.path.join(args.input, name) for name in sorted(os.listdir(args.input))
+                   if os.path.isfile(os.path.join(args.input, name))]
+    preprocess_images(image_paths, args.cache_dir, args.max_edge, args.format, args.quality, args.workers)
+
+
+if __name__ == "__main__":
+    main()
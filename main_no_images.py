@@ -1,15 +1,30 @@
 import os
+import sys
+import argparse
 import pandas as pd
 import time
 import random
 import shutil
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
 import openpyxl
 from openpyxl_image_loader import SheetImageLoader
+from woo_api import WooClient, upload_via_rest, upload_via_rest_batch, BATCH_LIMIT
+from wp_utils import normalize_wp_url, build_image_paths, image_paths_exist
+from wp_browser import (open_session, read_post_id, measure_page_load, BrowserRecycler, SESSION_CACHE_FILE,
+                        BROWSER_LOG_FILE)
+from worker_pool import run_worker_pool, StopUpload
+from run_journal import RunJournal, skip_completed_rows, record_post_id, JOURNAL_FILE
+from upload_plan import build_upload_plan, print_plan
+from product_index import ProductIndex, skip_existing, load_products_browser, load_products_rest
+from taxonomy_index import TaxonomyIndex, precreate_missing_terms
+from step_metrics import step_stats, REPORT_FILE, METRICS_FILE
+from step_retry import retry_step, retry_policy, circuit_breaker, RetryQueue
+from concurrency_control import concurrency, CONCURRENCY_LOG_FILE
+from wp_ajax import AdminAjaxSession
+from wait_engine import (wait_until, wait_stats, rate_limiter, scroll_into_view, scroll_by,
+                         PAGE_READY, PUBLISH_NOTICE, AJAX_IDLE, button_enabled)
 
 # 读取Excel文件
 def read_excel(file_path):
@@ -29,43 +44,11 @@ def prepare_product_data(df, image_folder="product_images"):
         os.makedirs(image_folder)
         print(f"创建图片文件夹: {image_folder}")
     
-    # 添加图片路径列和图片状态列
-    df['图片路径'] = ""
-    df['有图片'] = False
-    
     print("准备产品数据...")
     
-    # 为每个产品生成图片路径
-    for index, row in df.iterrows():
-        try:
-            # 获取产品信息
-            brand = str(row['品牌']) if pd.notna(row['品牌']) else ""
-            model = str(row['型号']) if pd.notna(row['型号']) else ""
-            name = str(row['品名']) if pd.notna(row['品名']) else ""
-            
-            # 创建标准化的文件名
-            brand_clean = brand.replace('/', '_').strip()
-            model_clean = model.replace('/', '_').strip()
-            name_clean = name.replace('/', '_').strip()
-            
-            # 生成图片文件名
-            image_filename = f"{brand_clean}-{model_clean}-{name_clean}.jpg"
-            
-            # 生成图片路径
-            image_path = os.path.join(image_folder, image_filename)
-            
-            # 保存图片路径
-            df.at[index, '图片路径'] = image_path
-            
-            # 检查图片是否存在
-            if os.path.exists(image_path):
-                df.at[index, '有图片'] = True
-                print(f"产品 '{brand} {model} {name}' 已有图片，将跳过上传")
-            else:
-                print(f"产品 '{brand} {model} {name}' 没有图片，将进行上传")
-            
-        except Exception as e:
-            print(f"处理产品数据时出错 (行 {index+2}): {e}")
+    # 整列生成图片路径，并用一次目录读取判断图片是否存在
+    df['图片路径'] = build_image_paths(df, image_folder)
+    df['有图片'] = image_paths_exist(df['图片路径'])
     
     print(f"已准备 {len(df)} 个产品的数据")
     print(f"其中 {df['有图片'].sum()} 个产品有图片（将跳过），{len(df) - df['有图片'].sum()} 个产品没有图片（将上传）")
@@ -132,634 +115,540 @@ def read_mapping(mapping_file):
         print(f"读取映射表时出错: {e}")
         return {}
 
-# 使用Selenium上传产品到WordPress
-def upload_to_wordpress(df, name_map, wp_url, username, password):
-    # 添加更多的Selenium配置选项
-    options = webdriver.ChromeOptions()
-    options.add_argument("--start-maximized")  # 最大化窗口
-    options.add_argument("--disable-extensions")  # 禁用扩展
-    options.add_argument("--disable-gpu")  # 禁用GPU加速
-    options.add_argument("--no-sandbox")  # 禁用沙盒模式
-    options.add_argument("--disable-dev-shm-usage")  # 禁用/dev/shm使用
-    
-    print("正在初始化Chrome浏览器...")
-    
+# 上传单个没有图片的产品（在已登录的浏览器中完成标题、价格、分类、品牌和发布），返回是否上传成功
+# taxonomies为 {'product_cat': TaxonomyIndex, 'product_brand': TaxonomyIndex}，所有浏览器共享
+def upload_product(driver, wp_url, task, taxonomies, status=None):
+    # status用于返回产品ID（post_id）和失败时的操作（operation），供上传日志记录
+    status = {} if status is None else status
+    uploaded = False
+    steps = step_stats.timer()
     try:
-        driver = webdriver.Chrome(options=options)
-        print("Chrome浏览器已成功启动")
-        
-        # 确保URL格式正确
-        if not wp_url.startswith(('http://', 'https://')):
-            # 对于本地地址，使用http://前缀
-            if wp_url.startswith(('localhost', '127.0.0.1')):
-                wp_url = 'http://' + wp_url
-            else:
-                wp_url = 'https://' + wp_url
-                
-        # 移除URL末尾可能的/wp-admin部分，因为后面会添加
-        if wp_url.endswith('/wp-admin'):
-            wp_url = wp_url[:-9]
-        elif '/wp-admin/' in wp_url:
-            wp_url = wp_url.split('/wp-admin/')[0]
-            
-        print(f"使用的WordPress网址: {wp_url}")
+        # 产品字段已在上传计划中解析好（缺少图片或英文名的行不会进入这里）
+        brand = task.brand
+        model = task.model
+        price = task.price
+        chinese_name = task.chinese_name
+        english_name = task.english_name
+        image_path = task.image_path
+        current_operation = steps.start("获取产品基本信息")
+        print(f"从C列读取的价格: {price}")
         
-        # 登录WordPress
-        print("正在登录WordPress...")
-        login_url = f"{wp_url}/wp-login.php"
-        print(f"访问登录页面: {login_url}")
-        driver.get(login_url)
+        print(f"正在上传产品: {english_name} (原名: {chinese_name})")
+        print(f"产品没有图片，将进行上传")
+        # 导航到添加新产品页面并确认页面已加载，失败时按退避时间重新打开
+        def open_new_product_page():
+            print("导航到添加新产品页面...")
+            driver.get(f"{wp_url}/wp-admin/post-new.php?post_type=product")
+            # 等待页面标题元素加载，确认已经在添加新产品页面
+            WebDriverWait(driver, 15).until(
+                EC.presence_of_element_located((By.ID, "title"))
+            )
+            # 额外检查页面URL
+            current_url = driver.current_url
+            if "post-new.php" not in current_url or "post_type=product" not in current_url:
+                raise Exception(f"当前URL: {current_url}，不是添加新产品页面")
+            # 确保页面完全加载（文档加载完成且没有进行中的ajax请求）
+            wait_until(driver, PAGE_READY, timeout=15, budget=2)
         
-        # 等待登录页面加载
         try:
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.ID, "user_login"))
+            current_operation = steps.start("等待添加新产品页面加载")
+            retry_step(current_operation, open_new_product_page)
+            print("已确认进入添加新产品页面")
+        except Exception as page_error:
+            print(f"无法进入添加新产品页面: {page_error}")
+            print(f"当前处理的产品: {chinese_name} ({english_name})")
+            print("跳过当前产品，稍后重试")
+            status['operation'] = current_operation
+            status['error'] = str(page_error)
+            steps.finish(False, current_operation)
+            return False  # 如果无法进入添加产品页面，直接跳过当前产品
+        
+        # 移除点击"添加新产品"按钮的部分，因为已经在添加新产品页面了
+        
+        # 3. 填写产品信息
+        print("3. 填写产品信息...")
+        current_operation = steps.start("填写产品标题")
+        # 标题 - 使用英文品名（"品牌 型号 英文品名"）
+        product_title = task.title
+        
+        def fill_title():
+            title_field = WebDriverWait(driver, 10).until(
+                EC.presence_of_element_located((By.ID, "title"))
             )
-            print("登录页面已加载")
-        except TimeoutException:
-            print(f"无法加载登录页面: {login_url}")
-            print(f"当前页面标题: {driver.title}")
-            print(f"当前URL: {driver.current_url}")
-            raise Exception("登录页面加载失败")
+            title_field.clear()
+            title_field.send_keys(product_title)
         
-        # 输入登录信息
-        driver.find_element(By.ID, "user_login").send_keys(username)
-        driver.find_element(By.ID, "user_pass").send_keys(password)
-        driver.find_element(By.ID, "wp-submit").click()
+        retry_step(current_operation, fill_title)
+        print(f"已填写产品标题: {product_title}")
         
-        # 等待登录完成
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.ID, "wpadminbar"))
-        )
-        print("登录成功")
+        # 跳过描述填写
+        print("跳过产品描述填写")
         
-        # 先导航到产品页面，确保完全进入后台
-        print("导航到WordPress产品管理页面...")
-        driver.get(f"{wp_url}/wp-admin/edit.php?post_type=product")
+        # 4. 设置产品价格 - 直接滚动到常规售价输入框
+        print("4. 设置产品价格...")
+        current_operation = steps.start("滚动到常规售价输入框")
         
-        # 等待产品管理页面加载完成
+        # 尝试直接滚动到常规售价输入框
         try:
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "a.page-title-action"))
+            # 尝试找到价格字段或其标签
+            price_field_or_label = None
+            try:
+                # 先尝试找价格字段
+                price_field_or_label = driver.find_element(By.ID, "_regular_price")
+            except:
+                # 如果找不到价格字段，尝试找标签
+                try:
+                    price_field_or_label = driver.find_element(By.XPATH, "//label[contains(text(), '常规售价') or contains(text(), 'Regular price')]")
+                except:
+                    # 如果都找不到，尝试找产品数据面板
+                    price_field_or_label = driver.find_element(By.ID, "product_data")
+            
+            # 滚动到元素位置
+            if price_field_or_label:
+                scroll_into_view(driver, price_field_or_label)
+                print("已滚动页面到价格字段区域")
+        except Exception as scroll_error:
+            print(f"滚动页面到价格字段时出错: {scroll_error}")
+            # 尝试通用滚动
+            try:
+                scroll_by(driver, 500)
+                print("已执行通用页面滚动")
+            except:
+                print("无法滚动页面")
+        
+        # 聚焦并填写价格
+        current_operation = steps.start("设置产品价格")
+        def fill_price():
+            # 尝试直接查找价格字段
+            price_field = WebDriverWait(driver, 5).until(
+                EC.presence_of_element_located((By.ID, "_regular_price"))
             )
-            print("已成功进入产品管理页面")
-            time.sleep(2)  # 额外等待确保页面完全加载
-        except TimeoutException:
-            print("无法找到添加新产品按钮，尝试刷新页面...")
-            driver.refresh()
+            # 聚焦到价格输入框
+            driver.execute_script("arguments[0].focus();", price_field)
+            price_field.clear()
+            price_field.send_keys(price)
+        
+        try:
+            retry_step(current_operation, fill_price)
+            print(f"已设置产品价格: {price}")
+        except Exception as price_error:
+            print(f"设置产品价格时出错: {price_error}")
+            # 尝试通过JavaScript直接设置价格
+            try:
+                driver.execute_script(f"document.getElementById('_regular_price').value = '{price}';")
+                print(f"通过JavaScript设置产品价格: {price}")
+            except Exception as js_price_error:
+                print(f"通过JavaScript设置产品价格时出错: {js_price_error}")
+                print("无法设置产品价格，但将继续上传产品")
+        
+        # 5. 处理产品分类
+        current_operation = steps.start("处理产品分类")
+        print("5. 处理产品分类...")
+        
+        # 使用映射表中的英文名称作为产品分类，通过词条索引按ID直接勾选
+        def select_category():
+            # 等待产品分类面板加载
             WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "a.page-title-action"))
+                EC.presence_of_element_located((By.ID, "product_catchecklist"))
             )
-            time.sleep(2)
+            category_index = taxonomies['product_cat']
+            category_index.ensure_loaded(driver)  # 批量创建步骤已读取过时不会再次读取
+            return category_index.select(driver, english_name)
         
-        # 上传产品
-        upload_count = 0
-        for index, row in df.iterrows():
+        try:
+            category_found = False
+            if english_name:  # 确保英文名不为空
+                print(f"查找产品分类: {english_name}")
+                term_id = retry_step(current_operation, select_category)
+                if term_id:
+                    print(f"已选择产品分类: {english_name} (ID: {term_id})")
+                    category_found = True
+            
+            # 所有分类已在上传前批量创建，这里只勾选已存在的分类
+            if not category_found and english_name:
+                print(f"警告: 未找到产品分类: {english_name}（批量创建时可能失败）")
+        except Exception as cat_error:
+            print(f"处理产品分类时出错: {cat_error}")
+            print("继续上传产品，但产品分类可能未正确设置")
+        
+        # 6. 处理品牌
+        current_operation = steps.start("处理品牌")
+        print("6. 处理品牌...")
+        
+        # 滚动到品牌选择区域
+        try:
+            # 尝试找到品牌面板
+            brand_panel = None
             try:
-                # 在尝试访问数据前先定义变量，避免异常时引用未定义变量
-                brand = ""
-                model = ""
-                price = ""
-                chinese_name = ""
-                english_name = ""
-                image_path = ""
-                current_operation = "获取产品基本信息"
-                
-                # 获取产品信息，添加更多的错误检查
-                brand = str(row['品牌']) if pd.notna(row['品牌']) else ""
-                model = str(row['型号']) if pd.notna(row['型号']) else ""
-                
-                # 从C列读取价格信息
-                try:
-                    # 获取C列的值作为价格
-                    price = str(row.iloc[2]) if pd.notna(row.iloc[2]) else ""
-                    # 如果价格为空，尝试使用单价字段作为备选
-                    if not price and '单价' in row and pd.notna(row['单价']):
-                        price = str(row['单价'])
-                    print(f"从C列读取的价格: {price}")
-                except Exception as price_error:
-                    print(f"警告: 行 {index+2} 读取C列价格时出错: {price_error}")
-                    # 尝试使用单价字段作为备选
-                    if '单价' in row and pd.notna(row['单价']):
-                        price = str(row['单价'])
-                        print(f"使用单价字段作为备选: {price}")
-                    else:
-                        price = ""
-                        print("无法获取价格信息，将使用空值")
-                
-                chinese_name = str(row['品名']) if pd.notna(row['品名']) else ""
-                image_path = str(row['图片路径']) if pd.notna(row['图片路径']) else ""
-                has_image = bool(row['有图片']) if '有图片' in row else False
-                
-                # 跳过有图片的产品
-                if has_image:
-                    print(f"跳过已有图片的产品: {chinese_name}")
-                    continue
-                
-                # 使用映射获取英文名
-                english_name = name_map.get(chinese_name, "")
-                if not english_name:
-                    print(f"警告: 产品 '{chinese_name}' 没有对应的英文名，跳过上传")
-                    continue
-                
-                print(f"正在上传产品: {english_name} (原名: {chinese_name})")
-                print(f"产品没有图片，将进行上传")
-                current_operation = "准备导航到添加新产品页面"
-                
-                # 直接导航到添加新产品页面
-                print("导航到添加新产品页面...")
-                driver.get(f"{wp_url}/wp-admin/post-new.php?post_type=product")
-                
-                # 确保已经到达添加新产品页面
-                try:
-                    current_operation = "等待添加新产品页面加载"
-                    # 等待页面标题元素加载，确认已经在添加新产品页面
-                    WebDriverWait(driver, 15).until(
-                        EC.presence_of_element_located((By.ID, "title"))
-                    )
-                    # 额外检查页面URL
-                    current_url = driver.current_url
-                    if "post-new.php" in current_url and "post_type=product" in current_url:
-                        print("已确认进入添加新产品页面")
-                    else:
-                        print(f"当前URL: {current_url}，不是添加新产品页面，重新尝试...")
-                        driver.get(f"{wp_url}/wp-admin/post-new.php?post_type=product")
-                        time.sleep(3)
-                        WebDriverWait(driver, 15).until(
-                            EC.presence_of_element_located((By.ID, "title"))
-                        )
-                        if "post-new.php" not in driver.current_url or "post_type=product" not in driver.current_url:
-                            raise Exception("无法导航到添加新产品页面")
-                        print("已重新导航到添加新产品页面")
-                except Exception as page_error:
-                    print(f"无法进入添加新产品页面: {page_error}")
-                    print(f"当前处理的产品: {chinese_name} ({english_name})")
-                    print("跳过当前产品，尝试下一个")
-                    continue  # 如果无法进入添加产品页面，直接跳过当前产品
-                
-                # 确保页面完全加载
-                time.sleep(2)
-                
-                # 移除点击"添加新产品"按钮的部分，因为已经在添加新产品页面了
-                
-                # 3. 填写产品信息
-                print("3. 填写产品信息...")
-                current_operation = "填写产品标题"
-                # 标题 - 使用英文品名
-                title_field = WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located((By.ID, "title"))
-                )
-                title_field.clear()
-                # 修改产品标题格式，将连字符"-"改为空格
-                product_title = f"{brand} {model} {english_name}"
-                title_field.send_keys(product_title)
-                print(f"已填写产品标题: {product_title}")
-                
-                # 跳过描述填写
-                print("跳过产品描述填写")
-                
-                # 4. 设置产品价格 - 直接滚动到常规售价输入框
-                print("4. 设置产品价格...")
-                current_operation = "滚动到常规售价输入框"
-                
-                # 尝试直接滚动到常规售价输入框
-                try:
-                    # 尝试找到价格字段或其标签
-                    price_field_or_label = None
-                    try:
-                        # 先尝试找价格字段
-                        price_field_or_label = driver.find_element(By.ID, "_regular_price")
-                    except:
-                        # 如果找不到价格字段，尝试找标签
-                        try:
-                            price_field_or_label = driver.find_element(By.XPATH, "//label[contains(text(), '常规售价') or contains(text(), 'Regular price')]")
-                        except:
-                            # 如果都找不到，尝试找产品数据面板
-                            price_field_or_label = driver.find_element(By.ID, "product_data")
-                    
-                    # 滚动到元素位置
-                    if price_field_or_label:
-                        driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", price_field_or_label)
-                        print("已滚动页面到价格字段区域")
-                        time.sleep(1)  # 等待滚动完成
-                except Exception as scroll_error:
-                    print(f"滚动页面到价格字段时出错: {scroll_error}")
-                    # 尝试通用滚动
-                    try:
-                        driver.execute_script("window.scrollBy(0, 500);")
-                        print("已执行通用页面滚动")
-                        time.sleep(1)
-                    except:
-                        print("无法滚动页面")
-                
-                # 聚焦并填写价格
-                current_operation = "设置产品价格"
-                try:
-                    # 尝试直接查找价格字段
-                    price_field = WebDriverWait(driver, 5).until(
-                        EC.presence_of_element_located((By.ID, "_regular_price"))
-                    )
-                    # 聚焦到价格输入框
-                    driver.execute_script("arguments[0].focus();", price_field)
-                    price_field.clear()
-                    price_field.send_keys(price)
-                    print(f"已设置产品价格: {price}")
-                except Exception as price_error:
-                    print(f"设置产品价格时出错: {price_error}")
-                    # 尝试通过JavaScript直接设置价格
-                    try:
-                        driver.execute_script(f"document.getElementById('_regular_price').value = '{price}';")
-                        print(f"通过JavaScript设置产品价格: {price}")
-                    except Exception as js_price_error:
-                        print(f"通过JavaScript设置产品价格时出错: {js_price_error}")
-                        print("无法设置产品价格，但将继续上传产品")
-                
-                # 5. 处理产品分类
-                current_operation = "处理产品分类"
-                print("5. 处理产品分类...")
-                
-                # 等待产品分类面板加载
-                try:
-                    # 查找产品分类面板
-                    WebDriverWait(driver, 10).until(
-                        EC.presence_of_element_located((By.ID, "product_catchecklist"))
-                    )
-                    
-                    # 使用映射表中的英文名称作为产品分类
-                    category_found = False
-                    if english_name:  # 确保英文名不为空
-                        print(f"查找产品分类: {english_name}")
-                        category_items = driver.find_elements(By.CSS_SELECTOR, "#product_catchecklist li label")
-                        
-                        for item in category_items:
-                            item_text = item.text.strip()
-                            if english_name.lower() in item_text.lower():
-                                # 找到匹配的英文分类，点击选择
-                                print(f"找到匹配的产品分类: {item_text}")
-                                checkbox = item.find_element(By.CSS_SELECTOR, "input[type='checkbox']")
-                                if not checkbox.is_selected():
-                                    driver.execute_script("arguments[0].click();", checkbox)
-                                    print(f"已选择产品分类: {item_text}")
-                                else:
-                                    print(f"产品分类已被选中: {item_text}")
-                                category_found = True
-                                break
-                    
-                    # 如果英文分类不存在，则添加新分类
-                    if not category_found and english_name:
-                        print(f"未找到产品分类: {english_name}，将添加新产品分类")
-                        
-                        # 点击"添加新分类"链接
-                        add_new_cat_toggle = WebDriverWait(driver, 5).until(
-                            EC.element_to_be_clickable((By.ID, "product_cat-add-toggle"))
-                        )
-                        driver.execute_script("arguments[0].click();", add_new_cat_toggle)
-                        time.sleep(1)
-                        
-                        # 输入新英文分类
-                        new_cat_input = WebDriverWait(driver, 5).until(
-                            EC.presence_of_element_located((By.ID, "newproduct_cat"))
-                        )
-                        new_cat_input.clear()
-                        new_cat_input.send_keys(english_name)
-                        
-                        # 点击添加按钮
-                        add_cat_button = WebDriverWait(driver, 5).until(
-                            EC.element_to_be_clickable((By.ID, "product_cat-add-submit"))
-                        )
-                        driver.execute_script("arguments[0].click();", add_cat_button)
-                        
-                        # 等待新分类添加完成并被选中
-                        time.sleep(2)
-                        print(f"已添加并选择新产品分类: {english_name}")
-                        
-                        # 刷新分类列表，确保新添加的分类被选中
-                        category_items = driver.find_elements(By.CSS_SELECTOR, "#product_catchecklist li label")
-                        for item in category_items:
-                            item_text = item.text.strip()
-                            if english_name.lower() in item_text.lower():
-                                checkbox = item.find_element(By.CSS_SELECTOR, "input[type='checkbox']")
-                                if not checkbox.is_selected():
-                                    driver.execute_script("arguments[0].click();", checkbox)
-                                break
-                except Exception as cat_error:
-                    print(f"处理产品分类时出错: {cat_error}")
-                    print("继续上传产品，但产品分类可能未正确设置")
-                
-                # 6. 处理品牌
-                current_operation = "处理品牌"
-                print("6. 处理品牌...")
-                
-                # 滚动到品牌选择区域
-                try:
-                    # 尝试找到品牌面板
-                    brand_panel = None
-                    try:
-                        brand_panel = driver.find_element(By.ID, "product_brandchecklist")
-                    except:
-                        # 如果找不到，尝试找品牌区域的标题或其他相关元素
-                        try:
-                            brand_panel = driver.find_element(By.XPATH, "//h2[contains(text(), '品牌') or contains(text(), 'Brand')]")
-                        except:
-                            print("找不到品牌面板，尝试通用滚动")
-                    
-                    # 滚动到品牌面板
-                    if brand_panel:
-                        driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", brand_panel)
-                        print("已滚动页面到品牌选择区域")
-                        time.sleep(1)  # 等待滚动完成
-                    else:
-                        # 如果找不到品牌面板，尝试通用滚动
-                        driver.execute_script("window.scrollBy(0, 300);")
-                        print("已执行通用页面滚动以寻找品牌区域")
-                        time.sleep(1)
-                except Exception as brand_scroll_error:
-                    print(f"滚动到品牌区域时出错: {brand_scroll_error}")
-                    # 尝试通用滚动
-                    try:
-                        driver.execute_script("window.scrollBy(0, 300);")
-                        print("已执行通用页面滚动")
-                        time.sleep(1)
-                    except:
-                        print("无法滚动页面")
-                
-                # 处理品牌选择
-                try:
-                    # 查找品牌面板
-                    WebDriverWait(driver, 10).until(
-                        EC.presence_of_element_located((By.ID, "product_brandchecklist"))
-                    )
-                    
-                    # 检查品牌是否已存在于品牌列表中
-                    brand_found = False
-                    if brand:  # 确保品牌名不为空
-                        print(f"在品牌列表中查找: {brand}")
-                        brand_items = driver.find_elements(By.CSS_SELECTOR, "#product_brandchecklist li label")
-                        
-                        for item in brand_items:
-                            item_text = item.text.strip()
-                            if brand.lower() in item_text.lower():
-                                # 找到匹配的品牌，点击选择
-                                print(f"找到匹配的品牌: {item_text}")
-                                checkbox = item.find_element(By.CSS_SELECTOR, "input[type='checkbox']")
-                                if not checkbox.is_selected():
-                                    driver.execute_script("arguments[0].click();", checkbox)
-                                    print(f"已选择品牌: {item_text}")
-                                else:
-                                    print(f"品牌已被选中: {item_text}")
-                                brand_found = True
-                                break
-                    
-                    # 如果品牌不存在，则添加新品牌
-                    if not brand_found and brand:
-                        print(f"未找到品牌: {brand}，将添加新品牌")
-                        
-                        # 点击"添加新品牌"链接
-                        add_new_brand_toggle = WebDriverWait(driver, 5).until(
-                            EC.element_to_be_clickable((By.ID, "product_brand-add-toggle"))
-                        )
-                        driver.execute_script("arguments[0].click();", add_new_brand_toggle)
-                        time.sleep(1)
-                        
-                        # 输入新品牌名称
-                        new_brand_input = WebDriverWait(driver, 5).until(
-                            EC.presence_of_element_located((By.ID, "newproduct_brand"))
-                        )
-                        new_brand_input.clear()
-                        new_brand_input.send_keys(brand)
-                        
-                        # 点击添加按钮
-                        add_brand_button = WebDriverWait(driver, 5).until(
-                            EC.element_to_be_clickable((By.ID, "product_brand-add-submit"))
-                        )
-                        driver.execute_script("arguments[0].click();", add_brand_button)
-                        
-                        # 等待新品牌添加完成并被选中
-                        time.sleep(2)
-                        print(f"已添加并选择新品牌: {brand}")
-                        
-                        # 刷新品牌列表，确保新添加的品牌被选中
-                        brand_items = driver.find_elements(By.CSS_SELECTOR, "#product_brandchecklist li label")
-                        for item in brand_items:
-                            item_text = item.text.strip()
-                            if brand.lower() in item_text.lower():
-                                checkbox = item.find_element(By.CSS_SELECTOR, "input[type='checkbox']")
-                                if not checkbox.is_selected():
-                                    driver.execute_script("arguments[0].click();", checkbox)
-                                break
-                except Exception as brand_error:
-                    print(f"处理品牌时出错: {brand_error}")
-                    print("继续上传产品，但品牌可能未正确设置")
-                
-                # 7. 跳过产品图片上传（因为我们只处理没有图片的产品）
-                print("7. 跳过产品图片上传（产品没有图片）...")
-                current_operation = "跳过产品图片上传"
-                
-                # 8. 发布产品前的最终检查
-                print("8. 发布产品前的最终检查...")
-                current_operation = "发布产品前的最终检查"
-                
-                # 检查产品标题是否已填写
-                title_value = driver.find_element(By.ID, "title").get_attribute("value")
-                if not title_value:
-                    print("警告: 产品标题为空，尝试重新填写")
-                    title_field = driver.find_element(By.ID, "title")
-                    title_field.clear()
-                    product_title = f"{brand} {model} {english_name}"
-                    title_field.send_keys(product_title)
-                
-                # 检查产品价格是否已填写
+                brand_panel = driver.find_element(By.ID, "product_brandchecklist")
+            except:
+                # 如果找不到，尝试找品牌区域的标题或其他相关元素
                 try:
-                    price_field = driver.find_element(By.ID, "_regular_price")
-                    price_value = price_field.get_attribute("value")
-                    if not price_value and price:
-                        print("警告: 产品价格为空，尝试重新填写")
-                        price_field.clear()
-                        price_field.send_keys(price)
+                    brand_panel = driver.find_element(By.XPATH, "//h2[contains(text(), '品牌') or contains(text(), 'Brand')]")
                 except:
-                    print("警告: 无法检查产品价格")
-                
-                # 检查产品分类是否已选择
-                try:
-                    if english_name:
-                        category_selected = False
-                        category_items = driver.find_elements(By.CSS_SELECTOR, "#product_catchecklist li input:checked")
-                        if len(category_items) > 0:
-                            category_selected = True
-                        
-                        if not category_selected:
-                            print("警告: 产品分类未选择，尝试重新选择")
-                            # 尝试再次选择产品分类
-                            category_items = driver.find_elements(By.CSS_SELECTOR, "#product_catchecklist li label")
-                            for item in category_items:
-                                item_text = item.text.strip()
-                                if english_name.lower() in item_text.lower():
-                                    checkbox = item.find_element(By.CSS_SELECTOR, "input[type='checkbox']")
-                                    if not checkbox.is_selected():
-                                        driver.execute_script("arguments[0].click();", checkbox)
-                                    break
-                except Exception as check_error:
-                    print(f"检查产品分类时出错: {check_error}")
-                
-                # 9. 发布产品
-                print("9. 发布没有图片的产品...")
-                current_operation = "等待发布按钮变为可点击状态"
+                    print("找不到品牌面板，尝试通用滚动")
+            
+            # 滚动到品牌面板
+            if brand_panel:
+                scroll_into_view(driver, brand_panel)
+                print("已滚动页面到品牌选择区域")
+            else:
+                # 如果找不到品牌面板，尝试通用滚动
+                scroll_by(driver, 300)
+                print("已执行通用页面滚动以寻找品牌区域")
+        except Exception as brand_scroll_error:
+            print(f"滚动到品牌区域时出错: {brand_scroll_error}")
+            # 尝试通用滚动
+            try:
+                scroll_by(driver, 300)
+                print("已执行通用页面滚动")
+            except:
+                print("无法滚动页面")
+        
+        # 处理品牌选择：检查品牌是否已存在于品牌索引中并勾选
+        def select_brand():
+            # 查找品牌面板
+            WebDriverWait(driver, 10).until(
+                EC.presence_of_element_located((By.ID, "product_brandchecklist"))
+            )
+            brand_index = taxonomies['product_brand']
+            brand_index.ensure_loaded(driver)
+            return brand_index.select(driver, brand)
+        
+        try:
+            brand_found = False
+            if brand:  # 确保品牌名不为空
+                print(f"在品牌列表中查找: {brand}")
+                term_id = retry_step(current_operation, select_brand)
+                if term_id:
+                    print(f"已选择品牌: {brand} (ID: {term_id})")
+                    brand_found = True
+            
+            # 所有品牌已在上传前批量创建，这里只勾选已存在的品牌
+            if not brand_found and brand:
+                print(f"警告: 未找到品牌: {brand}（批量创建时可能失败）")
+        except Exception as brand_error:
+            print(f"处理品牌时出错: {brand_error}")
+            print("继续上传产品，但品牌可能未正确设置")
+        
+        # 7. 跳过产品图片上传（因为我们只处理没有图片的产品）
+        print("7. 跳过产品图片上传（产品没有图片）...")
+        current_operation = steps.start("跳过产品图片上传")
+        
+        # 8. 发布产品前的最终检查
+        print("8. 发布产品前的最终检查...")
+        current_operation = steps.start("发布产品前的最终检查")
+        
+        # 检查产品标题是否已填写
+        title_value = driver.find_element(By.ID, "title").get_attribute("value")
+        if not title_value:
+            print("警告: 产品标题为空，尝试重新填写")
+            title_field = driver.find_element(By.ID, "title")
+            title_field.clear()
+            product_title = f"{brand} {model} {english_name}"
+            title_field.send_keys(product_title)
+        
+        # 检查产品价格是否已填写
+        try:
+            price_field = driver.find_element(By.ID, "_regular_price")
+            price_value = price_field.get_attribute("value")
+            if not price_value and price:
+                print("警告: 产品价格为空，尝试重新填写")
+                price_field.clear()
+                price_field.send_keys(price)
+        except:
+            print("警告: 无法检查产品价格")
+        
+        # 检查产品分类是否已选择
+        try:
+            if english_name:
+                category_selected = False
+                category_items = driver.find_elements(By.CSS_SELECTOR, "#product_catchecklist li input:checked")
+                if len(category_items) > 0:
+                    category_selected = True
                 
-                # 等待发布按钮变为可点击状态
+                if not category_selected:
+                    print("警告: 产品分类未选择，尝试重新选择")
+                    # 尝试再次选择产品分类
+                    taxonomies['product_cat'].select(driver, english_name)
+        except Exception as check_error:
+            print(f"检查产品分类时出错: {check_error}")
+        
+        # 9. 发布产品
+        print("9. 发布没有图片的产品...")
+        current_operation = steps.start("等待发布按钮变为可点击状态")
+        
+        # 等待发布按钮变为可点击状态
+        try:
+            print("等待发布按钮变为可点击状态...")
+            # 首先找到发布按钮，无论其状态如何
+            publish_button = WebDriverWait(driver, 5).until(
+                EC.presence_of_element_located((By.ID, "publish"))
+            )
+            
+            # 滚动到发布按钮，确保它在视图中
+            scroll_into_view(driver, publish_button)
+            
+            # 等待按钮变为可点击状态（最多等待30秒），同时等待进行中的ajax请求（如自动保存）结束
+            if wait_until(driver, button_enabled(publish_button), timeout=30, budget=2) and \
+                    wait_until(driver, AJAX_IDLE, timeout=10):
+                print("发布按钮已变为可点击状态")
+            else:
+                print("警告：发布按钮在最大等待时间内未变为可点击状态，将尝试点击")
+            
+            # 现在尝试点击发布按钮
+            current_operation = steps.start("点击发布按钮")
+            # 添加产品页面打开时WordPress已分配好产品ID，发布前记录下来，中断后可据此检查是否已发布
+            record_post_id(status, read_post_id(driver))
+            
+            # 点击发布按钮，所有点击方式都失败时按退避时间重试
+            def click_publish():
+                # 确保发布按钮可点击
+                publish_button = WebDriverWait(driver, 10).until(
+                    EC.element_to_be_clickable((By.ID, "publish"))
+                )
+            
+                # 尝试多种方式点击发布按钮
                 try:
-                    print("等待发布按钮变为可点击状态...")
-                    # 首先找到发布按钮，无论其状态如何
-                    publish_button = WebDriverWait(driver, 5).until(
-                        EC.presence_of_element_located((By.ID, "publish"))
-                    )
-                    
-                    # 滚动到发布按钮，确保它在视图中
-                    driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", publish_button)
-                    time.sleep(1)  # 等待滚动完成
-                    
-                    # 等待按钮变为可点击状态（最多等待30秒）
-                    max_wait_time = 30
-                    wait_interval = 1
-                    total_waited = 0
-                    
-                    while total_waited < max_wait_time:
-                        # 检查按钮是否可点击
-                        is_disabled = driver.execute_script(
-                            "return arguments[0].disabled === true || arguments[0].classList.contains('disabled') || arguments[0].getAttribute('aria-disabled') === 'true';", 
-                            publish_button
-                        )
-                        
-                        if not is_disabled:
-                            print(f"发布按钮已变为可点击状态，等待了{total_waited}秒")
-                            break
-                        
-                        print(f"发布按钮仍处于不可点击状态，已等待{total_waited}秒...")
-                        time.sleep(wait_interval)
-                        total_waited += wait_interval
-                    
-                    if total_waited >= max_wait_time:
-                        print("警告：发布按钮在最大等待时间内未变为可点击状态，将尝试点击")
-                    
-                    # 再次等待一小段时间，确保按钮完全可用
-                    time.sleep(2)
-                    
-                    # 现在尝试点击发布按钮
-                    current_operation = "点击发布按钮"
-                    
-                    # 确保发布按钮可点击
-                    publish_button = WebDriverWait(driver, 10).until(
-                        EC.element_to_be_clickable((By.ID, "publish"))
-                    )
-                    
-                    # 尝试多种方式点击发布按钮
-                    try:
-                        # 方法1：直接点击
-                        publish_button.click()
-                        print("方法1：直接点击发布按钮")
-                    except Exception as click_error:
-                        print(f"直接点击发布按钮失败: {click_error}")
-                        try:
-                            # 方法2：使用JavaScript点击
-                            driver.execute_script("arguments[0].click();", publish_button)
-                            print("方法2：使用JavaScript点击发布按钮")
-                        except Exception as js_click_error:
-                            print(f"JavaScript点击发布按钮失败: {js_click_error}")
-                            try:
-                                # 方法3：使用ActionChains点击
-                                from selenium.webdriver.common.action_chains import ActionChains
-                                actions = ActionChains(driver)
-                                actions.move_to_element(publish_button).click().perform()
-                                print("方法3：使用ActionChains点击发布按钮")
-                            except Exception as action_click_error:
-                                print(f"ActionChains点击发布按钮失败: {action_click_error}")
-                                # 方法4：尝试查找所有可能的发布按钮并点击
-                                publish_buttons = driver.find_elements(By.XPATH, "//input[@id='publish' or @name='publish' or @value='发布' or @value='Publish']")
-                                if publish_buttons:
-                                    driver.execute_script("arguments[0].click();", publish_buttons[0])
-                                    print("方法4：找到并点击备选发布按钮")
-                                else:
-                                    raise Exception("无法找到任何可用的发布按钮")
-                    
-                    print("已尝试点击发布按钮")
-                    
-                    # 等待发布完成 - 检测成功消息或新页面加载
+                    # 方法1：直接点击
+                    publish_button.click()
+                    print("方法1：直接点击发布按钮")
+                except Exception as click_error:
+                    print(f"直接点击发布按钮失败: {click_error}")
                     try:
-                        WebDriverWait(driver, 15).until(
-                            EC.presence_of_element_located((By.CLASS_NAME, "updated"))
-                        )
-                        print("检测到发布成功消息")
-                    except:
-                        # 如果没有找到成功消息，检查是否已重定向到新页面
+                        # 方法2：使用JavaScript点击
+                        driver.execute_script("arguments[0].click();", publish_button)
+                        print("方法2：使用JavaScript点击发布按钮")
+                    except Exception as js_click_error:
+                        print(f"JavaScript点击发布按钮失败: {js_click_error}")
                         try:
-                            WebDriverWait(driver, 15).until(
-                                EC.presence_of_element_located((By.ID, "title"))
-                            )
-                            print("已重定向到新页面，发布可能成功")
-                        except:
-                            # 如果上述两种方法都失败，检查URL是否已更改
-                            if "post.php" in driver.current_url and "post_type=product" in driver.current_url:
-                                print("URL已更改为编辑页面，发布可能成功")
-                            else:
-                                print("警告：无法确认发布是否成功，但将继续处理")
-                    
-                    print(f"没有图片的产品已尝试上传: {english_name}")
-                    upload_count += 1
-                    time.sleep(2)  # 防止请求过快
-                except Exception as publish_error:
-                    print(f"发布产品时出错: {publish_error}")
-                    # 尝试再次点击发布按钮
-                    try:
-                        publish_buttons = driver.find_elements(By.XPATH, "//input[@id='publish' or @name='publish' or @value='发布' or @value='Publish']")
-                        if publish_buttons:
-                            driver.execute_script("arguments[0].click();", publish_buttons[0])
-                            time.sleep(5)
-                            print("通过备选方法点击发布按钮")
-                            upload_count += 1
-                        else:
-                            print("找不到发布按钮，尝试通过键盘快捷键发布")
-                            # 尝试使用键盘快捷键 Ctrl+S 发布
-                            from selenium.webdriver.common.keys import Keys
+                            # 方法3：使用ActionChains点击
                             from selenium.webdriver.common.action_chains import ActionChains
                             actions = ActionChains(driver)
-                            actions.key_down(Keys.CONTROL).send_keys('s').key_up(Keys.CONTROL).perform()
-                            time.sleep(5)
-                            print("通过键盘快捷键尝试发布")
-                            upload_count += 1
-                    except Exception as alt_publish_error:
-                        print(f"备选发布方法也失败: {alt_publish_error}")
-                        print("无法发布产品，跳过当前产品")
-                
-                # 为下一个产品直接导航到添加新产品页面
-                print("导航到添加新产品页面准备上传下一个产品...")
-                driver.get(f"{wp_url}/wp-admin/post-new.php?post_type=product")
-                WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located((By.ID, "title"))
+                            actions.move_to_element(publish_button).click().perform()
+                            print("方法3：使用ActionChains点击发布按钮")
+                        except Exception as action_click_error:
+                            print(f"ActionChains点击发布按钮失败: {action_click_error}")
+                            # 方法4：尝试查找所有可能的发布按钮并点击
+                            publish_buttons = driver.find_elements(By.XPATH, "//input[@id='publish' or @name='publish' or @value='发布' or @value='Publish']")
+                            if publish_buttons:
+                                driver.execute_script("arguments[0].click();", publish_buttons[0])
+                                print("方法4：找到并点击备选发布按钮")
+                            else:
+                                raise Exception("无法找到任何可用的发布按钮")
+            
+            # 统一的发布限速（替代原来每次发布后固定等待2秒）
+            # 放在重试的步骤之外，并发控制统计的发布延迟不包含限速等待
+            rate_limiter.wait(budget=2)
+            retry_step(current_operation, click_publish)
+            
+            print("已尝试点击发布按钮")
+            
+            # 等待发布完成 - 检测成功消息或新页面加载
+            try:
+                WebDriverWait(driver, 15).until(
+                    EC.presence_of_element_located((By.CLASS_NAME, "updated"))
                 )
-                time.sleep(1)
-            except Exception as product_error:
-                print(f"处理产品时出错: {product_error}")
-                print(f"出错时正在处理的产品: {chinese_name} ({english_name if 'english_name' in locals() else '未获取英文名'})")
-                print(f"出错时正在执行的操作: {current_operation if 'current_operation' in locals() else '未知操作'}")
-                print("跳过当前产品，继续下一个")
-                # 确保即使出错也能回到添加产品页面
+                print("检测到发布成功消息")
+            except:
+                # 如果没有找到成功消息，检查是否已重定向到新页面
                 try:
-                    driver.get(f"{wp_url}/wp-admin/post-new.php?post_type=product")
-                    WebDriverWait(driver, 10).until(
+                    WebDriverWait(driver, 15).until(
                         EC.presence_of_element_located((By.ID, "title"))
                     )
-                    time.sleep(1)
+                    print("已重定向到新页面，发布可能成功")
                 except:
-                    print("无法导航回添加产品页面，尝试继续...")
-                continue
+                    # 如果上述两种方法都失败，检查URL是否已更改
+                    if "post.php" in driver.current_url and "post_type=product" in driver.current_url:
+                        print("URL已更改为编辑页面，发布可能成功")
+                    else:
+                        print("警告：无法确认发布是否成功，但将继续处理")
+            
+            print(f"没有图片的产品已尝试上传: {english_name}")
+            uploaded = True
+        except Exception as publish_error:
+            print(f"发布产品时出错: {publish_error}")
+            # 尝试再次点击发布按钮
+            try:
+                publish_buttons = driver.find_elements(By.XPATH, "//input[@id='publish' or @name='publish' or @value='发布' or @value='Publish']")
+                if publish_buttons:
+                    driver.execute_script("arguments[0].click();", publish_buttons[0])
+                    wait_until(driver, PUBLISH_NOTICE, timeout=15, budget=5)
+                    print("通过备选方法点击发布按钮")
+                    uploaded = True
+                else:
+                    print("找不到发布按钮，尝试通过键盘快捷键发布")
+                    # 尝试使用键盘快捷键 Ctrl+S 发布
+                    from selenium.webdriver.common.keys import Keys
+                    from selenium.webdriver.common.action_chains import ActionChains
+                    actions = ActionChains(driver)
+                    actions.key_down(Keys.CONTROL).send_keys('s').key_up(Keys.CONTROL).perform()
+                    wait_until(driver, PUBLISH_NOTICE, timeout=15, budget=5)
+                    print("通过键盘快捷键尝试发布")
+                    uploaded = True
+            except Exception as alt_publish_error:
+                print(f"备选发布方法也失败: {alt_publish_error}")
+                print("无法发布产品，跳过当前产品")
         
-        print(f"成功上传 {upload_count} 个产品")
+        if not uploaded:
+            status['operation'] = current_operation
+        # 为下一个产品直接导航到添加新产品页面
+        print("导航到添加新产品页面准备上传下一个产品...")
+        current_operation = steps.start("返回添加新产品页面")
+        driver.get(f"{wp_url}/wp-admin/post-new.php?post_type=product")
+        WebDriverWait(driver, 10).until(
+            EC.presence_of_element_located((By.ID, "title"))
+        )
+        wait_until(driver, PAGE_READY, timeout=10, budget=1)
+        steps.finish(uploaded, status.get('operation'))
+        return uploaded
+    except Exception as product_error:
+        if not uploaded:
+            status['operation'] = current_operation if 'current_operation' in locals() else '未知操作'
+            status['error'] = str(product_error)
+        steps.finish(uploaded, status.get('operation'))
+        print(f"处理产品时出错: {product_error}")
+        print(f"出错时正在处理的产品: {chinese_name} ({english_name if 'english_name' in locals() else '未获取英文名'})")
+        print(f"出错时正在执行的操作: {current_operation if 'current_operation' in locals() else '未知操作'}")
+        print("跳过当前产品，继续下一个")
+        # 确保即使出错也能回到添加产品页面
+        try:
+            driver.get(f"{wp_url}/wp-admin/post-new.php?post_type=product")
+            WebDriverWait(driver, 10).until(
+                EC.presence_of_element_located((By.ID, "title"))
+            )
+            wait_until(driver, PAGE_READY, timeout=10, budget=1)
+        except:
+            print("无法导航回添加产品页面，尝试继续...")
+        # 已经发布成功、只是之后返回添加产品页面时出错的，仍算作上传成功
+        return uploaded
+
+# 使用Selenium上传产品到WordPress，workers > 1 时开启多个浏览器并行上传
+# hybrid（wp_ajax.AdminAjaxSession）不为空时为混合模式，分类和品牌通过HTTP请求创建
+# 上传过程出错（例如所有浏览器都登录失败）时返回False
+def upload_to_wordpress(tasks, wp_url, username, password, workers=1, session_cache=SESSION_CACHE_FILE,
+                        rate_limit=0.0, journal=None, products=None,
+                        headless=False, block_resources=False, measure_load=False, retry_rounds=1,
+                        recycle_after=200, recycle_memory_mb=512, browser_log=BROWSER_LOG_FILE, hybrid=None):
+    wp_url = normalize_wp_url(wp_url)
+    print(f"使用的WordPress网址: {wp_url}")
+    rate_limiter.min_interval = rate_limit
+    wait_stats.reset()
+    step_stats.reset()
+    circuit_breaker.reset()
+    # 自适应并发（--adaptive）从--rate-limit开始调整发布间隔，需要在设置限速之后重置
+    concurrency.reset()
+    # 重试后仍然失败的产品放入重试队列，所有产品完成后再上传retry_rounds轮
+    retry_queue = RetryQueue(retry_rounds)
+    # 每个浏览器上传recycle_after个产品或JS堆超过recycle_memory_mb后重启，内存和用时记录到browser_log
+    recycler = BrowserRecycler(recycle_after, recycle_memory_mb, browser_log or None)
+    taxonomies = {taxonomy: TaxonomyIndex(taxonomy) for taxonomy in ("product_cat", "product_brand")}
+
+    def process_task(driver, task, status=None):
+        return upload_product(driver, wp_url, task, taxonomies, status=status)
+    if products is not None:
+        process_task = skip_existing(products, process_task)
+    if journal:
+        process_task = journal.wrap(process_task)
+
+    # 第一个浏览器登录后执行一次：（可选）测量页面加载时间，读取店铺现有产品，批量创建缺少的分类和品牌
+    # 混合模式下先把登录状态导出到HTTP会话，分类和品牌直接通过HTTP请求创建
+    def setup(driver):
+        if measure_load:
+            measure_page_load(driver, wp_url, block_resources)
+        if products is not None:
+            # 读取失败时无法判断哪些产品已存在，继续上传会重复创建，停止运行
+            try:
+                load_products_browser(products, driver, wp_url)
+            except Exception as e:
+                raise StopUpload(f"{e}（可加上 --existing allow 不检查已存在的产品）")
+        session = None
+        if hybrid is not None:
+            try:
+                hybrid.load_from_driver(driver)
+                session = hybrid
+            except Exception as e:
+                print(f"混合模式初始化失败，改为在浏览器中创建分类和品牌: {e}")
+        precreate_missing_terms(driver, wp_url, tasks, taxonomies, session)
+
+    try:
+        counts = run_worker_pool(
+            tasks, workers,
+            lambda: open_session(wp_url, username, password, session_cache, headless, block_resources),
+            process_task,
+            setup=setup,
+            retry_queue=retry_queue,
+            concurrency=concurrency if concurrency.enabled else None,
+            recycler=recycler,
+        )
+        print(f"成功上传 {sum(counts)} 个产品")
+        wait_stats.report(sum(counts))
+        concurrency.report()
+        recycler.report()
     except Exception as e:
         print(f"上传过程中出错: {e}")
-        # 不要在这里尝试访问可能未定义的变量
-    finally:
-        driver.quit()
+        return False
+    return True
+
+# 解析命令行参数
+def parse_args():
+    parser = argparse.ArgumentParser(description="批量上传产品到WordPress")
+    parser.add_argument("--backend", choices=["selenium", "rest"], default="selenium",
+                        help="上传方式: selenium=模拟后台操作, rest=WooCommerce REST API")
+    parser.add_argument("--batch-size", type=int, default=0,
+                        help=f"rest模式下每次products/batch请求创建的产品数（最多{BATCH_LIMIT}），0为逐个创建；"
+                             "批次中失败的产品在最后逐个重试")
+    parser.add_argument("--batch-workers", type=int, default=2, help="rest批量模式下同时发送的批次数")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="selenium模式下同时打开的浏览器数量，每个浏览器各自登录并从共享队列中取产品上传")
+    parser.add_argument("--no-session-cache", action="store_true",
+                        help=f"不复用 {SESSION_CACHE_FILE} 中保存的登录状态，每次都重新登录")
+    parser.add_argument("--rate-limit", type=float, default=0.0,
+                        help="两次发布之间的最小间隔（秒），所有浏览器共享，默认不限速")
+    parser.add_argument("--headless", action="store_true",
+                        help="selenium模式下使用无界面浏览器（eager加载策略，默认同时屏蔽字体、头像、统计脚本等资源）")
+    parser.add_argument("--block-resources", choices=["auto", "on", "off"], default="auto",
+                        help="屏蔽后台页面中与上传无关的资源，auto=仅在--headless时屏蔽")
+    parser.add_argument("--measure-page-load", action="store_true",
+                        help="开始上传前对比添加产品页面在屏蔽资源前后的加载时间")
+    parser.add_argument("--report", default=REPORT_FILE,
+                        help="各步骤用时报告文件，扩展名为.csv时写CSV，否则写JSON；设为空字符串则不保存")
+    parser.add_argument("--metrics", default=METRICS_FILE,
+                        help="Prometheus文本格式的指标文件；设为空字符串则不保存")
+    parser.add_argument("--existing", choices=["skip", "update", "allow"], default="skip",
+                        help="店铺中已存在相同标题的产品时: skip=跳过, update=更新（仅rest模式，"
+                             "selenium模式按skip处理）, allow=不检查，照常上传")
+    parser.add_argument("--resume", action="store_true",
+                        help=f"继续上次中断的上传：跳过 {JOURNAL_FILE} 中记录为已发布的产品")
+    parser.add_argument("--step-retries", type=int, default=2,
+                        help="每个步骤（打开页面、标题、价格、分类、品牌、图片、发布）失败后的重试次数，按指数退避等待")
+    parser.add_argument("--retry-delay", type=float, default=1.0, help="第一次重试前的等待时间（秒），之后每次加倍")
+    parser.add_argument("--retry-failed", type=int, default=1,
+                        help="失败的产品在其他产品全部完成后再重试的轮数，0为不重试")
+    parser.add_argument("--breaker-threshold", type=int, default=8,
+                        help="连续失败多少次后认为服务器不可用并暂停所有浏览器，0为不暂停")
+    parser.add_argument("--breaker-cooldown", type=float, default=60.0, help="服务器不可用时暂停的时间（秒）")
+    parser.add_argument("--recycle-after", type=int, default=200,
+                        help="每个浏览器上传多少个产品后关闭并重新打开（自动用缓存的登录状态登录），0为不按数量重启")
+    parser.add_argument("--recycle-memory-mb", type=float, default=512,
+                        help="浏览器渲染进程的JS堆超过多少MB时重启，0为不按内存重启")
+    parser.add_argument("--browser-log", default=BROWSER_LOG_FILE,
+                        help="每个产品上传后浏览器的内存和用时记录（CSV），用于调整以上两个阈值；设为空字符串则不保存")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="selenium模式下根据发布、上传图片和新建分类的延迟自动调整同时上传的产品数和发布间隔，"
+                             "--workers为上限；出现超时或429/5xx时减半，延迟正常时逐步增加")
+    parser.add_argument("--adaptive-interval", type=float, default=30.0, help="自适应并发每隔多少秒调整一次")
+    parser.add_argument("--adaptive-log", default=CONCURRENCY_LOG_FILE,
+                        help="每个调整周期的吞吐量、延迟和调整结果记录（CSV）；设为空字符串则只输出到控制台")
+    parser.add_argument("--hybrid", action="store_true",
+                        help="混合模式（selenium）：浏览器登录后把登录Cookie和nonce导出到HTTP会话，直接请求admin-ajax.php"
+                             "创建分类和品牌，浏览器只用来填写和发布产品；不需要REST API和应用程序密码")
+    parser.add_argument("--plan-only", action="store_true",
+                        help="只生成上传计划：输出待上传和跳过的产品数量及预计用时，不登录网站")
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
     excel_file = "a.xlsx"
     
     # 读取Excel文件
@@ -808,21 +697,76 @@ def main():
         print("映射表为空或读取失败，无法继续")
         return
     
+    # 启动浏览器之前把表格编译为上传计划：每个产品的字段只解析一次，缺少图片或英文名的行提前跳过
+    tasks, skipped = build_upload_plan(df, name_map, require_image=False, skip_with_image=True)
+    print_plan(tasks, skipped, args.backend, args.workers)
+    if args.plan_only:
+        return
+    
     # 询问WordPress登录信息
     print("\n= 步骤4: 上传产品到WordPress =")
     wp_url = input("请输入WordPress网站地址 (例如: https://example.com): ")
     username = input("请输入WordPress用户名: ")
-    password = input("请输入WordPress密码: ")
+    if args.backend == "rest":
+        password = input("请输入WordPress应用程序密码 (用户 -> 个人资料 -> 应用程序密码): ")
+    else:
+        password = input("请输入WordPress密码: ")
+    
+    # 每一行的上传状态都记录到上传日志中，--resume时跳过已发布的行
+    journal = RunJournal(wp_url)
+    journal.mark_plan_skipped(skipped)
+    if args.resume:
+        tasks = skip_completed_rows(tasks, journal)
     
     # 确认上传
-    confirm = input(f"将上传 {len(df)} 个产品到 {wp_url}，确认继续? (y/n): ")
+    confirm = input(f"将上传 {len(tasks)} 个产品到 {wp_url}，确认继续? (y/n): ")
     if confirm.lower() != 'y':
         print("已取消上传")
         return
     
-    # 上传产品
-    upload_to_wordpress(df, name_map, wp_url, username, password)
+    # 步骤重试和熔断设置，selenium和rest模式共用
+    retry_policy.retries = args.step_retries
+    retry_policy.base_delay = args.retry_delay
+    circuit_breaker.threshold = args.breaker_threshold
+    circuit_breaker.cooldown = args.breaker_cooldown
+    # 自适应并发：以--workers为上限，限速器的发布间隔也由它调整
+    concurrency.max_limit = args.workers if args.adaptive else 0
+    concurrency.interval = args.adaptive_interval
+    concurrency.log_file = args.adaptive_log or None
+    concurrency.rate_limiter = rate_limiter
+    
+    # 上传产品，开始前读取一次店铺现有产品，避免重复上传
+    products = None if args.existing == "allow" else ProductIndex()
+    completed = True
+    if args.backend == "rest":
+        client = WooClient(wp_url, username, password)
+        if products is not None:
+            load_products_rest(products, client)
+        # 上传计划中只有没有图片的产品
+        rest_options = dict(with_images=False, journal=journal, products=products,
+                            update_existing=args.existing == "update", retry_rounds=args.retry_failed)
+        if args.batch_size:
+            upload_via_rest_batch(tasks, client, batch_size=args.batch_size, batch_workers=args.batch_workers,
+                                  **rest_options)
+        else:
+            upload_via_rest(tasks, client, **rest_options)
+    else:
+        block_resources = args.block_resources == "on" or (args.block_resources == "auto" and args.headless)
+        completed = upload_to_wordpress(tasks, wp_url, username, password, workers=args.workers,
+                                        session_cache=None if args.no_session_cache else SESSION_CACHE_FILE,
+                                        rate_limit=args.rate_limit, journal=journal, products=products,
+                                        headless=args.headless, block_resources=block_resources,
+                                        measure_load=args.measure_page_load, retry_rounds=args.retry_failed,
+                                        recycle_after=args.recycle_after, recycle_memory_mb=args.recycle_memory_mb,
+                                        browser_log=args.browser_log,
+                                        hybrid=AdminAjaxSession(wp_url) if args.hybrid else None)
     
+    # 输出各步骤用时，并保存运行报告和Prometheus指标
+    step_stats.report(args.report, args.metrics)
+    journal.close()
+    if not completed:
+        # 例如所有浏览器都登录失败：以非0状态退出，调用脚本的任务能发现上传没有完成
+        sys.exit(1)
     print("所有操作已完成")
 
 if __name__ == "__main__":
@@ -0,0 +1,137 @@
+import os
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+from woo_api import WooClient
+from wp_utils import normalize_wp_url
+
+# 媒体清单文件，与product_images文件夹放在同一目录
+MANIFEST_FILE = "media_manifest.sqlite"
+
+
+# 计算图片内容的SHA-256（分块读取，不把整个文件读入内存）
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# 已上传图片的持久化清单：按 (网站, 图片内容SHA-256) 记录附件ID和URL
+# 内容相同的图片（无论文件名是否相同）只会上传一次，本次运行和以后的运行都直接复用
+class MediaManifest:
+    def __init__(self, wp_url, path=MANIFEST_FILE):
+        self.wp_url = normalize_wp_url(wp_url)
+        self.path = path
+        self.lock = threading.RLock()
+        # 正在上传中的图片，同一内容的其他线程等待它完成
+        self.pending = {}
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS media ("
+            " wp_url TEXT NOT NULL,"
+            " sha256 TEXT NOT NULL,"
+            " attachment_id INTEGER NOT NULL,"
+            " url TEXT,"
+            " file_name TEXT,"
+            " uploaded_at REAL,"
+            " PRIMARY KEY (wp_url, sha256))"
+        )
+        self.conn.commit()
+
+    def get(self, sha256):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT attachment_id, url FROM media WHERE wp_url = ? AND sha256 = ?",
+                (self.wp_url, sha256),
+            ).fetchone()
+        if row:
+            return {'id': row[0], 'source_url': row[1]}
+        return None
+
+    def put(self, sha256, attachment_id, url, file_name):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO media VALUES (?, ?, ?, ?, ?, ?)",
+                (self.wp_url, sha256, attachment_id, url, file_name, time.time()),
+            )
+            self.conn.commit()
+
+    def remove(self, sha256):
+        with self.lock:
+            self.conn.execute("DELETE FROM media WHERE wp_url = ? AND sha256 = ?", (self.wp_url, sha256))
+            self.conn.commit()
+
+    # 当前网站的全部记录：[(sha256, 附件ID, 文件名), ...]
+    def entries(self):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT sha256, attachment_id, file_name FROM media WHERE wp_url = ?", (self.wp_url,)
+            ).fetchall()
+
+    def close(self):
+        self.conn.close()
+
+    # 包装上传函数：先按内容哈希查清单，已上传过的直接返回记录的附件，否则上传并写入清单
+    def wrap(self, upload_func):
+        def upload_once(image_path):
+            sha256 = file_sha256(image_path)
+            while True:
+                with self.lock:
+                    cached = self.get(sha256)
+                    if cached:
+                        return cached
+                    event = self.pending.get(sha256)
+                    if event is None:
+                        self.pending[sha256] = threading.Event()
+                        break
+                # 同一内容的图片正在被其他线程上传，等它完成后再查清单
+                event.wait()
+            try:
+                media = upload_func(image_path)
+                self.put(sha256, media['id'], media.get('source_url'), os.path.basename(image_path))
+                return media
+            finally:
+                with self.lock:
+                    self.pending.pop(sha256).set()
+        return upload_once
+
+
+# 校验清单：删除媒体库中已不存在的附件记录
+def verify_manifest(manifest, client):
+    entries = manifest.entries()
+    print(f"校验 {len(entries)} 条媒体记录...")
+    removed = 0
+    for sha256, attachment_id, file_name in entries:
+        try:
+            if not client.media_exists(attachment_id):
+                manifest.remove(sha256)
+                removed += 1
+                print(f"附件已不存在，删除记录: {file_name} (ID: {attachment_id})")
+        except Exception as e:
+            print(f"检查附件 {attachment_id} 时出错，保留记录: {e}")
+    print(f"校验完成，删除 {removed} 条记录，保留 {len(entries) - removed} 条")
+    return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="媒体清单管理")
+    parser.add_argument("command", choices=["verify"], help="verify: 删除媒体库中已不存在的附件记录")
+    parser.add_argument("--manifest", default=MANIFEST_FILE, help="清单文件路径")
+    args = parser.parse_args()
+
+    wp_url = input("请输入WordPress网站地址 (例如: https://example.com): ")
+    username = input("请输入WordPress用户名: ")
+    app_password = input("请输入WordPress应用程序密码: ")
+    manifest = MediaManifest(wp_url, args.manifest)
+    try:
+        verify_manifest(manifest, WooClient(wp_url, username, app_password))
+    finally:
+        manifest.close()
+
+
+if __name__ == "__main__":
+    main()
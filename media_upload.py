@@ -0,0 +1,51 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+# 统一图片路径的写法，作为 路径 -> 附件ID 字典的键
+def media_key(image_path):
+    return os.path.abspath(image_path)
+
+
+# 从图片路径中找出需要上传的图片（去重，只保留存在的文件），image_paths可以是DataFrame的图片路径列或任务的图片路径
+def collect_image_paths(image_paths):
+    paths = {}
+    for image_path in image_paths:
+        if not isinstance(image_path, str):
+            continue
+        if image_path and os.path.isfile(image_path):
+            paths.setdefault(media_key(image_path), image_path)
+    return list(paths.values())
+
+
+# 在产品上传开始前，用有限大小的线程池并发上传全部图片到媒体库
+# upload_func(image_path) 返回附件信息（至少包含id），返回 {绝对路径: 附件ID}
+def preupload_media(image_paths, upload_func, max_workers=4):
+    print(f"开始预上传 {len(image_paths)} 张图片到媒体库（{max_workers} 个线程）...")
+    start_time = time.time()
+    media_ids = {}
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(upload_func, image_path): image_path for image_path in image_paths}
+        for future in as_completed(futures):
+            image_path = futures[future]
+            try:
+                media_ids[media_key(image_path)] = future.result()['id']
+            except Exception as e:
+                failed += 1
+                print(f"预上传图片失败: {image_path}: {e}")
+    elapsed = time.time() - start_time
+    print(f"预上传完成: 成功 {len(media_ids)} 张，失败 {failed} 张，用时 {elapsed:.1f} 秒")
+    return media_ids
+
+
+# 把已上传图片的附件ID直接写入添加产品页面的特色图片字段（_thumbnail_id），不再打开媒体对话框
+def set_thumbnail_id(driver, attachment_id):
+    return bool(driver.execute_script(
+        "var input = document.getElementById('_thumbnail_id');"
+        "if (!input) { return false; }"
+        "input.value = arguments[0];"
+        "return true;",
+        str(attachment_id),
+    ))
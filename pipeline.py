@@ -0,0 +1,210 @@
+import os
+import time
+import queue
+import shutil
+import zipfile
+import threading
+from collections import deque
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from xlsx_stream import active_sheet_part, read_image_anchors, read_shared_strings, iter_sheet_rows, read_float_columns
+from image import ANCHOR_COL
+from wp_utils import image_path_for
+from image_preprocess import preprocess_image, CACHE_DIR, MAX_EDGE
+from media_upload import media_key
+from upload_plan import unique_key, plan_task, resolve_price
+from run_journal import PUBLISHED
+
+# 相邻两个阶段之间队列的容量：下游处理不过来时上游最多领先这么多个产品，然后等待（背压）
+QUEUE_SIZE = 8
+# 队列结束标记
+_DONE = object()
+
+
+# 流式读取xlsx：按行产出上传任务，行中嵌入的图片同时从压缩包写入image_folder
+# 不需要先运行image.py提取全部图片；没有嵌入图片的行使用image_folder中已有的同名图片
+def iter_sheet_tasks(file_path, name_map, image_folder="product_images", anchor_col=ANCHOR_COL, stats=None):
+    os.makedirs(image_folder, exist_ok=True)
+    with zipfile.ZipFile(file_path) as zf:
+        sheet_part = active_sheet_part(zf)
+        anchors = read_image_anchors(zf, sheet_part)
+        shared_strings = read_shared_strings(zf)
+        header = None
+        seen = {}
+        # 含空单元格的数字列按pandas的方式输出为 "123.0"，与普通流程的标题、图片名和行标识一致
+        float_columns = read_float_columns(zf, sheet_part)
+        for row_number, values in iter_sheet_rows(zf, sheet_part, shared_strings, float_columns):
+            # 第一行是表头：{列名: 列号}
+            if header is None:
+                header = {text.strip(): col for col, text in values.items()}
+                continue
+            if not any(text != "" for text in values.values()):
+                continue
+            brand, model, chinese_name = (values.get(header.get(name), "") for name in ('品牌', '型号', '品名'))
+            price = resolve_price(values.get(2, ""), values.get(header.get('单价'), ""))
+
+            image_path = image_path_for(image_folder, brand, model, chinese_name)
+            # 锚点行从0开始，Excel行号 = 锚点行 + 1
+            media_part = anchors.get((row_number - 1, anchor_col))
+            # 与image.py相同，型号为空的行不提取图片
+            if model.strip() and media_part:
+                with zf.open(media_part) as src, open(image_path, "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                if stats is not None:
+                    stats['images'] = stats.get('images', 0) + 1
+            has_image = os.path.exists(image_path)
+
+            key = unique_key(seen, brand, model, chinese_name)
+            yield plan_task(row_number - 2, key, brand, model, price, chinese_name, image_path, has_image, name_map)
+
+
+# 预处理一个任务的图片（在子进程中运行），失败时保留原图
+def preprocess_task(task, cache_dir=CACHE_DIR, max_edge=MAX_EDGE, output_format='jpeg', quality=85):
+    try:
+        task.image_path = preprocess_image(task.image_path, cache_dir, max_edge, output_format, quality)[1]
+    except Exception as e:
+        print(f"预处理图片失败，使用原图: {task.image_path}: {e}")
+    return task
+
+
+# 依次取出队列中的任务，直到收到结束标记
+def drain(task_queue):
+    while True:
+        task = task_queue.get()
+        if task is _DONE:
+            return
+        yield task
+
+
+# 流水线上传：Excel行和嵌入的图片依次流过 提取 -> 图片预处理 -> 预上传到媒体库 -> 创建产品
+# 每个阶段在独立的线程中运行（预处理在进程池、媒体上传在线程池中并发），阶段之间用有界队列连接，
+# 第一个产品提取出来后立即进入后面的阶段，不必等整个表格提取完成
+# preprocess为预处理参数 {max_edge, output_format, quality}，为None时不预处理；upload_media为None时不预上传图片
+class UploadPipeline:
+    def __init__(self, file_path, name_map, image_folder="product_images", queue_size=QUEUE_SIZE, journal=None,
+                 resume=False, preprocess=None, preprocess_workers=None, upload_media=None, media_workers=4,
+                 anchor_col=ANCHOR_COL):
+        self.file_path = file_path
+        self.name_map = name_map
+        self.image_folder = image_folder
+        self.queue_size = queue_size
+        self.journal = journal
+        self.resume = resume
+        self.preprocess = preprocess
+        self.preprocess_workers = preprocess_workers
+        self.upload_media = upload_media
+        self.media_workers = media_workers
+        self.anchor_col = anchor_col
+        # 预上传得到的 {图片绝对路径: 附件ID}，与preupload_media的返回值相同，上传阶段按图片路径查找
+        self.media_ids = {}
+        self.lock = threading.Lock()
+        self.threads = []
+        self.started = None
+        self.first_ready = None
+        # 各阶段处理的数量和用时
+        self.stats = {}
+        self.extract_stats = {}
+
+    def _count(self, stage, seconds=0.0):
+        with self.lock:
+            count, total = self.stats.get(stage, (0, 0.0))
+            self.stats[stage] = (count + 1, total + seconds)
+
+    # 提取阶段的任务来源：跳过的行写入上传日志，--resume时去掉已发布的行
+    def _source(self):
+        published = set()
+        if self.journal and self.resume:
+            published = {key for key, (state, _, _) in self.journal.states().items() if state == PUBLISHED}
+        for task in iter_sheet_tasks(self.file_path, self.name_map, self.image_folder, self.anchor_col,
+                                     self.extract_stats):
+            if task.skip_reason:
+                print(f"跳过行 {task.excel_row} ({task.key}): {task.skip_reason}")
+                self._count(f"跳过（{task.skip_reason}）")
+                if self.journal:
+                    self.journal.mark_skipped(task.key, task.excel_row, task.skip_reason)
+                continue
+            if task.key in published:
+                self._count("跳过（已发布）")
+                continue
+            self._count("提取")
+            yield task
+
+    # 启动一个阶段：在独立线程中从source取任务，在executor中执行handle(task)后放入outbox
+    # 最多同时处理window个任务，结果按原顺序放入outbox；不传executor时直接转发source中的任务
+    def _start_stage(self, name, source, outbox, handle=None, executor=None, window=1):
+        def run():
+            pending = deque()
+            try:
+                for task in source:
+                    if executor is None:
+                        outbox.put(task)
+                    else:
+                        pending.append((time.time(), executor.submit(handle, task)))
+                        if len(pending) >= window:
+                            outbox.put(self._collect(name, *pending.popleft()))
+                while pending:
+                    outbox.put(self._collect(name, *pending.popleft()))
+            except Exception as e:
+                print(f"流水线阶段 {name} 出错，停止产出新任务: {e}")
+            finally:
+                if executor is not None:
+                    executor.shutdown(wait=False)
+                outbox.put(_DONE)
+
+        thread = threading.Thread(target=run, name=f"pipeline-{name}", daemon=True)
+        thread.start()
+        self.threads.append(thread)
+
+    def _collect(self, name, submitted, future):
+        task = future.result()
+        self._count(name, time.time() - submitted)
+        return task
+
+    # 预上传一个任务的图片，失败时由上传阶段按原来的方式上传
+    def _upload_media(self, task):
+        key = media_key(task.image_path)
+        if key not in self.media_ids:
+            try:
+                self.media_ids[key] = self.upload_media(task.image_path)['id']
+            except Exception as e:
+                print(f"预上传图片失败: {task.image_path}: {e}")
+        return task
+
+    # 启动提取及后续阶段，返回按顺序产出可以上传的任务的生成器（交给run_worker_pool或upload_via_rest）
+    def start(self):
+        self.started = time.time()
+        self.stats = {}
+        self.extract_stats = {}
+        inbox = queue.Queue(self.queue_size)
+        self._start_stage("提取", self._source(), inbox)
+        if self.preprocess is not None:
+            outbox = queue.Queue(self.queue_size)
+            executor = ProcessPoolExecutor(max_workers=self.preprocess_workers)
+            self._start_stage("图片预处理", drain(inbox), outbox, partial(preprocess_task, **self.preprocess),
+                              executor, window=self.queue_size)
+            inbox = outbox
+        if self.upload_media is not None:
+            outbox = queue.Queue(self.queue_size)
+            executor = ThreadPoolExecutor(max_workers=self.media_workers)
+            self._start_stage("预上传图片", drain(inbox), outbox, self._upload_media, executor,
+                              window=max(self.media_workers, self.queue_size))
+            inbox = outbox
+        return self._ready(inbox)
+
+    def _ready(self, inbox):
+        for task in drain(inbox):
+            if self.first_ready is None:
+                self.first_ready = time.time()
+                print(f"第一个产品在开始后 {self.first_ready - self.started:.1f} 秒进入上传阶段")
+            yield task
+
+    # 等待各阶段线程结束并输出统计
+    def report(self):
+        for thread in self.threads:
+            thread.join()
+        elapsed = time.time() - self.started
+        print(f"\n流水线统计（总用时 {elapsed:.1f} 秒，从表格写出图片 {self.extract_stats.get('images', 0)} 张）:")
+        for stage, (count, total) in self.stats.items():
+            print(f"  {stage}: {count} 个" + (f"，平均 {total / count:.2f} 秒" if total else ""))
+        if self.first_ready is not None:
+            print(f"  第一个产品进入上传阶段: {self.first_ready - self.started:.1f} 秒")
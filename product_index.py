@@ -0,0 +1,113 @@
+import threading
+from wp_utils import normalize_term_name
+
+# 在已登录的浏览器中分页读取店铺的全部产品（id、名称），一次WebDriver调用完成
+# 先通过admin-ajax的rest-nonce取得REST接口的nonce，再用登录cookie访问wc/v3/products
+# 使用?rest_route=参数，未开启固定链接的网站也能访问
+_LIST_PRODUCTS_JS = """
+var base = arguments[0], done = arguments[arguments.length - 1];
+(async function () {
+    var nonceResponse = await fetch(base + '/wp-admin/admin-ajax.php?action=rest-nonce', {credentials: 'same-origin'});
+    if (!nonceResponse.ok) { throw new Error('rest-nonce ' + nonceResponse.status); }
+    var nonce = (await nonceResponse.text()).trim();
+    var products = [];
+    for (var page = 1; ; page++) {
+        var response = await fetch(base + '/?rest_route=/wc/v3/products&per_page=100&status=any&_fields=id,name&page=' + page,
+                                   {credentials: 'same-origin', headers: {'X-WP-Nonce': nonce}});
+        if (!response.ok) { throw new Error('wc/v3/products ' + response.status); }
+        var batch = await response.json();
+        products = products.concat(batch);
+        if (batch.length < 100) { break; }
+    }
+    done({products: products});
+})().catch(function (e) { done({error: String(e)}); });
+"""
+
+
+# 店铺已有产品的索引：规范化标题 -> 产品ID，只按完整标题匹配（标题为 "品牌 型号 英文品名"）
+# 不按标题前缀或SKU模糊匹配，避免 "Acme X1" 匹配到 "Acme X1 Pro ..." 这类不同的产品
+# 整个运行只读取一次产品列表，多个浏览器共享，新上传的产品原地加入
+class ProductIndex:
+    def __init__(self):
+        self.titles = {}
+        # 正在上传中的标题，防止表格中重复的产品被两个浏览器同时上传
+        self.claimed = set()
+        self.loaded = False
+        self.lock = threading.Lock()
+
+    def add(self, product_id, name):
+        with self.lock:
+            self.titles.setdefault(normalize_term_name(name), product_id)
+
+    def load(self, products):
+        for product in products:
+            self.add(product['id'], product.get('name', ''))
+        self.loaded = True
+        print(f"已读取店铺现有产品: {len(products)} 个")
+
+    # 按完整标题查找已存在的产品ID，没有时返回None
+    def find(self, title):
+        with self.lock:
+            return self.titles.get(normalize_term_name(title))
+
+    # 准备上传一个产品：已存在返回产品ID，其他浏览器正在上传同一标题返回0，否则占用该标题并返回None
+    # 查找和占用在同一次加锁中完成，两个浏览器不会同时占用同一标题
+    def claim(self, title):
+        key = normalize_term_name(title)
+        with self.lock:
+            product_id = self.titles.get(key)
+            if product_id is not None:
+                return product_id
+            if key in self.claimed:
+                return 0
+            self.claimed.add(key)
+            return None
+
+    # 上传结束后释放占用，上传成功时把新产品加入索引（与释放在同一次加锁中，其他浏览器随后的claim能查到）
+    def release(self, title, product_id=None):
+        key = normalize_term_name(title)
+        with self.lock:
+            if product_id:
+                self.titles.setdefault(key, product_id)
+            self.claimed.discard(key)
+
+
+# 通过REST API读取全部产品（需要应用程序密码）
+def load_products_rest(index, client):
+    index.load(client.list_products())
+
+
+# 在已登录的浏览器中读取全部产品（Selenium模式，无需应用程序密码）
+# 使用缓存的登录状态时浏览器还没有打开任何页面，先打开产品列表页，同源的fetch才能带上登录Cookie
+def load_products_browser(index, driver, wp_url):
+    driver.get(f"{wp_url}/wp-admin/edit.php?post_type=product")
+    driver.set_script_timeout(120)
+    result = driver.execute_async_script(_LIST_PRODUCTS_JS, wp_url)
+    if not result or result.get('error'):
+        raise Exception(f"读取现有产品失败: {(result or {}).get('error')}")
+    index.load(result['products'])
+
+
+# 包装单个任务的上传函数：上传前按标题查索引，已存在的产品直接跳过（不打开添加产品页面）
+# process_task(driver, task, status)与RunJournal.wrap的约定相同，已存在时status['existing']为True
+def skip_existing(products, process_task):
+    def process_checked(driver, task, status=None):
+        status = {} if status is None else status
+        title = task.title
+        product_id = products.claim(title)
+        if product_id is not None:
+            if product_id:
+                print(f"产品已存在，跳过: {title} (ID: {product_id})")
+                status['existing'] = True
+                status['post_id'] = product_id
+            else:
+                print(f"相同的产品正在由其他浏览器上传，跳过: {title}")
+                status['skipped'] = "重复的产品"
+            return False
+        uploaded = False
+        try:
+            uploaded = process_task(driver, task, status)
+        finally:
+            products.release(title, status.get('post_id') if uploaded else None)
+        return uploaded
+    return process_checked
@@ -0,0 +1,123 @@
+import time
+import sqlite3
+import threading
+from wp_utils import normalize_wp_url
+
+# 上传日志文件，记录每一行产品的上传状态，用于中断后继续上传
+JOURNAL_FILE = "upload_journal.sqlite"
+
+PENDING = "pending"
+PUBLISHED = "published"
+FAILED = "failed"
+# 缺少图片或英文名等数据问题跳过的行，下次运行时重新检查
+SKIPPED = "skipped"
+
+
+# 持久化的上传日志：按 (网站, 行标识) 记录状态（pending/published/failed/skipped）、产品ID和失败时的操作
+# 每次状态变化立即写入，程序崩溃或被中断后仍能知道哪些产品已经发布
+# 行标识使用上传计划中的task.key（在过滤之前对完整表格生成，重复产品的编号不变）
+class RunJournal:
+    def __init__(self, wp_url, path=JOURNAL_FILE):
+        self.wp_url = normalize_wp_url(wp_url)
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS rows ("
+            " wp_url TEXT NOT NULL,"
+            " row_key TEXT NOT NULL,"
+            " excel_row INTEGER,"
+            " state TEXT NOT NULL,"
+            " post_id INTEGER,"
+            " operation TEXT,"
+            " error TEXT,"
+            " updated_at REAL,"
+            " PRIMARY KEY (wp_url, row_key))"
+        )
+        self.conn.commit()
+
+    def _write(self, key, excel_row, state, post_id=None, operation=None, error=None):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO rows VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.wp_url, key, excel_row, state, post_id, operation, error, time.time()),
+            )
+            self.conn.commit()
+
+    def mark_pending(self, key, excel_row, post_id=None):
+        self._write(key, excel_row, PENDING, post_id)
+
+    def mark_published(self, key, excel_row, post_id=None):
+        self._write(key, excel_row, PUBLISHED, post_id)
+
+    def mark_failed(self, key, excel_row, operation=None, error=None, post_id=None):
+        self._write(key, excel_row, FAILED, post_id, operation, error)
+
+    def mark_skipped(self, key, excel_row, reason):
+        self._write(key, excel_row, SKIPPED, operation=reason)
+
+    # 当前网站的全部记录：{行标识: (状态, 产品ID, 失败时的操作)}
+    def states(self):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT row_key, state, post_id, operation FROM rows WHERE wp_url = ?", (self.wp_url,)
+            ).fetchall()
+        return {key: (state, post_id, operation) for key, state, post_id, operation in rows}
+
+    # 包装单个任务的上传函数：上传前记为pending，完成后按结果记为published或failed
+    # process_task(driver, task, status)把产品ID、失败时的操作或跳过原因写入status字典；
+    # 读到草稿的产品ID时通过record_post_id立即写入日志，浏览器崩溃或程序被结束时也能知道要检查哪个草稿
+    def wrap(self, process_task):
+        def process_logged(driver, task, status=None):
+            self.mark_pending(task.key, task.excel_row)
+            status = {} if status is None else status
+            status['on_post_id'] = lambda post_id: self.mark_pending(task.key, task.excel_row, post_id)
+            try:
+                uploaded = process_task(driver, task, status)
+            except Exception as e:
+                self.mark_failed(task.key, task.excel_row, status.get('operation'), str(e), status.get('post_id'))
+                raise
+            # 店铺中已存在的产品同样记为已发布
+            if uploaded or status.get('existing'):
+                self.mark_published(task.key, task.excel_row, status.get('post_id'))
+            elif status.get('skipped'):
+                self.mark_skipped(task.key, task.excel_row, status['skipped'])
+            else:
+                self.mark_failed(task.key, task.excel_row, status.get('operation'), status.get('error'),
+                                 status.get('post_id'))
+            return uploaded
+        return process_logged
+
+    # 记录上传计划中跳过的行（缺少图片或英文名等）
+    def mark_plan_skipped(self, skipped):
+        for task in skipped:
+            self.mark_skipped(task.key, task.excel_row, task.skip_reason)
+
+    def close(self):
+        self.conn.close()
+
+
+# 记录正在上传的产品ID（发布前从编辑页面读取），status来自RunJournal.wrap时同时写入上传日志
+def record_post_id(status, post_id):
+    status['post_id'] = post_id
+    if post_id and status.get('on_post_id'):
+        status['on_post_id'](post_id)
+
+
+# --resume: 去掉日志中已发布的任务，不再为它们打开浏览器；上次中断在发布过程中的行提示人工确认
+def skip_completed_rows(tasks, journal):
+    states = journal.states()
+    remaining = []
+    for task in tasks:
+        state, post_id, operation = states.get(task.key, (None, None, None))
+        if state == PUBLISHED:
+            continue
+        if state == PENDING:
+            print(f"警告: 行 {task.excel_row} ({task.key}) 上次在上传过程中中断，将重新上传"
+                  + (f"，请检查草稿/产品ID {post_id} 是否已发布" if post_id else ""))
+        elif state == FAILED:
+            print(f"行 {task.excel_row} ({task.key}) 上次失败于: {operation or '未知操作'}，将重新上传")
+        remaining.append(task)
+    if len(remaining) < len(tasks):
+        print(f"继续上次的上传: 跳过 {len(tasks) - len(remaining)} 个已发布的产品，剩余 {len(remaining)} 个")
+    return remaining
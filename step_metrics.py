@@ -0,0 +1,209 @@
+import csv
+import json
+import math
+import time
+import threading
+
+# 运行报告和Prometheus指标的默认文件
+REPORT_FILE = "run_report.json"
+METRICS_FILE = "run_metrics.prom"
+# 整个产品从开始到结束的用时，与各步骤一起统计
+PRODUCT_STEP = "整个产品"
+
+
+# 按最近秩法计算百分位数，values必须已排序
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(values)))
+    return values[min(rank, len(values)) - 1]
+
+
+# 一个产品的步骤计时器：每次start(步骤名)结束上一个步骤并开始下一个，finish()时一次性写入统计
+# 用法与原来的 current_operation 相同：current_operation = steps.start("填写产品标题")
+class StepTimer:
+    def __init__(self, stats):
+        self.stats = stats
+        self.started = time.time()
+        self.current = None
+        self.current_start = self.started
+        self.durations = []
+        self.finished = False
+
+    def start(self, step):
+        now = time.time()
+        if self.current is not None:
+            self.durations.append((self.current, now - self.current_start))
+        self.current = step
+        self.current_start = now
+        return step
+
+    # 结束计时：uploaded为是否上传成功，failed_step为失败时所在的步骤（默认为当前步骤）
+    # 重复调用时只记录第一次
+    def finish(self, uploaded, failed_step=None):
+        if self.finished:
+            return
+        self.finished = True
+        self.start(None)
+        self.stats.record_product(self.durations, time.time() - self.started,
+                                  None if uploaded else (failed_step or "未知操作"))
+
+
+# 各步骤的用时和失败次数统计，多个浏览器共享
+class StepStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = time.time()
+            self.durations = {}
+            self.failures = {}
+            self.retries = {}
+            self.uploaded = 0
+            self.failed = 0
+
+    def timer(self):
+        return StepTimer(self)
+
+    def record_product(self, durations, total, failed_step=None):
+        with self.lock:
+            for step, seconds in durations:
+                self.durations.setdefault(step, []).append(seconds)
+            self.durations.setdefault(PRODUCT_STEP, []).append(total)
+            if failed_step:
+                self.failed += 1
+                self.failures[failed_step] = self.failures.get(failed_step, 0) + 1
+            else:
+                self.uploaded += 1
+
+    # 记录一次步骤重试（见step_retry.retry_step）
+    def record_retry(self, step):
+        with self.lock:
+            self.retries[step] = self.retries.get(step, 0) + 1
+
+    # 汇总为报告数据：每个步骤的次数、总用时、p50/p95/最大值、失败次数和重试次数
+    def summary(self):
+        with self.lock:
+            elapsed = time.time() - self.started
+            steps = []
+            extra_steps = [s for s in list(self.failures) + list(self.retries) if s not in self.durations]
+            for step in list(self.durations) + list(dict.fromkeys(extra_steps)):
+                values = sorted(self.durations.get(step, []))
+                steps.append({
+                    'step': step,
+                    'count': len(values),
+                    'total_seconds': round(sum(values), 3),
+                    'p50_seconds': round(percentile(values, 0.5), 3),
+                    'p95_seconds': round(percentile(values, 0.95), 3),
+                    'max_seconds': round(values[-1], 3) if values else 0.0,
+                    'failures': self.failures.get(step, 0),
+                    'retries': self.retries.get(step, 0),
+                })
+            return {
+                'started_at': self.started,
+                'elapsed_seconds': round(elapsed, 3),
+                'uploaded': self.uploaded,
+                'failed': self.failed,
+                'products_per_hour': round(self.uploaded / elapsed * 3600, 1) if elapsed > 0 else 0.0,
+                'steps': steps,
+            }
+
+    # 在控制台输出各步骤用时，按总用时从高到低排列
+    def print_summary(self, summary=None):
+        summary = summary or self.summary()
+        retries = sum(step['retries'] for step in summary['steps'])
+        print(f"\n步骤用时统计（成功 {summary['uploaded']} 个，失败 {summary['failed']} 个，"
+              f"每小时 {summary['products_per_hour']} 个产品"
+              + (f"，步骤重试 {retries} 次" if retries else "") + "）:")
+        print(f"{pad_display('步骤', 24)}{'次数':>6}{'总计':>8}{'p50':>8}{'p95':>8}{'最大':>6}{'失败':>4}")
+        for step in sorted(summary['steps'], key=lambda s: -s['total_seconds']):
+            print(f"{pad_display(step['step'], 24)}{step['count']:>8}{step['total_seconds']:>10.1f}{step['p50_seconds']:>8.2f}"
+                  f"{step['p95_seconds']:>8.2f}{step['max_seconds']:>8.2f}{step['failures']:>6}")
+
+    # 写入报告文件，扩展名为.csv时写CSV（每个步骤一行），否则写JSON
+    def write_report(self, path, summary=None):
+        summary = summary or self.summary()
+        if path.lower().endswith(".csv"):
+            with open(path, "w", newline="", encoding="utf-8-sig") as f:
+                writer = csv.DictWriter(f, fieldnames=list(summary['steps'][0]) if summary['steps'] else ['step'])
+                writer.writeheader()
+                writer.writerows(summary['steps'])
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"运行报告已保存到 {path}")
+
+    # 写入Prometheus文本格式的指标（可以用node_exporter的textfile收集器采集）
+    def write_metrics(self, path, summary=None):
+        summary = summary or self.summary()
+        lines = [
+            "# HELP wp_uploader_step_seconds Time spent in each upload step.",
+            "# TYPE wp_uploader_step_seconds summary",
+        ]
+        for step in summary['steps']:
+            label = prometheus_label(step['step'])
+            lines.append(f'wp_uploader_step_seconds{{step="{label}",quantile="0.5"}} {step["p50_seconds"]}')
+            lines.append(f'wp_uploader_step_seconds{{step="{label}",quantile="0.95"}} {step["p95_seconds"]}')
+            lines.append(f'wp_uploader_step_seconds_sum{{step="{label}"}} {step["total_seconds"]}')
+            lines.append(f'wp_uploader_step_seconds_count{{step="{label}"}} {step["count"]}')
+        lines += [
+            "# HELP wp_uploader_step_max_seconds Slowest run of each upload step.",
+            "# TYPE wp_uploader_step_max_seconds gauge",
+        ]
+        lines += [f'wp_uploader_step_max_seconds{{step="{prometheus_label(s["step"])}"}} {s["max_seconds"]}'
+                  for s in summary['steps']]
+        lines += [
+            "# HELP wp_uploader_step_failures_total Products that failed in each step.",
+            "# TYPE wp_uploader_step_failures_total counter",
+        ]
+        lines += [f'wp_uploader_step_failures_total{{step="{prometheus_label(s["step"])}"}} {s["failures"]}'
+                  for s in summary['steps']]
+        lines += [
+            "# HELP wp_uploader_step_retries_total Retries of each upload step.",
+            "# TYPE wp_uploader_step_retries_total counter",
+        ]
+        lines += [f'wp_uploader_step_retries_total{{step="{prometheus_label(s["step"])}"}} {s["retries"]}'
+                  for s in summary['steps']]
+        lines += [
+            "# HELP wp_uploader_products_total Products processed in this run.",
+            "# TYPE wp_uploader_products_total counter",
+            f'wp_uploader_products_total{{result="uploaded"}} {summary["uploaded"]}',
+            f'wp_uploader_products_total{{result="failed"}} {summary["failed"]}',
+            "# HELP wp_uploader_products_per_hour Successful uploads per hour over the run.",
+            "# TYPE wp_uploader_products_per_hour gauge",
+            f"wp_uploader_products_per_hour {summary['products_per_hour']}",
+            "# HELP wp_uploader_run_seconds Duration of the run.",
+            "# TYPE wp_uploader_run_seconds gauge",
+            f"wp_uploader_run_seconds {summary['elapsed_seconds']}",
+        ]
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        print(f"Prometheus指标已保存到 {path}")
+
+    # 输出控制台统计并写入报告和指标文件（路径为空则不写）
+    def report(self, report_file=REPORT_FILE, metrics_file=METRICS_FILE):
+        summary = self.summary()
+        self.print_summary(summary)
+        for path, write in ((report_file, self.write_report), (metrics_file, self.write_metrics)):
+            if path:
+                try:
+                    write(path, summary)
+                except OSError as e:
+                    print(f"保存 {path} 失败: {e}")
+        return summary
+
+
+# 按显示宽度左对齐（中文字符占两个字符宽度）
+def pad_display(text, width):
+    display_width = sum(2 if ord(char) > 0x2E80 else 1 for char in text)
+    return text + " " * max(1, width - display_width)
+
+
+# Prometheus标签值需要转义反斜杠、双引号和换行
+def prometheus_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+step_stats = StepStats()
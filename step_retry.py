@@ -0,0 +1,137 @@
+import time
+import random
+import threading
+from step_metrics import step_stats
+from concurrency_control import concurrency
+
+
+# 单个步骤的重试策略：失败后按指数退避等待 base_delay × 2^(n-1) 秒（不超过max_delay，附加随机抖动）再重试
+# retries为每个步骤各自的重试次数上限，一个步骤用完重试次数不影响其他步骤
+class RetryPolicy:
+    def __init__(self, retries=2, base_delay=1.0, max_delay=30.0, jitter=0.2):
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    # 第attempt次失败后的等待秒数（attempt从1开始）
+    def delay(self, attempt):
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay * (1 + random.uniform(0, self.jitter))
+
+
+# 熔断器：所有浏览器共享，连续失败threshold次（中间没有任何步骤成功）时认为服务器已不可用，
+# 暂停所有步骤cooldown秒；暂停结束后放行，下一次成功即恢复，仍然失败则再次暂停
+class CircuitBreaker:
+    def __init__(self, threshold=8, cooldown=60.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.open_until = 0.0
+        self.trips = 0
+
+    def reset(self):
+        with self.lock:
+            self.failures = 0
+            self.open_until = 0.0
+            self.trips = 0
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.threshold and self.failures >= self.threshold and time.time() >= self.open_until:
+                self.open_until = time.time() + self.cooldown
+                self.failures = 0
+                self.trips += 1
+                print(f"连续 {self.threshold} 次操作失败，服务器可能不可用，暂停 {self.cooldown:.0f} 秒后继续")
+
+    # 熔断期间等待，直到暂停结束
+    def wait(self):
+        while True:
+            with self.lock:
+                delay = self.open_until - time.time()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+
+retry_policy = RetryPolicy()
+circuit_breaker = CircuitBreaker()
+
+
+# 执行一个步骤，出错时按retry_policy退避重试；超过重试次数后抛出最后一次的异常
+# 每次尝试前先经过熔断器，成功和失败都计入熔断器；retryable(异常)返回False的错误不重试、不计入熔断器，直接抛出
+# 每次尝试的用时和错误交给并发控制器（concurrency_control），用于判断服务器负载
+def retry_step(step, func, policy=None, breaker=None, retryable=None):
+    policy = policy or retry_policy
+    breaker = breaker or circuit_breaker
+    attempt = 0
+    while True:
+        breaker.wait()
+        started = time.time()
+        try:
+            result = func()
+        except Exception as e:
+            concurrency.observe(step, time.time() - started, e)
+            if retryable and not retryable(e):
+                raise
+            breaker.record_failure()
+            attempt += 1
+            if attempt > policy.retries:
+                raise
+            delay = policy.delay(attempt)
+            step_stats.record_retry(step)
+            print(f"{step}失败（第 {attempt} 次）: {e}，{delay:.1f} 秒后重试")
+            time.sleep(delay)
+        else:
+            concurrency.observe(step, time.time() - started)
+            breaker.record_success()
+            return result
+
+
+# 运行结束前重试失败的产品：本轮失败的任务放入队列，主任务全部完成后再按rounds轮重新上传
+class RetryQueue:
+    def __init__(self, rounds=1):
+        self.rounds = rounds
+        self.lock = threading.Lock()
+        self.tasks = []
+        self.attempts = {}
+
+    # 记录失败的任务，还有重试机会时放入队列，返回是否放入
+    def add(self, task):
+        with self.lock:
+            attempts = self.attempts.get(task.key, 0)
+            if attempts >= self.rounds:
+                return False
+            self.attempts[task.key] = attempts + 1
+            self.tasks.append(task)
+        print(f"行 {task.excel_row} ({task.key}) 上传失败，放入重试队列，将在其他产品完成后重试")
+        return True
+
+    def pop(self):
+        with self.lock:
+            return self.tasks.pop(0) if self.tasks else None
+
+    def __len__(self):
+        with self.lock:
+            return len(self.tasks)
+
+
+# 先依次产出tasks中的任务，全部完成后再产出重试队列中的任务（单线程使用，重试时再次失败的任务会继续产出）
+def with_retries(tasks, retry_queue):
+    yield from tasks
+    while True:
+        task = retry_queue.pop()
+        if task is None:
+            return
+        yield task
+
+
+# 判断一次上传是否失败（需要重试）：已存在或被跳过的产品不算失败
+def upload_failed(uploaded, status):
+    return not uploaded and not status.get('existing') and not status.get('skipped')
@@ -0,0 +1,173 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from step_retry import retry_step
+from woo_api import retryable_error
+from wp_utils import normalize_term_name
+
+# 一次性读取分类/品牌列表中的全部词条：[[词条ID, 名称], ...]
+# 只需要一次WebDriver调用，避免逐个读取label.text产生几百次往返
+_READ_TERMS_JS = """
+var onlyChecked = arguments[1];
+var result = [];
+document.querySelectorAll('#' + arguments[0] + ' li label input[type=checkbox]').forEach(function (box) {
+    if (!onlyChecked || box.checked) {
+        result.push([box.value, box.parentNode.textContent.trim()]);
+    }
+});
+return result;
+"""
+
+# 按词条ID勾选复选框，找不到返回false
+_CHECK_TERM_JS = """
+var box = document.getElementById('in-' + arguments[0] + '-' + arguments[1]);
+if (!box) { return false; }
+if (!box.checked) { box.click(); }
+return true;
+"""
+
+# 在页面中依次通过admin-ajax新建词条（与"添加新分类"按钮发出的请求相同），一次WebDriver调用完成整批
+# 返回 {名称: 词条ID}，失败的名称对应null
+_CREATE_TERMS_JS = """
+var taxonomy = arguments[0], names = arguments[1], done = arguments[arguments.length - 1];
+var nonceField = document.getElementById('_ajax_nonce-add-' + taxonomy);
+if (!nonceField) { done(null); return; }
+var url = window.ajaxurl || '/wp-admin/admin-ajax.php';
+var pattern = new RegExp('in-' + taxonomy + '-(\\d+)');
+(async function () {
+    var results = {};
+    for (var i = 0; i < names.length; i++) {
+        var body = new URLSearchParams();
+        body.append('action', 'add-' + taxonomy);
+        body.append('new' + taxonomy, names[i]);
+        body.append('new' + taxonomy + '_parent', '-1');
+        body.append('_ajax_nonce-add-' + taxonomy, nonceField.value);
+        try {
+            var response = await fetch(url, {method: 'POST', credentials: 'same-origin', body: body});
+            var match = (await response.text()).match(pattern);
+            results[names[i]] = match ? parseInt(match[1], 10) : null;
+        } catch (e) {
+            results[names[i]] = null;
+        }
+    }
+    done(results);
+})();
+"""
+
+
+# 分类/品牌索引：规范化名称 -> 词条ID
+# 整个运行只从页面读取一次，多个浏览器共享；新建词条后原地更新
+class TaxonomyIndex:
+    def __init__(self, taxonomy):
+        self.taxonomy = taxonomy
+        self.checklist_id = f"{taxonomy}checklist"
+        self.terms = {}
+        self.loaded = False
+        self.lock = threading.Lock()
+
+    # 从当前的添加产品页面读取全部词条（只在第一次调用时读取）
+    def ensure_loaded(self, driver):
+        with self.lock:
+            if self.loaded:
+                return
+            for term_id, name in driver.execute_script(_READ_TERMS_JS, self.checklist_id, False):
+                self.terms.setdefault(normalize_term_name(name), int(term_id))
+            self.loaded = True
+        print(f"已读取 {self.taxonomy} 词条索引: {len(self.terms)} 个")
+
+    # 按规范化名称精确查找词条ID，不存在返回None
+    # 不按"名称包含"匹配，否则 "Bolt" 会被当作已存在的 "Bolt Cutter"，既不会创建也会勾选错误的分类
+    def find(self, name):
+        key = normalize_term_name(name)
+        if not key:
+            return None
+        with self.lock:
+            return self.terms.get(key)
+
+    def add(self, name, term_id):
+        with self.lock:
+            self.terms[normalize_term_name(name)] = int(term_id)
+
+    # 按ID勾选词条，成功返回True
+    def check(self, driver, term_id):
+        return bool(driver.execute_script(_CHECK_TERM_JS, self.taxonomy, term_id))
+
+    # 查找并勾选词条，成功返回词条ID，不存在返回None
+    def select(self, driver, name):
+        term_id = self.find(name)
+        if term_id and self.check(driver, term_id):
+            return term_id
+        return None
+
+    # 批量新建词条并加入索引，返回创建失败的名称列表
+    def create_terms(self, driver, names):
+        if not names:
+            return []
+        # 每个词条一次ajax请求，按数量放宽脚本超时时间
+        driver.set_script_timeout(max(30, len(names) * 10))
+        results = driver.execute_async_script(_CREATE_TERMS_JS, self.taxonomy, list(names))
+        if results is None:
+            raise Exception(f"页面中找不到 {self.taxonomy} 的添加词条表单（当前用户可能没有管理分类的权限）")
+        failed = []
+        for name in names:
+            term_id = results.get(name)
+            if term_id:
+                self.add(name, term_id)
+            else:
+                failed.append(name)
+        return failed
+
+    # 不经过页面，用复用浏览器登录状态的HTTP会话（wp_ajax.AdminAjaxSession）并发新建词条并加入索引，返回创建失败的名称列表
+    def create_terms_http(self, session, names, workers=4):
+        def create(name):
+            return retry_step(f"新建{self.taxonomy}", lambda: session.create_term(self.taxonomy, name),
+                              retryable=retryable_error)
+
+        failed = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for name, future in [(name, executor.submit(create, name)) for name in names]:
+                try:
+                    self.add(name, future.result())
+                except Exception as e:
+                    print(f"新建 {self.taxonomy} 词条 {name} 失败: {e}")
+                    failed.append(name)
+        return failed
+
+
+# 收集上传计划中用到的全部分类（英文品名）和品牌，去重并保持出现顺序
+def collect_term_names(tasks):
+    categories = {}
+    brands = {}
+    for task in tasks:
+        if task.english_name.strip():
+            categories.setdefault(normalize_term_name(task.english_name), task.english_name.strip())
+        if task.brand.strip():
+            brands.setdefault(normalize_term_name(task.brand), task.brand.strip())
+    return {'product_cat': list(categories.values()), 'product_brand': list(brands.values())}
+
+
+# 在上传任何产品之前，一次性创建所有缺少的分类和品牌
+# 之后每个产品只需要勾选已存在的词条，多个浏览器也不会重复创建同一个词条
+# session（wp_ajax.AdminAjaxSession）不为空时直接发送HTTP请求并发创建，否则在页面中逐个创建
+def precreate_missing_terms(driver, wp_url, tasks, taxonomies, session=None):
+    print("检查需要的产品分类和品牌...")
+    driver.get(f"{wp_url}/wp-admin/post-new.php?post_type=product")
+    WebDriverWait(driver, 15).until(
+        EC.presence_of_element_located((By.ID, "product_catchecklist"))
+    )
+    for taxonomy, names in collect_term_names(tasks).items():
+        term_index = taxonomies[taxonomy]
+        term_index.ensure_loaded(driver)
+        missing = [name for name in names if term_index.find(name) is None]
+        label = "产品分类" if taxonomy == "product_cat" else "品牌"
+        print(f"共需要 {len(names)} 个{label}，其中 {len(missing)} 个不存在，将批量创建")
+        if session is not None:
+            failed = term_index.create_terms_http(session, missing)
+        else:
+            failed = term_index.create_terms(driver, missing)
+        if missing:
+            print(f"已创建 {len(missing) - len(failed)} 个{label}")
+        if failed:
+            print(f"警告: 以下{label}创建失败，相关产品的{label}可能未正确设置: {', '.join(failed)}")
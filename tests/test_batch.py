@@ -0,0 +1,126 @@
+import pytest
+import requests
+from step_retry import retry_policy
+from upload_plan import UploadTask
+from product_index import ProductIndex
+from woo_api import upload_via_rest_batch
+
+
+def make_tasks(count):
+    return [UploadTask(i, f"Acme|M-{i}|螺丝", "Acme", f"M-{i}", "10", "螺丝", "Screw", "") for i in range(count)]
+
+
+# 按名称让批量请求中的单个产品失败；batch_error不为空时整个批量请求失败
+class FakeBatchClient:
+    def __init__(self, fail_names=(), batch_error=None):
+        self.fail_names = set(fail_names)
+        self.batch_error = batch_error
+        self.next_id = 100
+        self.batches = []
+        self.single_creates = []
+        self.single_updates = []
+
+    def _new_id(self):
+        self.next_id += 1
+        return self.next_id
+
+    def list_terms(self, taxonomy):
+        return []
+
+    def batch_terms(self, taxonomy, names):
+        return {'create': [{'id': self._new_id(), 'name': name} for name in names]}
+
+    def create_term(self, taxonomy, name):
+        return self._new_id()
+
+    def batch_products(self, create=(), update=()):
+        self.batches.append(([item['name'] for item in create], [item['id'] for item in update]))
+        if self.batch_error:
+            raise self.batch_error
+        created = []
+        for payload in create:
+            if payload['name'] in self.fail_names:
+                created.append({'id': 0, 'error': {'code': 'product_invalid_sku', 'message': "SKU已存在"}})
+            else:
+                created.append({'id': self._new_id(), 'name': payload['name']})
+        return {'create': created, 'update': [{'id': item['id']} for item in update]}
+
+    def create_product(self, payload):
+        self.single_creates.append(payload['name'])
+        return {'id': self._new_id()}
+
+    def update_product(self, product_id, payload):
+        self.single_updates.append(product_id)
+        return {'id': product_id}
+
+
+# 记录每次状态写入：(状态, 行标识, Excel行号, 产品ID或失败原因)
+class RecordingJournal:
+    def __init__(self):
+        self.calls = []
+
+    def mark_pending(self, key, excel_row, post_id=None):
+        self.calls.append(('pending', key, excel_row, post_id))
+
+    def mark_published(self, key, excel_row, post_id=None):
+        self.calls.append(('published', key, excel_row, post_id))
+
+    def mark_failed(self, key, excel_row, operation=None, error=None, post_id=None):
+        self.calls.append(('failed', key, excel_row, error))
+
+    def mark_skipped(self, key, excel_row, reason):
+        self.calls.append(('skipped', key, excel_row, reason))
+
+    def final(self):
+        return {call[1]: call for call in self.calls}
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr(retry_policy, 'retries', 0)
+
+
+# 第2个批次的第1个产品失败，失败原因写到该产品对应的Excel行
+def test_item_error_maps_to_excel_row():
+    tasks = make_tasks(5)
+    client = FakeBatchClient(fail_names=[tasks[2].title])
+    journal = RecordingJournal()
+    uploaded = upload_via_rest_batch(tasks, client, with_images=False, journal=journal, retry_rounds=0,
+                                     batch_size=2, batch_workers=1)
+    assert uploaded == 4
+    assert [len(created) for created, _ in client.batches] == [2, 2, 1]
+    final = journal.final()
+    assert final[tasks[2].key][:3] == ('failed', tasks[2].key, 4)
+    assert "SKU已存在" in final[tasks[2].key][3]
+    assert all(final[task.key][0] == 'published' for task in tasks if task is not tasks[2])
+    assert client.single_creates == []
+
+
+def test_item_error_is_retried_individually():
+    tasks = make_tasks(3)
+    client = FakeBatchClient(fail_names=[tasks[1].title])
+    journal = RecordingJournal()
+    uploaded = upload_via_rest_batch(tasks, client, with_images=False, journal=journal, retry_rounds=1,
+                                     batch_size=3, batch_workers=1)
+    assert uploaded == 3
+    assert client.single_creates == [tasks[1].title]
+    assert journal.final()[tasks[1].key][0] == 'published'
+
+
+# 整个批量请求失败（服务器可能已经处理）：创建的产品不逐个重试，更新的产品逐个重试
+def test_failed_batch_retries_only_updates():
+    tasks = make_tasks(3)
+    products = ProductIndex()
+    products.load([{'id': 7, 'name': tasks[0].title}])
+    client = FakeBatchClient(batch_error=requests.ConnectionError("读取响应超时"))
+    journal = RecordingJournal()
+    uploaded = upload_via_rest_batch(tasks, client, with_images=False, journal=journal, products=products,
+                                     update_existing=True, retry_rounds=1, batch_size=3, batch_workers=1)
+    assert uploaded == 1
+    assert client.single_updates == [7]
+    assert client.single_creates == []
+    final = journal.final()
+    assert final[tasks[0].key] == ('published', tasks[0].key, 2, 7)
+    assert [final[task.key][0] for task in tasks[1:]] == ['failed', 'failed']
+    # 失败的产品释放占用，再次运行时可以重新上传
+    assert products.claim(tasks[1].title) is None
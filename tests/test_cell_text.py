@@ -0,0 +1,103 @@
+import os
+import zipfile
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.drawing.image import Image as SheetImage
+from PIL import Image
+from image import extract_images_stream
+from pipeline import iter_sheet_tasks
+from upload_plan import column_text, resolve_prices, build_upload_plan
+from wp_utils import build_image_paths, cell_str
+from xlsx_stream import active_sheet_part, read_shared_strings, iter_sheet_rows, read_float_columns
+
+
+# 型号列是数字且有空单元格（pandas读取为float，文本为 "123.0"），价格列同样有空单元格
+def make_sheet(tmp_path):
+    wb = Workbook()
+    ws = wb.active
+    ws.append(['品牌', '型号', '单价', '品名'])
+    ws.append(['Acme', 123, 10, '螺丝'])
+    ws.append(['Acme', None, 12.5, '螺母'])
+    ws.append(['Beta', 456, None, '垫片'])
+    ws.append(['Be:ta/x', 789, 3, '垫片'])
+    image_path = tmp_path / "1.png"
+    Image.new('RGB', (4, 4)).save(image_path)
+    ws.add_image(SheetImage(str(image_path)), "E2")
+    path = tmp_path / "a.xlsx"
+    wb.save(path)
+    return str(path)
+
+
+def stream_columns(path):
+    with zipfile.ZipFile(path) as zf:
+        sheet_part = active_sheet_part(zf)
+        float_columns = read_float_columns(zf, sheet_part)
+        rows = list(iter_sheet_rows(zf, sheet_part, read_shared_strings(zf), float_columns))
+    return [[values.get(col, "") for _, values in rows[1:]] for col in range(4)]
+
+
+def test_cell_str():
+    assert cell_str(123.0) == "123.0"
+    assert cell_str(123) == "123"
+    assert cell_str(12.5) == "12.5"
+    assert cell_str(float("nan")) == ""
+    assert cell_str(None) == ""
+    assert cell_str("M-1") == "M-1"
+
+
+def test_pandas_and_stream_text_match(tmp_path):
+    path = make_sheet(tmp_path)
+    df = pd.read_excel(path)
+    assert df['型号'].dtype == float
+    brands, models, prices, names = stream_columns(path)
+    assert column_text(df, '型号') == models == ["123.0", "", "456.0", "789.0"]
+    assert column_text(df, '品牌') == brands
+    assert column_text(df, '品名') == names
+    assert resolve_prices(df) == prices == ["10.0", "12.5", "", "3.0"]
+
+
+def test_stream_image_name_matches_upload_plan(tmp_path):
+    path = make_sheet(tmp_path)
+    output_dir = tmp_path / "images"
+    extract_images_stream(path, str(output_dir))
+    df = pd.read_excel(path)
+    expected = build_image_paths(df, str(output_dir))[0]
+    assert os.listdir(output_dir) == [os.path.basename(expected)]
+    assert os.path.basename(expected) == "Acme-123.0-螺丝.jpg"
+
+
+# 流水线（流式读取）与普通流程（pandas）得到相同的标识、价格和图片路径，--resume时不会重复上传
+def test_pipeline_tasks_match_upload_plan(tmp_path):
+    path = make_sheet(tmp_path)
+    image_folder = str(tmp_path / "images")
+    name_map = {'螺丝': 'Screw', '螺母': 'Nut', '垫片': 'Washer'}
+    df = pd.read_excel(path)
+    df['图片路径'] = build_image_paths(df, image_folder)
+    tasks, skipped = build_upload_plan(df, name_map, require_image=False)
+    planned = sorted(tasks + skipped, key=lambda task: task.index)
+    streamed = list(iter_sheet_tasks(path, name_map, image_folder))
+    fields = ('index', 'key', 'brand', 'model', 'price', 'image_path')
+    assert [[getattr(task, name) for name in fields] for task in streamed] == \
+        [[getattr(task, name) for name in fields] for task in planned]
+
+
+# 没有空单元格的整数列pandas读取为int，文本不带".0"
+def test_int_column_without_blanks(tmp_path):
+    wb = Workbook()
+    ws = wb.active
+    ws.append(['品牌', '型号', '单价', '品名'])
+    ws.append(['Acme', 123, 10, '螺丝'])
+    ws.append(['Acme', 124, 11, '螺母'])
+    path = str(tmp_path / "b.xlsx")
+    wb.save(path)
+    df = pd.read_excel(path)
+    brands, models, prices, names = stream_columns(path)
+    assert column_text(df, '型号') == models == ["123", "124"]
+    assert resolve_prices(df) == prices == ["10", "11"]
+
+
+# 图片路径保持原来的命名：只替换斜杠，型号为空时为 "品牌--品名.jpg"
+def test_image_paths_keep_baseline_names(tmp_path):
+    df = pd.read_excel(make_sheet(tmp_path))
+    names = [os.path.basename(path) for path in build_image_paths(df, "images")]
+    assert names == ["Acme-123.0-螺丝.jpg", "Acme--螺母.jpg", "Beta-456.0-垫片.jpg", "Be:ta_x-789.0-垫片.jpg"]
@@ -0,0 +1,9 @@
+from concurrency_control import ConcurrencyController
+
+
+# 只统计每个产品都有的服务器往返，上传前一次性新建词条的用时不参与调整
+def test_observe_only_per_product_round_trips():
+    controller = ConcurrencyController(max_limit=4, interval=3600)
+    for step in ("等待添加新产品页面加载", "上传产品图片", "点击发布按钮", "新建product_cat", "处理产品分类"):
+        controller.observe(step, 1.0)
+    assert sorted(controller.samples) == sorted(["等待添加新产品页面加载", "上传产品图片", "点击发布按钮"])
@@ -0,0 +1,22 @@
+import csv
+from csv_export import csv_list_value, export_woocommerce_csv, CSV_COLUMNS
+from upload_plan import UploadTask
+
+
+def test_csv_list_value_escapes_separators():
+    assert csv_list_value("Nuts, Bolts") == "Nuts\\, Bolts"
+    # ">" 是导入器的父子分类分隔符
+    assert csv_list_value("Size > 10mm") == "Size &gt; 10mm"
+    assert csv_list_value("Screw") == "Screw"
+
+
+def test_export_writes_escaped_categories_and_brands(tmp_path):
+    task = UploadTask(0, "k", "A>B, Inc", "X1", "9.5", "螺丝", "Screws > 10mm", str(tmp_path / "a.jpg"))
+    output_file = tmp_path / "products.csv"
+    written, skipped = export_woocommerce_csv([task], str(output_file), lambda path: "https://cdn/a.jpg")
+    assert (written, skipped) == (1, {})
+    with open(output_file, newline="", encoding="utf-8-sig") as f:
+        rows = list(csv.DictReader(f))
+    assert list(rows[0]) == CSV_COLUMNS
+    assert rows[0]['Categories'] == "Screws &gt; 10mm"
+    assert rows[0]['Brands'] == "A&gt;B\\, Inc"
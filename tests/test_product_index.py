@@ -0,0 +1,76 @@
+import threading
+from product_index import ProductIndex, skip_existing
+
+
+def make_index(products=()):
+    index = ProductIndex()
+    index.load([{'id': product_id, 'name': name} for product_id, name in products])
+    return index
+
+
+def test_claim_existing_returns_id():
+    index = make_index([(7, "Acme X1 Screw")])
+    assert index.claim("acme x1 screw") == 7
+    # 只按完整标题匹配
+    assert index.claim("Acme X1") is None
+
+
+def test_claim_twice_until_release():
+    index = make_index()
+    assert index.claim("Acme X1 Screw") is None
+    assert index.claim("Acme X1 Screw") == 0
+    index.release("Acme X1 Screw")
+    assert index.claim("Acme X1 Screw") is None
+
+
+def test_release_with_id_adds_product():
+    index = make_index()
+    index.claim("Acme X1 Screw")
+    index.release("Acme X1 Screw", 42)
+    assert index.find("Acme X1 Screw") == 42
+    assert index.claim("Acme X1 Screw") == 42
+
+
+# 多个线程同时claim同一标题，只有一个能占用
+def test_claim_is_exclusive_across_threads():
+    index = make_index()
+    barrier = threading.Barrier(8)
+    results = []
+
+    def worker():
+        barrier.wait()
+        results.append(index.claim("Acme X1 Screw"))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results.count(None) == 1
+    assert results.count(0) == 7
+
+
+class FakeTask:
+    def __init__(self, title):
+        self.title = title
+
+
+def test_skip_existing_marks_status_and_releases_on_error():
+    index = make_index([(7, "Acme X1 Screw")])
+    calls = []
+
+    def process(driver, task, status):
+        calls.append(task.title)
+        raise RuntimeError("发布失败")
+
+    process_checked = skip_existing(index, process)
+    status = {}
+    assert process_checked(None, FakeTask("Acme X1 Screw"), status) is False
+    assert status == {'existing': True, 'post_id': 7}
+    try:
+        process_checked(None, FakeTask("Acme X2 Nut"), {})
+    except RuntimeError:
+        pass
+    assert calls == ["Acme X2 Nut"]
+    # 上传失败后释放占用，下次可以重试
+    assert index.claim("Acme X2 Nut") is None
@@ -0,0 +1,77 @@
+import pytest
+from run_journal import RunJournal, record_post_id, skip_completed_rows, PENDING, PUBLISHED, FAILED, SKIPPED
+from upload_plan import UploadTask
+
+
+def make_task(index=0):
+    return UploadTask(index, f"Acme|M-{index}|螺丝", "Acme", f"M-{index}", "10", "螺丝", "Screw", "")
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = RunJournal("example.com", str(tmp_path / "journal.sqlite"))
+    yield journal
+    journal.close()
+
+
+# 读到产品ID后浏览器崩溃或程序被结束（KeyboardInterrupt不会经过mark_failed）：行仍为pending，但已记录草稿ID
+def test_post_id_is_saved_before_publish(journal):
+    task = make_task()
+
+    def process_task(driver, task, status):
+        record_post_id(status, 42)
+        assert journal.states()[task.key] == (PENDING, 42, None)
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        journal.wrap(process_task)(None, task)
+    assert journal.states()[task.key] == (PENDING, 42, None)
+
+
+def test_error_after_post_id_keeps_post_id(journal):
+    task = make_task()
+
+    def process_task(driver, task, status):
+        record_post_id(status, 42)
+        status['operation'] = "点击发布按钮"
+        raise RuntimeError("chrome not reachable")
+
+    with pytest.raises(RuntimeError):
+        journal.wrap(process_task)(None, task)
+    assert journal.states()[task.key] == (FAILED, 42, "点击发布按钮")
+
+
+@pytest.mark.parametrize("result, status, expected", [
+    (True, {'post_id': 7}, (PUBLISHED, 7, None)),
+    (False, {'existing': True, 'post_id': 8}, (PUBLISHED, 8, None)),
+    (False, {'skipped': "重复的产品"}, (SKIPPED, None, "重复的产品")),
+    (False, {'operation': "上传产品图片", 'error': "timeout"}, (FAILED, None, "上传产品图片")),
+])
+def test_wrap_state_transitions(journal, result, status, expected):
+    task = make_task()
+
+    def process_task(driver, task, task_status):
+        task_status.update(status)
+        return result
+
+    assert journal.wrap(process_task)(None, task) is result
+    assert journal.states()[task.key] == expected
+
+
+def test_resume_skips_only_published_rows(journal):
+    tasks = [make_task(i) for i in range(4)]
+    journal.mark_published(tasks[0].key, tasks[0].excel_row, 1)
+    journal.mark_pending(tasks[1].key, tasks[1].excel_row, 2)
+    journal.mark_failed(tasks[2].key, tasks[2].excel_row, "点击发布按钮", "503")
+    assert skip_completed_rows(tasks, journal) == tasks[1:]
+
+
+def test_journal_is_per_site(tmp_path):
+    path = str(tmp_path / "journal.sqlite")
+    task = make_task()
+    first = RunJournal("https://a.example.com", path)
+    first.mark_published(task.key, task.excel_row, 1)
+    second = RunJournal("https://b.example.com", path)
+    assert task.key not in second.states()
+    first.close()
+    second.close()
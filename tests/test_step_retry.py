@@ -0,0 +1,64 @@
+import pytest
+from step_retry import RetryQueue, RetryPolicy, CircuitBreaker, retry_step, with_retries, upload_failed
+from upload_plan import UploadTask
+
+
+def make_task(index):
+    return UploadTask(index, f"Acme|M-{index}|螺丝", "Acme", f"M-{index}", "10", "螺丝", "Screw", "")
+
+
+def test_retry_queue_limits_rounds_per_task():
+    queue = RetryQueue(rounds=2)
+    first, second = make_task(0), make_task(1)
+    assert queue.add(first) and queue.add(second)
+    assert len(queue) == 2
+    assert queue.pop() is first
+    assert queue.add(first)
+    # 第3次失败时不再放入队列
+    assert not queue.add(first)
+    assert [queue.pop(), queue.pop(), queue.pop()] == [second, first, None]
+
+
+# 主任务全部产出后再产出重试队列中的任务，重试时再次失败的任务在还有机会时继续产出
+def test_with_retries_yields_queue_after_tasks():
+    tasks = [make_task(i) for i in range(3)]
+    queue = RetryQueue(rounds=2)
+    seen = []
+    for task in with_retries(tasks, queue):
+        seen.append(task.index)
+        if task.index == 1:
+            queue.add(task)
+    assert seen == [0, 1, 2, 1, 1]
+
+
+@pytest.mark.parametrize("uploaded, status, failed", [
+    (True, {}, False),
+    (False, {}, True),
+    (False, {'existing': True}, False),
+    (False, {'skipped': "重复的产品"}, False),
+])
+def test_upload_failed(uploaded, status, failed):
+    assert upload_failed(uploaded, status) is failed
+
+
+def test_retry_step_stops_on_non_retryable_error():
+    calls = []
+
+    def step():
+        calls.append(1)
+        raise ValueError("参数错误")
+    with pytest.raises(ValueError):
+        retry_step("测试步骤", step, policy=RetryPolicy(retries=3, base_delay=0), breaker=CircuitBreaker(),
+                   retryable=lambda e: not isinstance(e, ValueError))
+    assert len(calls) == 1
+
+
+def test_retry_step_retries_until_success():
+    attempts = iter([RuntimeError("503"), RuntimeError("503"), None])
+
+    def step():
+        error = next(attempts)
+        if error:
+            raise error
+        return "ok"
+    assert retry_step("测试步骤", step, policy=RetryPolicy(retries=2, base_delay=0), breaker=CircuitBreaker()) == "ok"
@@ -0,0 +1,49 @@
+from taxonomy_index import TaxonomyIndex, _READ_TERMS_JS, _CHECK_TERM_JS, collect_term_names
+from upload_plan import UploadTask
+
+
+# 只模拟读取词条和按ID勾选两个脚本
+class FakeDriver:
+    def __init__(self, terms):
+        self.terms = terms
+        self.checked = []
+
+    def execute_script(self, script, *args):
+        if script == _READ_TERMS_JS:
+            return [[str(term_id), name] for term_id, name in self.terms]
+        if script == _CHECK_TERM_JS:
+            self.checked.append(args[1])
+            return True
+        raise AssertionError(script)
+
+
+def make_index(terms):
+    driver = FakeDriver(terms)
+    index = TaxonomyIndex('product_cat')
+    index.ensure_loaded(driver)
+    return index, driver
+
+
+def test_find_matches_whole_normalized_name():
+    index, _ = make_index([(3, "Bolt Cutter"), (4, "Nuts &amp; Bolts")])
+    assert index.find("bolt cutter") == 3
+    assert index.find("Nuts & Bolts") == 4
+    # 名称只是已有词条的一部分时视为不存在
+    assert index.find("Bolt") is None
+    assert index.find("") is None
+
+
+def test_select_checks_only_exact_term():
+    index, driver = make_index([(3, "Bolt Cutter")])
+    assert index.select(driver, "Bolt") is None
+    assert index.select(driver, "Bolt Cutter") == 3
+    assert driver.checked == [3]
+
+
+# 批量创建前的检查：只是已有词条一部分的名称也会被创建
+def test_missing_terms_include_partial_names():
+    index, _ = make_index([(3, "Bolt Cutter")])
+    tasks = [UploadTask(0, "k1", "Acme", "X1", "1", "螺栓", "Bolt", ""),
+             UploadTask(1, "k2", "Acme", "X2", "1", "剪", "Bolt Cutter", "")]
+    names = collect_term_names(tasks)['product_cat']
+    assert [name for name in names if index.find(name) is None] == ["Bolt"]
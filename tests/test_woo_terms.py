@@ -0,0 +1,53 @@
+import pytest
+from woo_api import WooClient, WooApiError, ensure_term, load_term_ids, existing_term_id
+from wp_utils import normalize_term_name
+
+
+class FakeTermClient:
+    def __init__(self, terms):
+        self.terms = terms
+        self.created = []
+
+    def list_terms(self, taxonomy):
+        return self.terms.get(taxonomy, [])
+
+    def create_term(self, taxonomy, name):
+        self.created.append(name)
+        return 100 + len(self.created)
+
+
+def test_normalize_term_name():
+    assert normalize_term_name("Nuts &amp; Bolts") == normalize_term_name(" nuts  & BOLTS ")
+
+
+# REST返回的名称是HTML实体转义后的，表格中是原文，两者应对应同一个词条
+def test_existing_escaped_term_is_not_created_again():
+    client = FakeTermClient({'product_cat': [{'id': 5, 'name': "Nuts &amp; Bolts"}]})
+    term_ids = load_term_ids(client)
+    assert ensure_term(client, 'product_cat', "Nuts & Bolts", term_ids['product_cat']) == 5
+    assert ensure_term(client, 'product_brand', "Acme", term_ids['product_brand']) == 101
+    assert ensure_term(client, 'product_brand', "ACME ", term_ids['product_brand']) == 101
+    assert client.created == ["Acme"]
+
+
+def test_existing_term_id():
+    error = {'code': 'term_exists', 'message': "exists", 'data': {'status': 400, 'resource_id': 9}}
+    assert existing_term_id(error) == 9
+    assert existing_term_id({'code': 'rest_invalid_param', 'data': {'resource_id': 9}}) is None
+    assert existing_term_id(None) is None
+
+
+# 单个创建返回term_exists时使用已有词条的ID
+def test_create_term_uses_resource_id(monkeypatch):
+    client = WooClient("https://example.com", "user", "pass")
+
+    def request(method, path, **kwargs):
+        raise WooApiError("POST 返回 400", 400, {'code': 'term_exists', 'data': {'status': 400, 'resource_id': 9}})
+    monkeypatch.setattr(client, 'request', request)
+    assert client.create_term('product_cat', "Nuts & Bolts") == 9
+
+    def forbidden(method, path, **kwargs):
+        raise WooApiError("POST 返回 403", 403, {'code': 'rest_cannot_create'})
+    monkeypatch.setattr(client, 'request', forbidden)
+    with pytest.raises(WooApiError):
+        client.create_term('product_cat', "Nuts & Bolts")
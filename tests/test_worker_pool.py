@@ -0,0 +1,47 @@
+import pytest
+from worker_pool import run_worker_pool, StopUpload
+
+
+class FakeTask:
+    def __init__(self, index):
+        self.excel_row = index + 2
+
+
+class FakeDriver:
+    def quit(self):
+        pass
+
+
+def failing_login():
+    raise Exception("登录页面加载失败")
+
+
+# 所有浏览器都登录失败时不能当作上传了0个产品正常结束
+@pytest.mark.parametrize("workers", [1, 3])
+def test_all_logins_failed_raises(workers):
+    tasks = [FakeTask(i) for i in range(5)]
+    with pytest.raises(Exception, match="登录页面加载失败"):
+        run_worker_pool(tasks, workers, failing_login, lambda driver, task, status: True)
+
+
+def test_some_logins_failed_uploads_with_the_rest():
+    tasks = [FakeTask(i) for i in range(6)]
+    logins = iter([FakeDriver(), None, FakeDriver()])
+
+    def open_session():
+        driver = next(logins)
+        if driver is None:
+            raise Exception("登录失败")
+        return driver
+    counts = run_worker_pool(tasks, 3, open_session, lambda driver, task, status: True)
+    assert sum(counts) == 6
+
+
+def test_stop_upload_in_setup_uploads_nothing():
+    uploaded = []
+
+    def setup(driver):
+        raise StopUpload("读取现有产品失败")
+    counts = run_worker_pool([FakeTask(i) for i in range(3)], 1, FakeDriver,
+                             lambda driver, task, status: uploaded.append(task) or True, setup=setup)
+    assert counts == [0] and uploaded == []
@@ -0,0 +1,140 @@
+import json
+import pandas as pd
+from wp_utils import build_product_title, image_paths_exist, cell_str
+from step_metrics import REPORT_FILE, PRODUCT_STEP
+
+# 没有上次运行报告时，估算每个产品用时（秒）
+DEFAULT_SECONDS_PER_PRODUCT = {'selenium': 60.0, 'rest': 1.0}
+
+
+# 上传计划中的一个产品：启动浏览器前一次性解析好全部字段，上传阶段直接使用
+# skip_reason不为空的行不会被上传
+class UploadTask:
+    __slots__ = ('index', 'key', 'brand', 'model', 'price', 'chinese_name', 'english_name', 'image_path',
+                 'skip_reason')
+
+    def __init__(self, index, key, brand, model, price, chinese_name, english_name, image_path, skip_reason=None):
+        self.index = index
+        self.key = key
+        self.brand = brand
+        self.model = model
+        self.price = price
+        self.chinese_name = chinese_name
+        self.english_name = english_name
+        self.image_path = image_path
+        self.skip_reason = skip_reason
+
+    # Excel中的行号（第1行是表头）
+    @property
+    def excel_row(self):
+        return self.index + 2
+
+    @property
+    def title(self):
+        return build_product_title(self.brand, self.model, self.english_name)
+
+
+# 整列转换为文本（wp_utils.cell_str），与流式读取xlsx得到的文本相同
+def column_text(df, column):
+    if column not in df:
+        return [""] * len(df)
+    return [cell_str(value) for value in df[column]]
+
+
+# 一行产品的标识：品牌|型号|品名，与行号无关，表格插入或删除行后仍能对应
+# 同一产品在表格中出现多次时依次加上 #2、#3 区分，seen记录每个标识已出现的次数
+def unique_key(seen, brand, model, chinese_name):
+    key = "|".join(part.strip() for part in (brand, model, chinese_name))
+    seen[key] = seen.get(key, 0) + 1
+    return key if seen[key] == 1 else f"{key}#{seen[key]}"
+
+
+def row_keys(brands, models, chinese_names):
+    seen = {}
+    return [unique_key(seen, *parts) for parts in zip(brands, models, chinese_names)]
+
+
+# C列为价格，为空时使用单价字段作为备选（上传计划和流水线共用）
+def resolve_price(price, unit_price):
+    return price or unit_price
+
+
+def resolve_prices(df):
+    prices = [cell_str(value) for value in df.iloc[:, 2]] if df.shape[1] > 2 else [""] * len(df)
+    fallback = column_text(df, '单价')
+    return [resolve_price(price, unit_price) for price, unit_price in zip(prices, fallback)]
+
+
+# 生成一个上传任务并判断是否需要跳过
+# require_image: 图片文件不存在时跳过；skip_with_image: 已有图片的产品跳过（只上传没有图片的产品）
+def plan_task(index, key, brand, model, price, chinese_name, image_path, has_image, name_map,
+              require_image=True, skip_with_image=False):
+    english_name = name_map.get(chinese_name, "")
+    english_name = english_name if isinstance(english_name, str) else ""
+    skip_reason = None
+    if require_image and not has_image:
+        skip_reason = "图片文件不存在"
+    elif skip_with_image and has_image:
+        skip_reason = "已有图片"
+    elif not english_name:
+        skip_reason = "没有对应的英文名"
+    return UploadTask(index, key, brand, model, price, chinese_name, english_name, image_path, skip_reason)
+
+
+# 把产品表格编译为上传计划，返回 (待上传的任务列表, 跳过的任务列表)
+# 表格中已有"有图片"列（prepare_product_data已读取过图片文件夹）时直接使用，不再重复读取文件夹
+def build_upload_plan(df, name_map, require_image=True, skip_with_image=False):
+    brands = column_text(df, '品牌')
+    models = column_text(df, '型号')
+    chinese_names = column_text(df, '品名')
+    image_paths = column_text(df, '图片路径')
+    prices = resolve_prices(df)
+    if '有图片' in df:
+        has_image = [bool(value) for value in df['有图片']]
+    else:
+        has_image = image_paths_exist(pd.Series(image_paths, dtype=object)).tolist()
+
+    tasks = []
+    skipped = []
+    for i, (index, key) in enumerate(zip(df.index, row_keys(brands, models, chinese_names))):
+        task = plan_task(index, key, brands[i], models[i], prices[i], chinese_names[i], image_paths[i], has_image[i],
+                         name_map, require_image, skip_with_image)
+        (skipped if task.skip_reason else tasks).append(task)
+    return tasks, skipped
+
+
+# 每个产品的预计用时：优先使用上次运行报告中整个产品的平均用时
+def estimate_seconds_per_product(backend, report_file=REPORT_FILE):
+    try:
+        with open(report_file, encoding="utf-8") as f:
+            report = json.load(f)
+        for step in report.get('steps', []):
+            if step['step'] == PRODUCT_STEP and step['count']:
+                return step['total_seconds'] / step['count'], report_file
+    except (OSError, ValueError, KeyError):
+        pass
+    return DEFAULT_SECONDS_PER_PRODUCT[backend], None
+
+
+# 输出上传计划：待上传数量、各跳过原因的数量和预计用时
+def print_plan(tasks, skipped, backend="selenium", workers=1):
+    print(f"上传计划: 共 {len(tasks) + len(skipped)} 行，待上传 {len(tasks)} 个，跳过 {len(skipped)} 个")
+    reasons = {}
+    for task in skipped:
+        reasons[task.skip_reason] = reasons.get(task.skip_reason, 0) + 1
+    for reason, count in sorted(reasons.items(), key=lambda item: -item[1]):
+        print(f"  跳过（{reason}）: {count} 个")
+    for task in skipped[:10]:
+        print(f"  行 {task.excel_row}: {task.brand} {task.model} {task.chinese_name} - {task.skip_reason}")
+    if len(skipped) > 10:
+        print(f"  ... 其余 {len(skipped) - 10} 行略")
+
+    seconds, source = estimate_seconds_per_product(backend)
+    # selenium模式下多个浏览器并行；rest模式按单线程估算
+    parallel = max(1, workers) if backend == "selenium" else 1
+    total = seconds * len(tasks) / parallel
+    basis = f"上次运行报告 {source}" if source else "默认值"
+    print(f"预计用时: {total / 60:.1f} 分钟（每个产品 {seconds:.1f} 秒，按{basis}估算"
+          + (f"，{parallel} 个浏览器并行" if parallel > 1 else "") + "）")
+    return total
+
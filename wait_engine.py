@@ -0,0 +1,123 @@
+import time
+import threading
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
+
+
+# 统计等待时间：budget为被替换掉的固定sleep秒数，waited为按条件实际等待的秒数
+class WaitStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.budget = 0.0
+        self.waited = 0.0
+        self.count = 0
+
+    def record(self, budget, waited):
+        with self.lock:
+            self.budget += budget
+            self.waited += waited
+            self.count += 1
+
+    def reset(self):
+        with self.lock:
+            self.budget = 0.0
+            self.waited = 0.0
+            self.count = 0
+
+    # 在运行结束时输出节省的等待时间
+    def report(self, product_count):
+        saved = self.budget - self.waited
+        print(f"等待统计: {self.count} 次等待，原固定等待 {self.budget:.1f} 秒，实际等待 {self.waited:.1f} 秒，"
+              f"共节省 {saved:.1f} 秒")
+        if product_count:
+            print(f"平均每个产品节省 {saved / product_count:.1f} 秒")
+
+
+wait_stats = WaitStats()
+
+
+# 全局限速：两次受限操作（如发布产品）之间至少间隔min_interval秒，多个浏览器共享同一个限速器
+class RateLimiter:
+    def __init__(self, min_interval=0.0):
+        self.min_interval = min_interval
+        self.lock = threading.Lock()
+        self.next_time = 0.0
+
+    # budget为这次限速替代掉的固定sleep秒数，用于统计
+    def wait(self, budget=0):
+        delay = 0.0
+        if self.min_interval > 0:
+            with self.lock:
+                now = time.time()
+                delay = max(0.0, self.next_time - now)
+                self.next_time = max(now, self.next_time) + self.min_interval
+            if delay:
+                time.sleep(delay)
+        wait_stats.record(budget, delay)
+
+
+rate_limiter = RateLimiter()
+
+
+# 等待条件成立（condition(driver)返回真值），超时不抛异常，返回False，与原来的固定sleep一样继续往下执行
+def wait_until(driver, condition, timeout=10, budget=0, poll=0.1):
+    start = time.time()
+    try:
+        return WebDriverWait(driver, timeout, poll_frequency=poll).until(condition)
+    except TimeoutException:
+        print(f"等待条件超时（{timeout}秒），继续执行")
+        return False
+    finally:
+        wait_stats.record(budget, time.time() - start)
+
+
+# 执行一段JavaScript作为等待条件
+def js_condition(script, *args):
+    return lambda driver: driver.execute_script(script, *args)
+
+
+# 页面加载完成且没有进行中的admin-ajax请求
+PAGE_READY = js_condition(
+    "return document.readyState === 'complete' && (!window.jQuery || jQuery.active === 0);"
+)
+
+# 没有进行中的jQuery ajax请求（添加分类/品牌、设置特色图片都通过admin-ajax完成）
+AJAX_IDLE = js_condition("return !window.jQuery || jQuery.active === 0;")
+
+# 特色图片缩略图已经加载出来
+THUMBNAIL_LOADED = js_condition(
+    "var img = document.querySelector('#postimagediv .inside img');"
+    "return !!img && img.complete && img.naturalWidth > 0 && (!window.jQuery || jQuery.active === 0);"
+)
+
+# 媒体对话框已关闭
+MEDIA_MODAL_CLOSED = js_condition(
+    "var modal = document.querySelector('.media-modal');"
+    "return !modal || modal.offsetParent === null;"
+)
+
+# 发布后出现成功提示
+PUBLISH_NOTICE = js_condition(
+    "return !!document.querySelector('#message.updated, #message.notice-success, .notice-success');"
+)
+
+
+# 发布按钮已可点击
+def button_enabled(element):
+    return js_condition(
+        "return !(arguments[0].disabled === true || arguments[0].classList.contains('disabled') "
+        "|| arguments[0].getAttribute('aria-disabled') === 'true');",
+        element,
+    )
+
+
+# 立即滚动到元素位置（不使用smooth动画，因此不需要等待滚动完成）
+def scroll_into_view(driver, element, budget=1):
+    driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", element)
+    wait_stats.record(budget, 0)
+
+
+# 立即向下滚动页面
+def scroll_by(driver, offset, budget=1):
+    driver.execute_script("window.scrollBy(0, arguments[0]);", offset)
+    wait_stats.record(budget, 0)
@@ -0,0 +1,486 @@
+import os
+import time
+import mimetypes
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from wp_utils import normalize_wp_url, normalize_term_name
+from step_metrics import step_stats
+from step_retry import retry_step, RetryQueue, with_retries, circuit_breaker
+
+# WooCommerce中分类和品牌对应的REST接口
+TAXONOMY_ENDPOINTS = {
+    'product_cat': 'wc/v3/products/categories',
+    'product_brand': 'wc/v3/products/brands',
+}
+# products/batch 接口每次请求最多包含的创建/更新操作数
+BATCH_LIMIT = 100
+
+
+# REST请求返回HTTP错误时抛出，status_code为HTTP状态码，body为返回的JSON错误（{'code', 'message', 'data'}，无法解析时为None）
+class WooApiError(Exception):
+    def __init__(self, message, status_code, body=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.body = body
+
+
+# 创建词条返回的错误是同名词条已存在（term_exists）时，返回已有词条的ID，否则返回None
+def existing_term_id(error):
+    error = error or {}
+    if error.get('code') != 'term_exists':
+        return None
+    return (error.get('data') or {}).get('resource_id')
+
+
+# 值得重试的错误：网络错误、超时、限流和服务器错误；其他4xx错误（参数错误、权限不足等）重试也不会成功
+def retryable_error(error):
+    if isinstance(error, WooApiError):
+        return error.status_code in (408, 429) or error.status_code >= 500
+    return isinstance(error, requests.RequestException)
+
+
+# 创建产品只在确定服务器没有处理请求时重试（连接失败、网关错误、限流），避免重复创建产品
+def safe_to_repeat(error):
+    if isinstance(error, WooApiError):
+        return error.status_code in (429, 502, 503, 504)
+    return isinstance(error, requests.ConnectionError)
+
+
+# WooCommerce REST API 客户端
+# 使用WordPress用户名 + 应用程序密码（用户 -> 个人资料 -> 应用程序密码）进行Basic认证，
+# 同一套认证既可以访问wc/v3接口，也可以访问wp/v2/media接口上传图片
+class WooClient:
+    # pool_size为连接池大小，多线程共用一个客户端时应不小于线程数
+    def __init__(self, wp_url, username, app_password, timeout=30, pool_size=10):
+        self.wp_url = normalize_wp_url(wp_url)
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.auth = (username, app_password)
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    # 发送请求并返回JSON，HTTP错误直接抛出
+    def request(self, method, path, **kwargs):
+        url = f"{self.wp_url}/wp-json/{path}"
+        kwargs.setdefault('timeout', self.timeout)
+        response = self.session.request(method, url, **kwargs)
+        if response.status_code >= 400:
+            try:
+                body = response.json()
+            except ValueError:
+                body = None
+            raise WooApiError(f"{method} {path} 返回 {response.status_code}: {response.text[:200]}",
+                              response.status_code, body if isinstance(body, dict) else None)
+        return response.json()
+
+    # 分页读取某个分类法下的全部词条
+    def list_terms(self, taxonomy):
+        terms = []
+        page = 1
+        while True:
+            batch = self.request('GET', TAXONOMY_ENDPOINTS[taxonomy],
+                                 params={'per_page': 100, 'page': page})
+            terms.extend(batch)
+            if len(batch) < 100:
+                return terms
+            page += 1
+
+    # 创建新词条，返回词条ID；同名词条已存在（term_exists）时返回已有词条的ID
+    def create_term(self, taxonomy, name):
+        try:
+            term = self.request('POST', TAXONOMY_ENDPOINTS[taxonomy], json={'name': name})
+        except WooApiError as e:
+            term_id = existing_term_id(e.body)
+            if term_id:
+                return term_id
+            raise
+        return term['id']
+
+    # 一次请求批量创建词条，返回 {'create': [...]}，顺序与names相同
+    def batch_terms(self, taxonomy, names):
+        return self.request('POST', f"{TAXONOMY_ENDPOINTS[taxonomy]}/batch",
+                            json={'create': [{'name': name} for name in names]})
+
+    # 上传图片到媒体库，返回附件信息（包含id和source_url）
+    def upload_media(self, image_path):
+        file_name = os.path.basename(image_path)
+        content_type = mimetypes.guess_type(file_name)[0] or 'image/jpeg'
+        with open(image_path, 'rb') as f:
+            data = f.read()
+        headers = {
+            'Content-Type': content_type,
+            # 文件名可能包含中文，使用RFC 5987格式
+            'Content-Disposition': f"attachment; filename*=UTF-8''{requests.utils.quote(file_name)}",
+        }
+        return self.request('POST', 'wp/v2/media', data=data, headers=headers)
+
+    # 检查附件是否仍在媒体库中
+    def media_exists(self, attachment_id):
+        response = self.session.get(f"{self.wp_url}/wp-json/wp/v2/media/{attachment_id}",
+                                    params={'_fields': 'id'}, timeout=self.timeout)
+        if response.status_code in (404, 410):
+            return False
+        if response.status_code >= 400:
+            raise Exception(f"GET wp/v2/media/{attachment_id} 返回 {response.status_code}")
+        return True
+
+    # 分页读取全部产品（包括草稿等非公开状态），只取id和名称
+    def list_products(self):
+        products = []
+        page = 1
+        while True:
+            batch = self.request('GET', 'wc/v3/products',
+                                 params={'per_page': 100, 'page': page, 'status': 'any', '_fields': 'id,name'})
+            products.extend(batch)
+            if len(batch) < 100:
+                return products
+            page += 1
+
+    # 创建产品，返回产品数据
+    def create_product(self, payload):
+        return self.request('POST', 'wc/v3/products', json=payload)
+
+    # 更新已有产品，返回产品数据
+    def update_product(self, product_id, payload):
+        return self.request('PUT', f'wc/v3/products/{product_id}', json=payload)
+
+    # 一次请求批量创建和更新产品（update中的每项需要带id），返回 {'create': [...], 'update': [...]}
+    # 结果与请求中的顺序相同，单个产品失败时对应位置为 {'id': 0, 'error': {'code', 'message', 'data'}}
+    def batch_products(self, create=(), update=()):
+        return self.request('POST', 'wc/v3/products/batch', json={'create': list(create), 'update': list(update)})
+
+
+# 查找词条ID，不存在则创建，并缓存到term_ids中（键为规范化名称，见wp_utils.normalize_term_name）
+def ensure_term(client, taxonomy, name, term_ids):
+    key = normalize_term_name(name)
+    if key not in term_ids:
+        term_ids[key] = client.create_term(taxonomy, name.strip())
+        print(f"已添加新{'产品分类' if taxonomy == 'product_cat' else '品牌'}: {name}")
+    return term_ids[key]
+
+
+# 读取已有的分类和品牌，建立 规范化名称 -> ID 的字典（REST返回的名称中&等字符是HTML实体）
+def load_term_ids(client):
+    term_ids = {}
+    for taxonomy in TAXONOMY_ENDPOINTS:
+        terms = client.list_terms(taxonomy)
+        term_ids[taxonomy] = {normalize_term_name(term['name']): term['id'] for term in terms}
+        print(f"已读取 {taxonomy}: {len(terms)} 个词条")
+    return term_ids
+
+
+# 用分类/品牌的batch接口一次性创建计划中缺少的词条（每次最多100个），写入term_ids
+# 已存在的词条（term_exists）使用返回的resource_id；失败的词条留给ensure_term逐个创建
+def precreate_terms_batch(client, tasks, term_ids):
+    names = {'product_cat': {}, 'product_brand': {}}
+    for task in tasks:
+        for taxonomy, name in (('product_cat', task.english_name), ('product_brand', task.brand)):
+            key = normalize_term_name(name)
+            if key and key not in term_ids[taxonomy]:
+                names[taxonomy].setdefault(key, name.strip())
+    for taxonomy, missing in names.items():
+        missing = list(missing.values())
+        for i in range(0, len(missing), BATCH_LIMIT):
+            chunk = missing[i:i + BATCH_LIMIT]
+            try:
+                response = retry_step("批量创建分类和品牌", lambda: client.batch_terms(taxonomy, chunk),
+                                      retryable=retryable_error)
+            except Exception as e:
+                print(f"批量创建 {taxonomy} 失败，将逐个创建: {e}")
+                continue
+            created = 0
+            for name, term in zip(chunk, response.get('create') or []):
+                term_id = term.get('id') or existing_term_id(term.get('error'))
+                if term_id:
+                    term_ids[taxonomy][normalize_term_name(name)] = term_id
+                    created += 1
+            print(f"已批量创建 {taxonomy}: {created}/{len(chunk)} 个")
+
+
+# 根据一行数据组装WooCommerce产品数据
+def build_product_payload(title, price, category_id, brand_id, media_id):
+    payload = {
+        'name': title,
+        'type': 'simple',
+        'status': 'publish',
+        'regular_price': price,
+    }
+    if category_id:
+        payload['categories'] = [{'id': category_id}]
+    if brand_id:
+        payload['brands'] = [{'id': brand_id}]
+    if media_id:
+        payload['images'] = [{'id': media_id}]
+    return payload
+
+
+# 处理一个产品的分类、品牌和图片（不存在的分类和品牌先创建，没有预上传的图片先上传），返回产品数据
+# 每个请求失败时按retry_policy退避重试，各步骤用时计入steps
+def prepare_payload(client, task, term_ids, steps, with_images=True, media_ids=None, upload_media=None):
+    step = steps.start("处理产品分类")
+    category_id = retry_step(step, lambda: ensure_term(
+        client, 'product_cat', task.english_name, term_ids['product_cat']), retryable=retryable_error)
+
+    step = steps.start("处理品牌")
+    brand_id = None
+    if task.brand:
+        brand_id = retry_step(step, lambda: ensure_term(
+            client, 'product_brand', task.brand, term_ids['product_brand']), retryable=retryable_error)
+
+    media_id = None
+    if with_images:
+        step = steps.start("上传产品图片")
+        media_id = (media_ids or {}).get(os.path.abspath(task.image_path))
+        if not media_id:
+            media_id = retry_step(step, lambda: (upload_media or client.upload_media)(task.image_path),
+                                  retryable=retryable_error)['id']
+    return build_product_payload(task.title, task.price, category_id, brand_id, media_id)
+
+
+# 使用WooCommerce REST API上传产品（Selenium流程的替代后端）
+# tasks为上传计划中待上传的任务（UploadTask），缺少图片或英文名的行已在计划阶段去掉
+# media_ids为预上传得到的 {图片绝对路径: 附件ID}，命中时不再重复上传图片
+# upload_media为上传图片的函数，默认直接上传，可传入媒体清单包装后的函数实现去重
+# journal为上传日志（RunJournal），记录每一行的上传状态和产品ID
+# products为店铺现有产品的索引（ProductIndex），已存在的产品跳过，update_existing为True时改为更新
+# 每个请求失败时按step_retry.retry_policy退避重试；重试后仍失败的产品放入重试队列，全部产品完成后再重试retry_rounds轮
+def upload_via_rest(tasks, client, with_images=True, media_ids=None, upload_media=None, journal=None,
+                    products=None, update_existing=False, retry_rounds=1):
+    upload_media = upload_media or client.upload_media
+    start_time = time.time()
+    step_stats.reset()
+    circuit_breaker.reset()
+    term_ids = load_term_ids(client)
+
+    upload_count = 0
+    existing_count = 0
+    retry_queue = RetryQueue(retry_rounds)
+    for task in with_retries(tasks, retry_queue):
+        if journal:
+            journal.mark_pending(task.key, task.excel_row)
+        title = task.title
+        # 与批量模式和Selenium模式相同，占用标题后再上传，同一标题不会被同时创建两次
+        existing_id = products.claim(title) if products is not None else None
+        if existing_id == 0 or (existing_id and not update_existing):
+            # 跳过的产品不计入各步骤用时（与批量模式和Selenium模式相同）
+            existing_count += 1
+            if existing_id:
+                print(f"产品已存在，跳过: {title} (ID: {existing_id})")
+                if journal:
+                    journal.mark_published(task.key, task.excel_row, existing_id)
+            else:
+                print(f"表格中重复的产品，跳过: {title}")
+                if journal:
+                    journal.mark_skipped(task.key, task.excel_row, "表格中重复的产品")
+            continue
+        claimed = products is not None and existing_id is None
+
+        steps = step_stats.timer()
+        current_operation = steps.start("获取产品基本信息")
+        try:
+            payload = prepare_payload(client, task, term_ids, steps, with_images, media_ids, upload_media)
+            if existing_id:
+                current_operation = steps.start("更新产品")
+                product = retry_step(current_operation, lambda: client.update_product(existing_id, payload),
+                                     retryable=retryable_error)
+                print(f"产品已更新: {title} (ID: {existing_id})")
+            else:
+                current_operation = steps.start("创建产品")
+                product = retry_step(current_operation, lambda: client.create_product(payload),
+                                     retryable=safe_to_repeat)
+                print(f"产品已成功上传: {title} (ID: {product.get('id')})")
+                if claimed:
+                    products.release(title, product['id'])
+                    claimed = False
+            upload_count += 1
+            steps.finish(True)
+            if journal:
+                journal.mark_published(task.key, task.excel_row, product.get('id'))
+        except Exception as product_error:
+            if claimed:
+                products.release(title)
+            current_operation = steps.current
+            steps.finish(False, current_operation)
+            if journal:
+                journal.mark_failed(task.key, task.excel_row, current_operation, str(product_error))
+            print(f"处理产品时出错 (行 {task.excel_row}): {product_error}")
+            print(f"出错时正在处理的产品: {task.chinese_name} ({task.english_name})")
+            print(f"出错时正在执行的操作: {current_operation}")
+            retry_queue.add(task)
+
+    elapsed = time.time() - start_time
+    print(f"成功上传 {upload_count} 个产品")
+    if existing_count:
+        print(f"跳过店铺中已存在的产品 {existing_count} 个")
+    if elapsed > 0:
+        print(f"用时 {elapsed:.1f} 秒，平均 {upload_count / elapsed:.2f} 个产品/秒")
+    return upload_count
+
+
+# 批量请求中一个产品的失败原因：{'code', 'message'}，没有错误时返回None
+def batch_item_error(result):
+    error = result.get('error') if isinstance(result, dict) else {'message': "响应中缺少该产品的结果"}
+    if not error:
+        return None
+    return f"{error.get('code', '')}: {error.get('message', '')}".strip(": ")
+
+
+# 发送一个批次，返回 [(item, 产品数据或None, 失败原因或None, 能否逐个重试), ...]，顺序与chunk相同
+# item为 (task, steps, existing_id, payload)；整个请求重试后仍失败时批次内的产品全部记为失败，
+# 其中创建的产品不能逐个重试：请求可能已被服务器处理（如读取响应超时），再逐个创建会产生重复的产品
+def send_batch(client, chunk):
+    create = [item for item in chunk if not item[2]]
+    update = [item for item in chunk if item[2]]
+    for item in chunk:
+        item[1].start("批量创建产品")
+    try:
+        # 含有创建操作时与单个创建相同，只在确定服务器没有处理请求时重试，避免重复创建整批产品
+        response = retry_step("批量创建产品", lambda: client.batch_products(
+            [item[3] for item in create], [dict(item[3], id=item[2]) for item in update]),
+            retryable=safe_to_repeat if create else retryable_error)
+    except Exception as e:
+        return [(item, None, f"批量请求失败: {e}", bool(item[2])) for item in chunk]
+    results = []
+    for items, key in ((create, 'create'), (update, 'update')):
+        products = response.get(key) or []
+        for i, item in enumerate(items):
+            product = products[i] if i < len(products) else None
+            error = batch_item_error(product)
+            results.append((item, None if error else product, error, True))
+    return results
+
+
+# 批量模式：产品数据按顺序每batch_size个（最多100个）合并为一次 products/batch 请求，最多batch_workers个批次同时发送
+# tasks为列表时先批量创建缺少的分类和品牌；图片仍逐个上传（预上传的图片不发请求），适合与--preupload-media一起使用
+# 批次中单个产品失败时按位置对应回Excel行号，所有批次完成后逐个重新创建/更新这些产品，最多retry_rounds轮；
+# 整个批量请求失败时只逐个重试其中的更新，创建的产品记为失败（可能已经创建），再次运行时按现有产品检查后补传
+# 其余参数与upload_via_rest相同
+def upload_via_rest_batch(tasks, client, with_images=True, media_ids=None, upload_media=None, journal=None,
+                          products=None, update_existing=False, retry_rounds=1, batch_size=BATCH_LIMIT,
+                          batch_workers=2):
+    batch_size = max(1, min(batch_size, BATCH_LIMIT))
+    start_time = time.time()
+    step_stats.reset()
+    circuit_breaker.reset()
+    term_ids = load_term_ids(client)
+    # 流水线模式下tasks是边提取边产生的，分类和品牌在准备产品数据时逐个创建
+    if isinstance(tasks, list):
+        precreate_terms_batch(client, tasks, term_ids)
+
+    counts = {'uploaded': 0, 'existing': 0, 'batches': 0}
+    failed = []
+    # 整个批量请求失败、不能逐个重新创建的产品
+    unsent = []
+
+    # 处理一个批次的结果：成功的写入日志和产品索引，失败的留到最后逐个重试
+    def collect(results):
+        for (task, steps, existing_id, payload), product, error, retry in results:
+            if error:
+                print(f"行 {task.excel_row} ({task.title}) 在批量请求中失败: {error}")
+                (failed if retry else unsent).append(((task, steps, existing_id, payload), error))
+                continue
+            finish_item(task, steps, existing_id, product)
+
+    def finish_item(task, steps, existing_id, product):
+        product_id = product.get('id') or existing_id
+        counts['uploaded'] += 1
+        steps.finish(True)
+        if products is not None:
+            products.release(task.title, product_id)
+        if journal:
+            journal.mark_published(task.key, task.excel_row, product_id)
+
+    def fail_item(task, steps, operation, error):
+        steps.finish(False, operation)
+        if products is not None:
+            products.release(task.title)
+        if journal:
+            journal.mark_failed(task.key, task.excel_row, operation, error)
+        print(f"处理产品时出错 (行 {task.excel_row}): {error}")
+        print(f"出错时正在处理的产品: {task.chinese_name} ({task.english_name})")
+        print(f"出错时正在执行的操作: {operation}")
+
+    # 逐个创建/更新一个产品（批次中失败的产品）
+    def send_single(item):
+        task, steps, existing_id, payload = item
+        if payload is None:
+            payload = prepare_payload(client, task, term_ids, steps, with_images, media_ids, upload_media)
+        if existing_id:
+            step = steps.start("逐个更新产品")
+            return retry_step(step, lambda: client.update_product(existing_id, payload), retryable=retryable_error)
+        step = steps.start("逐个创建产品")
+        return retry_step(step, lambda: client.create_product(payload), retryable=safe_to_repeat)
+
+    pending = deque()
+    chunk = []
+    with ThreadPoolExecutor(max_workers=max(1, batch_workers)) as executor:
+        def submit():
+            pending.append(executor.submit(send_batch, client, list(chunk)))
+            counts['batches'] += 1
+            chunk.clear()
+            # 同时最多batch_workers个批次在发送，按顺序处理结果
+            while len(pending) >= max(1, batch_workers):
+                collect(pending.popleft().result())
+
+        for task in tasks:
+            if journal:
+                journal.mark_pending(task.key, task.excel_row)
+            existing_id = products.claim(task.title) if products is not None else None
+            # 跳过的产品不计入各步骤用时，只计入counts['existing']
+            if existing_id == 0 or (existing_id and not update_existing):
+                counts['existing'] += 1
+                if existing_id:
+                    print(f"产品已存在，跳过: {task.title} (ID: {existing_id})")
+                    if journal:
+                        journal.mark_published(task.key, task.excel_row, existing_id)
+                else:
+                    print(f"表格中重复的产品，跳过: {task.title}")
+                    if journal:
+                        journal.mark_skipped(task.key, task.excel_row, "表格中重复的产品")
+                continue
+            steps = step_stats.timer()
+            steps.start("获取产品基本信息")
+            try:
+                payload = prepare_payload(client, task, term_ids, steps, with_images, media_ids, upload_media)
+            except Exception as e:
+                print(f"准备产品数据失败 (行 {task.excel_row}): {e}")
+                failed.append(((task, steps, existing_id, None), f"{steps.current}: {e}"))
+                continue
+            chunk.append((task, steps, existing_id, payload))
+            if len(chunk) >= batch_size:
+                submit()
+        if chunk:
+            submit()
+        while pending:
+            collect(pending.popleft().result())
+
+    # 批次中失败的产品逐个重试
+    for round_number in range(retry_rounds):
+        if not failed:
+            break
+        print(f"第 {round_number + 1} 轮逐个重试批量请求中失败的 {len(failed)} 个产品...")
+        retry_items, failed = failed, []
+        for item, _ in retry_items:
+            try:
+                finish_item(item[0], item[1], item[2], send_single(item))
+                print(f"行 {item[0].excel_row} 逐个重试成功")
+            except Exception as e:
+                failed.append((item, str(e)))
+    failed += unsent
+    for (task, steps, _, _), error in failed:
+        fail_item(task, steps, steps.current, error)
+    if unsent:
+        print(f"{len(unsent)} 个产品所在的批量请求失败，服务器可能已经创建了其中的部分产品，没有逐个重试；"
+              "请确认后重新运行，已创建的产品会按现有产品跳过")
+
+    elapsed = time.time() - start_time
+    print(f"成功上传 {counts['uploaded']} 个产品（{counts['batches']} 个批次，每批最多 {batch_size} 个）")
+    if counts['existing']:
+        print(f"跳过店铺中已存在的产品 {counts['existing']} 个")
+    if failed:
+        print(f"失败 {len(failed)} 个产品，行号: {', '.join(str(item[0].excel_row) for item, _ in failed)}")
+    if elapsed > 0:
+        print(f"用时 {elapsed:.1f} 秒，平均 {counts['uploaded'] / elapsed:.2f} 个产品/秒")
+    return counts['uploaded']
@@ -0,0 +1,113 @@
+import time
+import threading
+from step_retry import upload_failed
+
+
+# setup中抛出此异常时停止整个运行（所有工作线程都不再上传），其他异常只输出错误后继续上传
+class StopUpload(Exception):
+    pass
+
+
+# 多浏览器并行上传
+# 每个工作线程调用open_session()登录一次，然后从共享的任务序列中依次取出任务，调用process_task(driver, task, status)上传，
+# process_task返回True表示上传成功，status字典中可写入existing/skipped（不算失败）。返回每个工作线程的上传数量列表
+# tasks可以是上传计划（列表），也可以是流水线边提取边产生的任务（生成器）
+# setup(driver)在第一个浏览器登录后、任何产品开始上传前执行一次（如批量创建分类和品牌），其他工作线程等待它完成；
+# setup抛出StopUpload时不上传任何产品
+# retry_queue（step_retry.RetryQueue）不为空时，失败的任务放入重试队列，所有任务取完后各工作线程再上传队列中的任务
+# concurrency（concurrency_control.ConcurrencyController）不为空时，同时上传的产品数由它根据服务器延迟调整，workers为上限
+# recycler（wp_browser.BrowserRecycler）不为空时，每个产品结束后由它记录内存和用时，需要时关闭浏览器并重新调用open_session()
+# 所有工作线程都登录失败时抛出异常（包含最后一次登录错误），不会当作上传了0个产品正常结束
+def run_worker_pool(tasks, workers, open_session, process_task, setup=None, retry_queue=None, concurrency=None,
+                    recycler=None):
+    task_iter = iter(tasks)
+    task_lock = threading.Lock()
+    if hasattr(tasks, '__len__'):
+        workers = min(workers, len(tasks))
+    workers = max(1, workers)
+    counts = [0] * workers
+    setup_lock = threading.Lock()
+    setup_done = [setup is None]
+    stopped = threading.Event()
+    # 成功登录的工作线程数和最后一次登录错误
+    logins = [0, None]
+
+    def worker(worker_id):
+        try:
+            driver = open_session()
+        except Exception as e:
+            print(f"工作线程 {worker_id + 1} 登录失败: {e}")
+            with task_lock:
+                logins[1] = e
+            return
+        with task_lock:
+            logins[0] += 1
+        browser = 1
+        browser_products = 0
+        try:
+            with setup_lock:
+                if not setup_done[0]:
+                    setup_done[0] = True
+                    try:
+                        setup(driver)
+                    except StopUpload as e:
+                        print(f"{e}，停止上传")
+                        stopped.set()
+                    except Exception as e:
+                        print(f"上传前的准备步骤出错: {e}")
+            while not stopped.is_set():
+                # 生成器不能被多个线程同时调用，取任务时加锁（流水线模式下会在这里等待上游产出任务）
+                with task_lock:
+                    task = next(task_iter, None)
+                if task is None and retry_queue is not None:
+                    task = retry_queue.pop()
+                if task is None:
+                    break
+                if concurrency is not None:
+                    concurrency.acquire()
+                status = {}
+                started = time.time()
+                try:
+                    uploaded = process_task(driver, task, status)
+                except Exception as e:
+                    print(f"上传行 {task.excel_row} 时出错: {e}")
+                    uploaded = False
+                if concurrency is not None:
+                    concurrency.release(uploaded)
+                if uploaded:
+                    counts[worker_id] += 1
+                elif retry_queue is not None and upload_failed(uploaded, status):
+                    retry_queue.add(task)
+
+                # 已存在或被跳过的产品没有使用浏览器，不计入重启前的产品数
+                if status.get('existing') or status.get('skipped'):
+                    continue
+                browser_products += 1
+                if recycler is not None and recycler.check(driver, worker_id, browser, browser_products,
+                                                           time.time() - started):
+                    driver.quit()
+                    driver = None
+                    try:
+                        driver = open_session()
+                    except Exception as e:
+                        print(f"工作线程 {worker_id + 1} 重启浏览器后登录失败，停止该工作线程: {e}")
+                        break
+                    browser += 1
+                    browser_products = 0
+        finally:
+            if driver is not None:
+                driver.quit()
+        print(f"工作线程 {worker_id + 1} 完成，上传了 {counts[worker_id]} 个产品")
+
+    if workers == 1:
+        worker(0)
+    else:
+        print(f"启动 {workers} 个浏览器并行上传...")
+        threads = [threading.Thread(target=worker, args=(i,), name=f"uploader-{i + 1}") for i in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    if not logins[0]:
+        raise Exception(f"所有浏览器都登录失败，没有上传任何产品: {logins[1]}")
+    return counts
@@ -0,0 +1,137 @@
+import os
+import re
+import mimetypes
+import threading
+from urllib.parse import urljoin
+import requests
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from wp_utils import normalize_wp_url
+from wp_browser import site_cookies
+from woo_api import WooApiError, retryable_error
+from step_retry import retry_step
+
+# 等待浏览器登录并导出登录状态的最长时间（秒），流水线模式下预上传图片的线程可能比浏览器先开始
+READY_TIMEOUT = 600
+
+# 从添加产品页面读取后台请求需要的nonce：新建分类/品牌（与"添加新分类"按钮相同）、上传媒体（media-form，与媒体对话框相同）
+_READ_NONCES_JS = """
+var field = function (id) { var el = document.getElementById(id); return el ? el.value : null; };
+var settings = window._wpPluploadSettings && window._wpPluploadSettings.defaults;
+return {
+    'add-product_cat': field('_ajax_nonce-add-product_cat'),
+    'add-product_brand': field('_ajax_nonce-add-product_brand'),
+    'media-form': settings && settings.multipart_params ? settings.multipart_params._wpnonce : null,
+    'ajaxurl': window.ajaxurl || null,
+    'user_agent': navigator.userAgent
+};
+"""
+
+
+# admin-ajax.php或async-upload.php请求失败时抛出，与REST错误一样按状态码判断是否重试
+class AdminAjaxError(WooApiError):
+    pass
+
+
+# 混合模式：浏览器登录后，把登录Cookie和页面中的nonce导出到带连接池的HTTP会话，
+# 之后直接请求admin-ajax.php新建分类和品牌、请求async-upload.php上传图片，不再经过页面操作
+# 适用于关闭了REST API、没有应用程序密码的网站；会话在load_from_driver之前创建，发出的请求会等待浏览器登录完成
+class AdminAjaxSession:
+    def __init__(self, wp_url, timeout=30, pool_size=10):
+        self.wp_url = normalize_wp_url(wp_url)
+        self.timeout = timeout
+        self.ajax_url = f"{self.wp_url}/wp-admin/admin-ajax.php"
+        self.upload_url = f"{self.wp_url}/wp-admin/async-upload.php"
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.nonces = {}
+        self.ready = threading.Event()
+        self.error = None
+
+    # 从已登录的浏览器导出Cookie，并打开添加产品页面读取nonce；失败时等待中的请求直接报错
+    def load_from_driver(self, driver):
+        try:
+            driver.get(f"{self.wp_url}/wp-admin/post-new.php?post_type=product")
+            WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.ID, "title")))
+            values = driver.execute_script(_READ_NONCES_JS)
+            # 与浏览器使用相同的User-Agent，部分安全插件会检查
+            self.session.headers['User-Agent'] = values.pop('user_agent')
+            ajax_url = values.pop('ajaxurl')
+            if ajax_url:
+                self.ajax_url = urljoin(self.wp_url + "/", ajax_url)
+            cookies = site_cookies(driver, self.wp_url)
+            for cookie in cookies:
+                self.session.cookies.set(cookie['name'], cookie['value'], domain=cookie['domain'],
+                                         path=cookie.get('path', '/'))
+        except Exception as e:
+            self.error = e
+            self.ready.set()
+            raise
+        self.nonces = {key: value for key, value in values.items() if value}
+        self.ready.set()
+        missing = [key for key in values if not values[key]]
+        print(f"混合模式: 已从浏览器导出 {len(cookies)} 个Cookie和 {len(self.nonces)} 个nonce"
+              + (f"，页面中没有 {', '.join(missing)}" if missing else ""))
+
+    def _nonce(self, action):
+        if not self.ready.wait(READY_TIMEOUT):
+            raise AdminAjaxError("浏览器尚未登录，无法发送后台请求", 401)
+        if self.error is not None:
+            raise AdminAjaxError(f"没有可用的登录状态: {self.error}", 401)
+        nonce = self.nonces.get(action)
+        if not nonce:
+            raise AdminAjaxError(f"添加产品页面中没有 {action} 的nonce（当前用户可能没有权限）", 403)
+        return nonce
+
+    # 发送POST请求，HTTP错误或被重定向到登录页时抛出
+    def _post(self, url, **kwargs):
+        response = self.session.post(url, timeout=self.timeout, allow_redirects=False, **kwargs)
+        path = url[len(self.wp_url):]
+        if 300 <= response.status_code < 400:
+            raise AdminAjaxError(f"POST {path} 被重定向到 {response.headers.get('Location')}，登录状态可能已失效", 401)
+        if response.status_code >= 400:
+            raise AdminAjaxError(f"POST {path} 返回 {response.status_code}: {response.text[:200]}",
+                                 response.status_code)
+        return response
+
+    # 新建词条（名称已存在时WordPress返回已有的词条），返回词条ID
+    def create_term(self, taxonomy, name):
+        response = self._post(self.ajax_url, data={
+            'action': f"add-{taxonomy}",
+            f"new{taxonomy}": name,
+            f"new{taxonomy}_parent": "-1",
+            f"_ajax_nonce-add-{taxonomy}": self._nonce(f"add-{taxonomy}"),
+        })
+        match = re.search(rf"in-{taxonomy}-(\d+)", response.text)
+        if not match:
+            # nonce校验失败时返回-1，没有权限时返回0
+            raise AdminAjaxError(f"新建 {taxonomy} 词条 {name} 失败: {response.text[:200]}", 403)
+        return int(match.group(1))
+
+    # 上传图片到媒体库（与媒体对话框的上传请求相同），返回附件信息 {id, source_url}
+    def upload_media(self, image_path):
+        nonce = self._nonce('media-form')
+        file_name = os.path.basename(image_path)
+        content_type = mimetypes.guess_type(file_name)[0] or 'image/jpeg'
+        with open(image_path, 'rb') as f:
+            response = self._post(self.upload_url, data={
+                'name': file_name,
+                'action': 'upload-attachment',
+                '_wpnonce': nonce,
+                'post_id': '0',
+            }, files={'async-upload': (file_name, f, content_type)})
+        try:
+            result = response.json()
+        except ValueError:
+            raise AdminAjaxError(f"async-upload.php 返回的不是JSON: {response.text[:200]}", response.status_code)
+        if not result.get('success'):
+            message = (result.get('data') or {}).get('message', response.text[:200])
+            raise AdminAjaxError(f"上传图片 {file_name} 失败: {message}", response.status_code)
+        return {'id': result['data']['id'], 'source_url': result['data'].get('url')}
+
+    # 上传图片，网络错误和5xx时按步骤重试策略重试（用于预上传和流水线的预上传阶段）
+    def upload_media_with_retry(self, image_path):
+        return retry_step("上传产品图片", lambda: self.upload_media(image_path), retryable=retryable_error)
@@ -0,0 +1,356 @@
+import os
+import csv
+import json
+import time
+import threading
+from urllib.parse import urlparse
+import requests
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+from wait_engine import wait_until, PAGE_READY
+
+# 登录Cookie缓存文件，下次运行时直接复用，跳过wp-login.php
+SESSION_CACHE_FILE = ".wp_session.json"
+# CDP Network.setCookies 接受的Cookie字段
+COOKIE_FIELDS = ("name", "value", "domain", "path", "secure", "httpOnly", "sameSite", "expires")
+# 每个产品上传后浏览器的内存和用时记录
+BROWSER_LOG_FILE = "browser_log.csv"
+
+# 多个浏览器同时启动时，读取、检查和保存登录缓存文件不能同时进行（登录本身可以并行）
+_session_lock = threading.Lock()
+
+# 开启资源屏蔽时，通过DevTools的Network.setBlockedURLs拦截的地址（*为通配符）
+# 媒体库中的图片都在/wp-content/uploads/下，不会被屏蔽，媒体对话框和特色图片缩略图照常显示
+BLOCKED_URL_PATTERNS = [
+    # 字体
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*fonts.googleapis.com/*", "*fonts.gstatic.com/*",
+    # 头像
+    "*gravatar.com/avatar/*",
+    # 统计和广告
+    "*google-analytics.com/*", "*googletagmanager.com/*", "*doubleclick.net/*",
+    "*stats.wp.com/*", "*pixel.wp.com/*", "*connect.facebook.net/*", "*hotjar.com/*",
+    # emoji脚本和图片
+    "*wp-emoji-release.min.js*", "*s.w.org/images/core/emoji/*",
+    # 后台界面和插件自带的图片
+    "*/wp-admin/images/*", "*/wp-includes/images/*",
+    "*/wp-content/plugins/*.png", "*/wp-content/plugins/*.jpg", "*/wp-content/plugins/*.gif",
+    "*/wp-content/plugins/*.svg",
+    # WooCommerce后台顶栏的通知、引导任务等数据
+    "*/wp-json/wc-admin/*", "*rest_route=%2Fwc-admin*", "*rest_route=/wc-admin*",
+]
+
+
+# 创建Chrome浏览器
+# headless=True时使用无界面模式，并采用eager加载策略（DOM解析完成即返回，不等待图片、字体等资源）
+# block_resources=True时屏蔽BLOCKED_URL_PATTERNS中的资源
+def create_driver(headless=False, block_resources=False):
+    # 添加更多的Selenium配置选项
+    options = webdriver.ChromeOptions()
+    if headless:
+        options.add_argument("--headless=new")  # 无界面模式
+        options.add_argument("--window-size=1920,1080")  # 无界面模式下没有窗口可以最大化
+        options.page_load_strategy = "eager"
+    else:
+        options.add_argument("--start-maximized")  # 最大化窗口
+    options.add_argument("--disable-extensions")  # 禁用扩展
+    options.add_argument("--disable-gpu")  # 禁用GPU加速
+    options.add_argument("--no-sandbox")  # 禁用沙盒模式
+    options.add_argument("--disable-dev-shm-usage")  # 禁用/dev/shm使用
+
+    print("正在初始化Chrome浏览器..." + ("（无界面模式）" if headless else ""))
+    driver = webdriver.Chrome(options=options)
+    print("Chrome浏览器已成功启动")
+    if block_resources:
+        set_resource_blocking(driver, True)
+    return driver
+
+
+# 开启或关闭资源屏蔽
+def set_resource_blocking(driver, enabled):
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS if enabled else []})
+
+
+# 打开一次添加产品页面，返回 (等到可以操作的用时, 浏览器记录的load事件用时)，单位秒
+def time_add_product_page(driver, wp_url):
+    start = time.time()
+    driver.get(f"{wp_url}/wp-admin/post-new.php?post_type=product")
+    WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.ID, "title")))
+    wait_until(driver, PAGE_READY, timeout=15)
+    ready = time.time() - start
+    load_event = driver.execute_script(
+        "var t = performance.getEntriesByType('navigation')[0];"
+        "return t ? t.loadEventEnd : 0;"
+    )
+    return ready, load_event / 1000
+
+
+# 对比添加产品页面在屏蔽资源前后的加载时间，rounds为每种情况打开页面的次数
+# 注意：每次打开添加产品页面WordPress都会生成一个自动草稿，自动草稿会在7天后被自动清理
+def measure_page_load(driver, wp_url, block_resources, rounds=3):
+    print(f"测量添加产品页面加载时间（屏蔽/不屏蔽资源各 {rounds} 次）...")
+    # 先打开一次让浏览器缓存预热，之后两种情况交替进行，减少网络波动的影响
+    time_add_product_page(driver, wp_url)
+    results = {True: [], False: []}
+    try:
+        for _ in range(rounds):
+            for blocked in (False, True):
+                set_resource_blocking(driver, blocked)
+                results[blocked].append(time_add_product_page(driver, wp_url))
+    finally:
+        set_resource_blocking(driver, block_resources)
+
+    averages = {}
+    for blocked, label in ((False, "不屏蔽资源"), (True, "屏蔽资源")):
+        ready = sum(r[0] for r in results[blocked]) / rounds
+        load = sum(r[1] for r in results[blocked]) / rounds
+        averages[blocked] = ready
+        print(f"{label}: 平均 {ready:.2f} 秒可以操作，load事件 {load:.2f} 秒")
+    if averages[False] > 0:
+        saved = averages[False] - averages[True]
+        print(f"屏蔽资源后每次打开添加产品页面节省 {saved:.2f} 秒 ({saved / averages[False]:.0%})")
+    return averages
+
+
+# 登录WordPress并进入产品管理页面
+def login_wordpress(driver, wp_url, username, password):
+    print("正在登录WordPress...")
+    login_url = f"{wp_url}/wp-login.php"
+    print(f"访问登录页面: {login_url}")
+    driver.get(login_url)
+
+    # 等待登录页面加载
+    try:
+        WebDriverWait(driver, 10).until(
+            EC.presence_of_element_located((By.ID, "user_login"))
+        )
+        print("登录页面已加载")
+    except TimeoutException:
+        print(f"无法加载登录页面: {login_url}")
+        print(f"当前页面标题: {driver.title}")
+        print(f"当前URL: {driver.current_url}")
+        raise Exception("登录页面加载失败")
+
+    # 输入登录信息
+    driver.find_element(By.ID, "user_login").send_keys(username)
+    driver.find_element(By.ID, "user_pass").send_keys(password)
+    driver.find_element(By.ID, "wp-submit").click()
+
+    # 等待登录完成
+    WebDriverWait(driver, 10).until(
+        EC.presence_of_element_located((By.ID, "wpadminbar"))
+    )
+    print("登录成功")
+
+    # 先导航到产品页面，确保完全进入后台
+    print("导航到WordPress产品管理页面...")
+    driver.get(f"{wp_url}/wp-admin/edit.php?post_type=product")
+
+    # 等待产品管理页面加载完成
+    try:
+        WebDriverWait(driver, 10).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, "a.page-title-action"))
+        )
+        print("已成功进入产品管理页面")
+        wait_until(driver, PAGE_READY, timeout=10, budget=2)  # 等待页面完全加载
+    except TimeoutException:
+        print("无法找到添加新产品按钮，尝试刷新页面...")
+        driver.refresh()
+        WebDriverWait(driver, 10).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, "a.page-title-action"))
+        )
+        wait_until(driver, PAGE_READY, timeout=10, budget=2)
+
+
+# Cookie的域名是否适用于host：完全相同，或host是该域名的子域名（evilexample.com不匹配example.com）
+def cookie_matches_host(domain, host):
+    domain = domain.lstrip(".").lower()
+    host = host.lower()
+    return host == domain or host.endswith("." + domain)
+
+
+# 读取浏览器中本站点的Cookie（包括HttpOnly的登录Cookie），只保留COOKIE_FIELDS中的字段
+def site_cookies(driver, wp_url):
+    host = urlparse(wp_url).hostname
+    cookies = driver.execute_cdp_cmd("Network.getAllCookies", {})["cookies"]
+    return [
+        {key: cookie[key] for key in COOKIE_FIELDS if key in cookie}
+        for cookie in cookies
+        if cookie_matches_host(cookie["domain"], host)
+    ]
+
+
+# 登录成功后把浏览器中本站点的Cookie保存到缓存文件
+def save_session_cookies(driver, wp_url, username, cache_file=SESSION_CACHE_FILE):
+    cookies = site_cookies(driver, wp_url)
+    with open(cache_file, "w", encoding="utf-8") as f:
+        json.dump({"wp_url": wp_url, "username": username, "saved_at": time.time(), "cookies": cookies}, f)
+    # Cookie等同于登录凭据，只允许当前用户读取
+    os.chmod(cache_file, 0o600)
+    print(f"已保存登录状态到 {cache_file}")
+
+
+# 读取缓存的Cookie，网址或用户名不一致时返回None
+def load_session_cookies(wp_url, username, cache_file=SESSION_CACHE_FILE):
+    try:
+        with open(cache_file, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("wp_url") != wp_url or data.get("username") != username:
+        return None
+    return data.get("cookies") or None
+
+
+# 不经过浏览器检查Cookie是否仍然有效：访问后台个人资料页，没有被重定向到登录页即为有效
+def session_cookies_valid(wp_url, cookies):
+    cookie_header = "; ".join(f"{cookie['name']}={cookie['value']}" for cookie in cookies)
+    try:
+        response = requests.get(f"{wp_url}/wp-admin/profile.php", headers={"Cookie": cookie_header},
+                                allow_redirects=False, timeout=10)
+    except requests.RequestException as e:
+        print(f"检查登录状态时出错: {e}")
+        return False
+    return response.status_code == 200
+
+
+# 尝试用缓存的Cookie恢复登录状态，成功返回True
+def restore_session(driver, wp_url, username, cache_file=SESSION_CACHE_FILE):
+    cookies = load_session_cookies(wp_url, username, cache_file)
+    if not cookies:
+        return False
+    if not session_cookies_valid(wp_url, cookies):
+        print("缓存的登录状态已失效，将重新登录")
+        return False
+    # 会话Cookie的expires为-1，不能传给setCookies
+    cookies = [
+        {key: value for key, value in cookie.items() if key != "expires" or value > 0}
+        for cookie in cookies
+    ]
+    driver.execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
+    print("已使用缓存的登录状态，跳过登录页面")
+    return True
+
+
+# 启动浏览器并登录（优先复用缓存的Cookie），登录失败时关闭浏览器
+# session_cache为None时不使用缓存，每次都完整登录；headless、block_resources见create_driver
+def open_session(wp_url, username, password, session_cache=SESSION_CACHE_FILE, headless=False, block_resources=False):
+    driver = create_driver(headless, block_resources)
+    try:
+        restored = False
+        if session_cache:
+            with _session_lock:
+                restored = restore_session(driver, wp_url, username, session_cache)
+        if not restored:
+            login_wordpress(driver, wp_url, username, password)
+            if session_cache:
+                try:
+                    with _session_lock:
+                        save_session_cookies(driver, wp_url, username, session_cache)
+                except Exception as e:
+                    print(f"保存登录状态失败: {e}")
+    except Exception:
+        driver.quit()
+        raise
+    return driver
+
+
+# 读取当前编辑页面的产品ID（#post_ID隐藏字段），读取失败返回None
+def read_post_id(driver):
+    try:
+        value = driver.find_element(By.ID, "post_ID").get_attribute("value")
+        return int(value) if value else None
+    except Exception:
+        return None
+
+
+# 读取当前页面渲染进程的内存（CDP Performance.getMetrics），返回 {js_heap_mb, dom_nodes, documents}，读取失败返回None
+# js_heap_mb为渲染进程已分配的JS堆大小，反复打开编辑器和媒体对话框时泄漏的对象和分离的DOM都会体现在这里
+def renderer_memory(driver):
+    try:
+        driver.execute_cdp_cmd("Performance.enable", {})
+        metrics = {m["name"]: m["value"] for m in driver.execute_cdp_cmd("Performance.getMetrics", {})["metrics"]}
+    except Exception:
+        return None
+    return {
+        'js_heap_mb': metrics.get("JSHeapTotalSize", 0) / 1024 / 1024,
+        'dom_nodes': int(metrics.get("Nodes", 0)),
+        'documents': int(metrics.get("Documents", 0)),
+    }
+
+
+# 浏览器回收策略：长时间运行时Chrome的内存和页面加载时间会逐渐增加，
+# 一个浏览器上传max_products个产品后，或渲染进程JS堆超过max_memory_mb时关闭并重新打开（用缓存的Cookie自动登录）
+# 每个产品上传后的内存和用时写入log_file，用于调整这两个阈值；两个阈值都为0时只记录不回收
+class BrowserRecycler:
+    def __init__(self, max_products=200, max_memory_mb=512, log_file=BROWSER_LOG_FILE):
+        self.max_products = max_products
+        self.max_memory_mb = max_memory_mb
+        self.log_file = log_file
+        self.lock = threading.Lock()
+        self.restarts = []
+        self.browsers = {}
+        if log_file:
+            try:
+                with open(log_file, "w", newline="", encoding="utf-8-sig") as f:
+                    csv.writer(f).writerow(['time', 'worker', 'browser', 'products', 'product_seconds',
+                                            'js_heap_mb', 'dom_nodes', 'documents', 'restart_reason'])
+            except OSError as e:
+                print(f"无法创建浏览器记录 {log_file}: {e}")
+                self.log_file = None
+
+    # 一个产品上传结束后调用：记录内存和用时，需要重启浏览器时返回原因，否则返回None
+    # browser为该工作线程的第几个浏览器，products为这个浏览器已上传（含失败）的产品数
+    def check(self, driver, worker_id, browser, products, seconds):
+        memory = renderer_memory(driver)
+        reason = None
+        if self.max_products and products >= self.max_products:
+            reason = f"已上传 {products} 个产品"
+        elif memory and self.max_memory_mb and memory['js_heap_mb'] > self.max_memory_mb:
+            reason = f"JS堆 {memory['js_heap_mb']:.0f} MB 超过 {self.max_memory_mb} MB"
+
+        with self.lock:
+            history = self.browsers.setdefault((worker_id, browser), [])
+            history.append((seconds, memory['js_heap_mb'] if memory else None))
+            if reason:
+                self.restarts.append(reason)
+            if self.log_file:
+                try:
+                    with open(self.log_file, "a", newline="", encoding="utf-8-sig") as f:
+                        csv.writer(f).writerow([
+                            round(time.time(), 1), worker_id + 1, browser, products, round(seconds, 2),
+                            round(memory['js_heap_mb'], 1) if memory else "", memory['dom_nodes'] if memory else "",
+                            memory['documents'] if memory else "", reason or "",
+                        ])
+                except OSError as e:
+                    print(f"写入浏览器记录失败: {e}")
+        if reason:
+            print(f"工作线程 {worker_id + 1} 的第 {browser} 个浏览器{reason}，" + self._trend(history) + "，重启浏览器")
+        return reason
+
+    # 一个浏览器最先和最后上传的产品（各最多10个）的平均用时和内存对比
+    @staticmethod
+    def _trend(history):
+        def average(values):
+            values = [v for v in values if v is not None]
+            return sum(values) / len(values) if values else 0.0
+        n = max(1, min(10, len(history) // 2))
+        head, tail = history[:n], history[-n:]
+        return (f"每个产品用时 {average(s for s, _ in head):.1f} -> {average(s for s, _ in tail):.1f} 秒，"
+                f"JS堆 {average(m for _, m in head):.0f} -> {average(m for _, m in tail):.0f} MB")
+
+    # 运行结束时输出重启次数和各浏览器的用时、内存变化
+    def report(self):
+        with self.lock:
+            browsers = dict(self.browsers)
+            restarts = list(self.restarts)
+        if not browsers:
+            return
+        print(f"浏览器回收: 共重启 {len(restarts)} 次"
+              + (f"，每个浏览器的内存和用时已保存到 {self.log_file}" if self.log_file else ""))
+        for (worker_id, browser), history in sorted(browsers.items()):
+            print(f"  工作线程 {worker_id + 1} 第 {browser} 个浏览器: {len(history)} 个产品，{self._trend(history)}")
@@ -0,0 +1,87 @@
+import os
+import re
+import html
+import pandas as pd
+
+
+# 规范化WordPress网址：补全协议并去掉末尾的/wp-admin部分
+def normalize_wp_url(wp_url):
+    wp_url = wp_url.strip()
+    if not wp_url.startswith(('http://', 'https://')):
+        # 对于本地地址，使用http://前缀
+        if wp_url.startswith(('localhost', '127.0.0.1')):
+            wp_url = 'http://' + wp_url
+        else:
+            wp_url = 'https://' + wp_url
+
+    # 移除URL末尾可能的/wp-admin部分，因为后面会添加
+    if wp_url.endswith('/wp-admin'):
+        wp_url = wp_url[:-9]
+    elif '/wp-admin/' in wp_url:
+        wp_url = wp_url.split('/wp-admin/')[0]
+    return wp_url.rstrip('/')
+
+
+# 表格单元格的值转换为文本：空值为""，其他与pandas读取后str()相同（含空单元格的数字列为float，如"123.0"）
+# 流式读取xlsx（xlsx_stream）按列类型输出相同的文本，两种读取方式得到的标题、图片文件名和行标识一致
+def cell_str(value):
+    return "" if pd.isna(value) else str(value)
+
+
+# 规范化词条名称和产品标题：还原HTML实体、合并空白、忽略大小写
+# WordPress保存名称时会转义&等字符，REST接口和页面返回的名称与表格中的原文不同，比较前先规范化
+def normalize_term_name(name):
+    return " ".join(html.unescape(str(name)).split()).casefold()
+
+
+# 生成产品标题："品牌 型号 英文品名"
+def build_product_title(brand, model, english_name):
+    return f"{brand} {model} {english_name}"
+
+
+# 生成"品牌-型号-品名"格式的文件名（image.py提取图片时使用），型号为空时返回None
+def image_file_name(brand, model, product_name):
+    brand_str = str(brand).strip()
+    model_str = str(model).strip()
+    product_name_str = str(product_name).strip()
+    if not model_str:  # 确保型号不为空
+        return None
+    file_name = f"{brand_str}-{model_str}-{product_name_str}"
+    # 替换Windows文件系统不允许的字符，包括斜杠
+    return re.sub(r'[\\/*?:"<>|]', '_', file_name)
+
+
+# 名称列转换为文件名的一部分：空值为""，斜杠替换为下划线，去掉首尾空格
+def clean_name_column(column):
+    return column.fillna("").astype(str).str.replace('/', '_', regex=False).str.strip()
+
+
+# 按 "品牌-型号-品名.jpg" 为每一行生成图片路径，返回与df行索引对应的Series
+def build_image_paths(df, image_folder):
+    file_names = clean_name_column(df['品牌']) + "-" + clean_name_column(df['型号']) + "-" \
+        + clean_name_column(df['品名']) + ".jpg"
+    # os.path.join(文件夹, 文件名) 等同于在文件夹后加路径分隔符再拼接文件名
+    return os.path.join(image_folder, "") + file_names
+
+
+# 一行产品的图片路径，与build_image_paths的规则相同（流水线逐行读取表格时使用），各部分为单元格文本
+def image_path_for(image_folder, brand, model, product_name):
+    parts = (text.replace('/', '_').strip() for text in (brand, model, product_name))
+    return os.path.join(image_folder, "") + "-".join(parts) + ".jpg"
+
+
+# 判断每个图片路径是否存在（与逐个调用os.path.exists结果相同），每个文件夹只读取一次文件列表
+def image_paths_exist(image_paths):
+    listings = {}
+
+    def exists(path):
+        if not path:
+            return False
+        folder, name = os.path.split(path)
+        if folder not in listings:
+            try:
+                listings[folder] = {os.path.normcase(entry) for entry in os.listdir(folder or ".")}
+            except OSError:
+                listings[folder] = set()
+        return os.path.normcase(name) in listings[folder]
+    return image_paths.map(exists).astype(bool)
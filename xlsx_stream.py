@@ -0,0 +1,221 @@
+import os
+import re
+import shutil
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+
+# OOXML命名空间
+NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+NS_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+NS_XDR = "{http://schemas.openxmlformats.org/drawingml/2006/spreadsheetDrawing}"
+NS_A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+
+
+# 读取某个部件的关系文件：{关系ID: 目标部件路径}
+def read_rels(zf, part):
+    rels_path = posixpath.join(posixpath.dirname(part), "_rels", posixpath.basename(part) + ".rels")
+    if rels_path not in zf.namelist():
+        return {}
+    rels = {}
+    root = ET.fromstring(zf.read(rels_path))
+    for rel in root.iter(f"{NS_PKG_REL}Relationship"):
+        target = rel.get("Target")
+        if rel.get("TargetMode") == "External":
+            continue
+        if target.startswith("/"):
+            path = target.lstrip("/")
+        else:
+            path = posixpath.normpath(posixpath.join(posixpath.dirname(part), target))
+        rels[rel.get("Id")] = path
+    return rels
+
+
+# 找到当前活动工作表（与openpyxl的wb.active相同）的部件路径
+def active_sheet_part(zf):
+    root = ET.fromstring(zf.read("xl/workbook.xml"))
+    view = root.find(f"{NS_MAIN}bookViews/{NS_MAIN}workbookView")
+    active_tab = int(view.get("activeTab", 0)) if view is not None else 0
+    sheets = root.findall(f"{NS_MAIN}sheets/{NS_MAIN}sheet")
+    sheet = sheets[min(active_tab, len(sheets) - 1)]
+    return read_rels(zf, "xl/workbook.xml")[sheet.get(f"{NS_REL}id")]
+
+
+# 读取工作表中图片的锚点：{(行, 列): 媒体文件路径}，行列从0开始
+# 同一单元格有多张图片时保留最后一张
+def read_image_anchors(zf, sheet_part):
+    anchors = {}
+    for rel_id, drawing_part in read_rels(zf, sheet_part).items():
+        if not drawing_part.startswith("xl/drawings/") or not drawing_part.endswith(".xml"):
+            continue
+        media_rels = read_rels(zf, drawing_part)
+        root = ET.fromstring(zf.read(drawing_part))
+        for anchor in list(root):
+            start = anchor.find(f"{NS_XDR}from")
+            blip = anchor.find(f".//{NS_XDR}pic/{NS_XDR}blipFill/{NS_A}blip")
+            if start is None or blip is None:
+                continue
+            media_part = media_rels.get(blip.get(f"{NS_REL}embed"))
+            if media_part:
+                row = int(start.find(f"{NS_XDR}row").text)
+                col = int(start.find(f"{NS_XDR}col").text)
+                anchors[(row, col)] = media_part
+    return anchors
+
+
+# 逐条读取共享字符串表
+def read_shared_strings(zf):
+    if "xl/sharedStrings.xml" not in zf.namelist():
+        return []
+    strings = []
+    with zf.open("xl/sharedStrings.xml") as f:
+        for event, elem in ET.iterparse(f):
+            if elem.tag == f"{NS_MAIN}si":
+                # 普通文本为<si><t>，富文本由多段<r><t>组成；忽略注音<rPh>中的文本
+                parts = elem.findall(f"{NS_MAIN}t") + elem.findall(f"{NS_MAIN}r/{NS_MAIN}t")
+                strings.append("".join(t.text or "" for t in parts))
+                elem.clear()
+    return strings
+
+
+# 单元格引用（如"D12"）中的列号，从0开始
+def column_index(ref):
+    letters = re.match(r"[A-Z]+", ref).group(0)
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - 64
+    return index - 1
+
+
+# 数字单元格的值：openpyxl读取时文本中带小数点或指数的为float，否则为int
+def _is_float_text(text):
+    return any(c in text for c in ".eE")
+
+
+# 单元格的值转换为与pandas读取后str()一致的文本
+# as_float: 该列被pandas读取为float（见read_float_columns），整数也带".0"，如 "123.0"
+def cell_text(cell, shared_strings, as_float=False):
+    cell_type = cell.get("t", "n")
+    if cell_type == "inlineStr":
+        return "".join(t.text or "" for t in cell.iter(f"{NS_MAIN}t"))
+    value = cell.find(f"{NS_MAIN}v")
+    if value is None or value.text is None:
+        return None
+    if cell_type == "s":
+        return shared_strings[int(value.text)]
+    if cell_type == "b":
+        return "True" if value.text == "1" else "False"
+    if cell_type == "n":
+        if as_float or _is_float_text(value.text):
+            return str(float(value.text))
+        return str(int(value.text))
+    return value.text
+
+
+# 逐行流式读取工作表的原始单元格，产出 (行号(从1开始), [(列, 单元格元素), ...])
+# 单元格元素在下一次迭代前有效
+def _iter_row_cells(zf, sheet_part):
+    previous_row = 0
+    with zf.open(sheet_part) as f:
+        for event, elem in ET.iterparse(f):
+            if elem.tag != f"{NS_MAIN}row":
+                continue
+            # 行号和单元格引用的r属性是可选的，缺少时按顺序递增
+            row_number = int(elem.get("r") or previous_row + 1)
+            previous_row = row_number
+            cells = []
+            col = -1
+            for cell in elem.iter(f"{NS_MAIN}c"):
+                col = column_index(cell.get("r")) if cell.get("r") else col + 1
+                cells.append((col, cell))
+            yield row_number, cells
+            elem.clear()
+
+
+# 逐行流式读取工作表，产出 (行号(从1开始), {列: 文本})，只包含有值的单元格
+# float_columns为pandas读取为float的列（read_float_columns），这些列中的整数按 "123.0" 输出
+def iter_sheet_rows(zf, sheet_part, shared_strings, float_columns=()):
+    for row_number, cells in _iter_row_cells(zf, sheet_part):
+        values = {}
+        for col, cell in cells:
+            text = cell_text(cell, shared_strings, col in float_columns)
+            if text is not None:
+                values[col] = text
+        yield row_number, values
+
+
+# 预先扫描一遍工作表（只读XML，不取单元格文本），找出pandas读取时为float的列：
+# 数据行（表头之后到最后一个有数据的行）中全部是数字，并且有空单元格或有小数时，整列为float，str()后整数也带".0"
+# 流式读取按这些列输出文本，与pandas读取后str()的结果（图片文件名、产品标题、上传日志的行标识）一致
+def read_float_columns(zf, sheet_part):
+    header_row = None
+    last_row = 0
+    # 列 -> [数字单元格数, 是否有float, 是否有非数字]
+    columns = {}
+    for row_number, cells in _iter_row_cells(zf, sheet_part):
+        if header_row is None:
+            header_row = row_number
+            continue
+        has_value = False
+        for col, cell in cells:
+            value = cell.find(f"{NS_MAIN}v")
+            cell_type = cell.get("t", "n")
+            if cell_type != "inlineStr" and (value is None or value.text is None):
+                continue
+            stats = columns.setdefault(col, [0, False, False])
+            if cell_type == "n":
+                stats[0] += 1
+                stats[1] = stats[1] or _is_float_text(value.text)
+            else:
+                stats[2] = True
+            has_value = True
+        if has_value:
+            last_row = row_number
+    data_rows = last_row - header_row if header_row is not None and last_row else 0
+    return {col for col, (count, has_float, other) in columns.items()
+            if count and not other and (count < data_rows or has_float)}
+
+
+# 流式读取工作表，只保留wanted_rows中各行的指定列：{行号(从1开始): {列: 文本}}
+# 同时返回最后一个有数据的行号（pandas读取的数据范围）
+def read_sheet_rows(zf, sheet_part, wanted_rows, columns, shared_strings, float_columns=()):
+    rows = {}
+    last_row = 0
+    for row_number, values in iter_sheet_rows(zf, sheet_part, shared_strings, float_columns):
+        if any(text != "" for text in values.values()):
+            last_row = row_number
+        if row_number in wanted_rows:
+            rows[row_number] = {col: text for col, text in values.items() if col in columns}
+    return rows, last_row
+
+
+# 直接读取xlsx压缩包提取图片：每个XML部件只解析一次，图片逐个从压缩包流式写入磁盘，不会同时把全部图片放在内存中
+# name_columns为品牌、型号、品名所在的列（从0开始），file_name_func(品牌, 型号, 品名)生成不含扩展名的文件名
+def extract_images_streaming(file_path, output_dir, anchor_col, name_columns, file_name_func, verbose=True):
+    saved = 0
+    with zipfile.ZipFile(file_path) as zf:
+        sheet_part = active_sheet_part(zf)
+        anchors = read_image_anchors(zf, sheet_part)
+        # 锚点行从0开始，Excel行号 = 锚点行 + 1；第1行是表头
+        image_rows = {row + 1: media for (row, col), media in anchors.items() if col == anchor_col and row >= 1}
+        shared_strings = read_shared_strings(zf)
+        rows, last_row = read_sheet_rows(zf, sheet_part, set(image_rows), set(name_columns), shared_strings,
+                                         read_float_columns(zf, sheet_part))
+
+        for row_number in sorted(image_rows):
+            if row_number > last_row:
+                continue
+            values = rows.get(row_number, {})
+            # 空单元格与pandas读取后的str(NaN)一致
+            brand, model, product_name = (values.get(col, "nan") for col in name_columns)
+            safe_file_name = file_name_func(brand, model, product_name)
+            if not safe_file_name:
+                continue
+            img_path = os.path.join(output_dir, f"{safe_file_name}.jpg")
+            with zf.open(image_rows[row_number]) as src, open(img_path, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            saved += 1
+            if verbose:
+                print(f"已保存图片: {img_path}")
+    return saved, last_row - 1, len(anchors)